@@ -0,0 +1,58 @@
+"""
+Measures how many FUSE operations per second `FileSystemOperations` handles
+without mounting it.
+
+    python scripts/bench_fs_ops.py [--files 1000] [--ops 100000]
+
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import pyfuse3
+
+from tgmount import vfs
+from tgmount.fs import FileSystemOperations
+
+
+async def bench(name: str, ops: int, func):
+    started = time.perf_counter()
+
+    for idx in range(ops):
+        await func(idx)
+
+    duration = time.perf_counter() - started
+
+    print(f"{name}\t{ops / duration:.0f} ops/s")
+
+
+async def main(files: int, ops: int):
+    fs = FileSystemOperations(
+        vfs.root(
+            vfs.vdir(
+                "dir",
+                [vfs.text_file(f"file{idx}.txt", "x" * 4096) for idx in range(files)],
+            )
+        )
+    )
+
+    dir_inode = (await fs.lookup(pyfuse3.ROOT_INODE, b"dir")).st_ino
+    names = [f"file{idx}.txt".encode() for idx in range(files)]
+    inodes = [(await fs.lookup(dir_inode, name)).st_ino for name in names]
+    fhs = [(await fs.open(inode, os.O_RDONLY, None)).fh for inode in inodes]
+
+    await bench("getattr", ops, lambda idx: fs.getattr(inodes[idx % files]))
+    await bench("lookup", ops, lambda idx: fs.lookup(dir_inode, names[idx % files]))
+    await bench("read", ops, lambda idx: fs.read(fhs[idx % files], 0, 4096))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--ops", type=int, default=100000)
+
+    args = parser.parse_args()
+
+    asyncio.run(main(args.files, args.ops))
@@ -0,0 +1,32 @@
+import pytest
+
+from tgmount.cache.memory import CacheBlocksStorageMemory
+from tgmount.cache.reader import CacheBlockReaderWriter
+
+
+@pytest.mark.asyncio
+async def test_cache_reader_read_range():
+    data = bytes(range(256)) * 4
+    fetched = []
+
+    async def fetcher(offset: int, limit: int):
+        fetched.append(offset // 100)
+        return data[offset : offset + limit]
+
+    reader = CacheBlockReaderWriter(
+        CacheBlocksStorageMemory(block_size=100, total_size=len(data))
+    )
+
+    # a range ending on a block boundary doesn't need the next block
+    assert await reader.read_range(fetcher, 0, 200) == data[0:200]
+    assert fetched == [0, 1]
+
+    assert await reader.read_range(fetcher, 150, 120) == data[150:270]
+    assert fetched == [0, 1, 2]
+
+    assert await reader.try_read_range(50, 200) == data[50:250]
+    assert await reader.try_read_range(250, 100) is None
+
+    # a whole block is returned without copying
+    block = await reader.get_block(1)
+    assert await reader.read_range(fetcher, 100, 100) is block
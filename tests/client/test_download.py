@@ -0,0 +1,78 @@
+import asyncio
+import os
+
+import pytest
+
+from tgmount import vfs
+from tgmount.cli.download import DownloadJob, download_jobs
+
+CONTENT = bytes(range(256)) * 1000
+
+
+@pytest.mark.asyncio
+async def test_download_jobs(tmp_path):
+    jobs = [
+        DownloadJob(
+            message_id=idx,
+            content=vfs.file_content_from_bytes(CONTENT),
+            output_file_path=os.path.join(tmp_path, f"file{idx}.bin"),
+        )
+        for idx in range(5)
+    ]
+
+    progress = []
+
+    await download_jobs(
+        jobs,
+        jobs_number=3,
+        request_size=4096,
+        max_in_flight=64 * 1024,
+        on_progress=progress.append,
+    )
+
+    assert sum(progress) == len(CONTENT) * len(jobs)
+
+    for job in jobs:
+        with open(job.output_file_path, "rb") as f:
+            assert f.read() == CONTENT
+
+
+@pytest.mark.asyncio
+async def test_download_jobs_error(tmp_path):
+    cancelled = []
+
+    async def read_failing(handle, off, size):
+        raise RuntimeError("failed")
+
+    async def read_slow(handle, off, size):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(off)
+            raise
+
+        return CONTENT[off : off + size]
+
+    jobs = [
+        DownloadJob(
+            message_id=1,
+            content=vfs.FileContent(size=len(CONTENT), read_func=read_slow),
+            output_file_path=os.path.join(tmp_path, "slow.bin"),
+        ),
+        DownloadJob(
+            message_id=2,
+            content=vfs.FileContent(size=len(CONTENT), read_func=read_failing),
+            output_file_path=os.path.join(tmp_path, "failing.bin"),
+        ),
+    ]
+
+    with pytest.raises(RuntimeError):
+        await asyncio.wait_for(
+            download_jobs(
+                jobs, jobs_number=2, request_size=4096, max_in_flight=64 * 1024
+            ),
+            1,
+        )
+
+    # the other job is cancelled instead of running to the end
+    assert len(cancelled) > 0
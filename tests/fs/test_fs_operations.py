@@ -1,3 +1,5 @@
+import asyncio
+import os
 import pyfuse3
 import pytest
 from tgmount.fs import FileSystemOperations
@@ -19,3 +21,231 @@ async def test_fs_operations1(fs_tree1: vfs.DirContentSourceMapping):
     root_attrs = await fs.lookup(pyfuse3.ROOT_INODE, b".")
 
     assert root_attrs.st_ino == pyfuse3.ROOT_INODE
+
+
+@pytest.mark.asyncio
+async def test_fs_operations_kernel_cache():
+    structure = vfs.root(
+        vfs.text_file("text.txt", "text"),
+        vfs.FileLike("document.txt", vfs.text_content("document"), extra=(1, 1000)),
+    )
+
+    fs = FileSystemOperations(structure, entry_timeout=10, attr_timeout=20)
+
+    text_attrs = await fs.lookup(pyfuse3.ROOT_INODE, b"text.txt")
+    document_attrs = await fs.lookup(pyfuse3.ROOT_INODE, b"document.txt")
+
+    assert text_attrs.entry_timeout == 10
+    assert text_attrs.attr_timeout == 20
+
+    # only document files are kept in the page cache
+    assert not (await fs.open(text_attrs.st_ino, os.O_RDONLY, None)).keep_cache
+    assert (await fs.open(document_attrs.st_ino, os.O_RDONLY, None)).keep_cache
+
+
+@pytest.mark.asyncio
+async def test_fs_operations_direct_io():
+    structure = vfs.root(
+        vfs.vdir(
+            "videos",
+            [vfs.FileLike("video.mp4", vfs.text_content("video"), extra=(1, 1000))],
+        ),
+        vfs.FileLike("document.txt", vfs.text_content("document"), extra=(2, 1001)),
+    )
+
+    fs = FileSystemOperations(structure, direct_io_dirs=["/videos"])
+
+    videos = await fs.lookup(pyfuse3.ROOT_INODE, b"videos")
+    video = await fs.lookup(videos.st_ino, b"video.mp4")
+    document = await fs.lookup(pyfuse3.ROOT_INODE, b"document.txt")
+
+    video_fi = await fs.open(video.st_ino, os.O_RDONLY, None)
+    document_fi = await fs.open(document.st_ino, os.O_RDONLY, None)
+
+    assert video_fi.direct_io and not video_fi.keep_cache
+    assert not document_fi.direct_io and document_fi.keep_cache
+
+    assert await fs.read(video_fi.fh, 0, 1024) == b"video"
+
+
+def test_fs_operations_inode_keys():
+    fs = FileSystemOperations(vfs.root())
+
+    photo = vfs.FileLike("photo.jpg", vfs.text_content("photo"), extra=(1, 1000))
+    renamed = vfs.FileLike(
+        "renamed.jpg", vfs.file_content_from_bytes(b""), extra=(1, 1000)
+    )
+    thumb = vfs.FileLike("photo_s.jpg", vfs.text_content("s"), extra=(1, 1000, "s"))
+
+    # the key doesn't depend on the name or the content class
+    assert (
+        fs.get_inode_key(photo, 1)
+        == fs.get_inode_key(renamed, 1)
+        == (
+            1,
+            "message",
+            1,
+            1000,
+        )
+    )
+    assert fs.get_inode_key(thumb, 1) != fs.get_inode_key(photo, 1)
+    assert fs.get_inode_key(photo, 2) != fs.get_inode_key(photo, 1)
+    assert fs.get_inode_key(vfs.text_file("a.txt", "a"), 1) == (1, "a.txt")
+
+
+@pytest.mark.asyncio
+async def test_fs_operations_dir_locks():
+    structure = vfs.root(
+        vfs.vdir("dir_a", [vfs.text_file("a.txt", "a")]),
+        vfs.vdir("dir_b", [vfs.text_file("b.txt", "b")]),
+    )
+
+    fs = FileSystemOperations(structure)
+
+    dir_a = await fs.lookup(pyfuse3.ROOT_INODE, b"dir_a")
+    dir_b = await fs.lookup(pyfuse3.ROOT_INODE, b"dir_b")
+
+    # an update of one directory doesn't block reading another one
+    async with fs._dir_locks.lock(dir_b.st_ino):
+        assert (await fs.lookup(dir_a.st_ino, b"a.txt")).st_size == 1
+
+        lookup_b = asyncio.create_task(fs.lookup(dir_b.st_ino, b"b.txt"))
+        await asyncio.sleep(0)
+
+        assert not lookup_b.done()
+
+    assert (await lookup_b).st_size == 1
+
+
+@pytest.mark.asyncio
+async def test_fs_operations_metrics():
+    structure = vfs.root(vfs.text_file("text.txt", "text"))
+
+    fs = FileSystemOperations(structure)
+
+    attrs = await fs.lookup(pyfuse3.ROOT_INODE, b"text.txt")
+
+    with pytest.raises(pyfuse3.FUSEError):
+        await fs.lookup(pyfuse3.ROOT_INODE, b"missing.txt")
+
+    fh = (await fs.open(attrs.st_ino, os.O_RDONLY, None)).fh
+
+    assert await fs.read(fh, 0, 100) == b"text"
+
+    stats = fs.metrics.stats()
+
+    assert stats["lookup"]["requests"] == 2
+    assert stats["lookup"]["errors"] == 1
+    assert sum(stats["lookup"]["histogram"]) == 2
+    assert stats["read"]["requests"] == 1
+    assert stats["read"]["in_flight"] == 0
+    assert fs.metrics.in_flight == 0
+
+    total = fs.metrics.total()
+
+    assert total["requests"] == sum(op["requests"] for op in stats.values())
+    assert total["errors"] == 1
+    assert total["max_in_flight"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_fs_operations_forget():
+    structure = vfs.root(
+        vfs.vdir("dir_a", [vfs.text_file("a.txt", "a"), vfs.text_file("b.txt", "b")]),
+        vfs.text_file("c.txt", "c"),
+    )
+
+    fs = FileSystemOperations(structure)
+
+    dir_a = await fs.lookup(pyfuse3.ROOT_INODE, b"dir_a")
+    a_txt = await fs.lookup(dir_a.st_ino, b"a.txt")
+    await fs.lookup(pyfuse3.ROOT_INODE, b"c.txt")
+
+    # the directory is kept while its child is referenced
+    await fs.forget([(dir_a.st_ino, 1)])
+
+    assert fs.inodes.get_item_by_inode(dir_a.st_ino) is not None
+    assert fs.inodes.get_referenced_descendants(dir_a.st_ino) == 1
+    assert fs.inodes.get_referenced_descendants(pyfuse3.ROOT_INODE) == 2
+
+    c_txt = fs.inodes.get_by_path("/c.txt")
+
+    # and goes with the last of its children
+    await fs.forget([(a_txt.st_ino, 1)])
+
+    assert fs.inodes.get_item_by_inode(a_txt.st_ino) is None
+    assert fs.inodes.get_item_by_inode(dir_a.st_ino) is None
+    assert fs.inodes.get_referenced_descendants(pyfuse3.ROOT_INODE) == 1
+
+    # the rest of the directory is kept
+    assert fs.inodes.was_content_read(pyfuse3.ROOT_INODE)
+    assert fs.inodes.was_evicted(b"dir_a", pyfuse3.ROOT_INODE)
+    assert fs.inodes.get_by_path("/c.txt") is c_txt
+
+    # evicted items are added back on lookup and get the same inodes
+    assert (await fs.lookup(pyfuse3.ROOT_INODE, b"dir_a")).st_ino == dir_a.st_ino
+    assert not fs.inodes.has_evicted_children(pyfuse3.ROOT_INODE)
+    assert fs.inodes.get_by_path("/c.txt") is c_txt
+    assert (await fs.lookup(dir_a.st_ino, b"a.txt")).st_ino == a_txt.st_ino
+
+
+@pytest.mark.asyncio
+async def test_fs_operations_readdir(monkeypatch):
+    replies = []
+    capacity = 2
+
+    def readdir_reply(token, name, attrs, off):
+        if len(replies) >= capacity:
+            return False
+
+        replies.append((name, off))
+        return True
+
+    monkeypatch.setattr(pyfuse3, "readdir_reply", readdir_reply)
+
+    structure = vfs.root(
+        vfs.text_file("a.txt", "a"),
+        vfs.text_file("b.txt", "b"),
+        vfs.text_file("c.txt", "c"),
+    )
+
+    fs = FileSystemOperations(structure)
+    fh = await fs.opendir(pyfuse3.ROOT_INODE, None)
+
+    # the listing is returned in batches continuing from the offset
+    await fs.readdir(fh, 0, None)
+
+    assert replies == [(b"a.txt", 1), (b"b.txt", 2)]
+
+    replies.clear()
+    await fs.readdir(fh, 2, None)
+
+    assert replies == [(b"c.txt", 3)]
+
+    # the listing made at the start is kept while the directory is read
+    fs.add_subitem(vfs.text_file("d.txt", "d"), pyfuse3.ROOT_INODE)
+
+    replies.clear()
+    await fs.readdir(fh, 3, None)
+
+    assert replies == []
+
+    # and is made again when the directory is read from the start
+    capacity = 4
+    replies.clear()
+    await fs.readdir(fh, 0, None)
+
+    assert [name for name, _ in replies] == [b"a.txt", b"b.txt", b"c.txt", b"d.txt"]
+
+    # items evicted or removed while listing are skipped
+    fs.inodes.evict_item(fs.inodes.get_by_path("/b.txt"))
+    fs.remove_subitem(pyfuse3.ROOT_INODE, "d.txt")
+
+    replies.clear()
+    await fs.readdir(fh, 1, None)
+
+    assert replies == [(b"c.txt", 3)]
+
+    await fs.releasedir(fh)
+
+    assert fh not in fs._dir_listings
@@ -4,6 +4,7 @@ import os
 import threading
 from typing import TypedDict
 
+import pyfuse3
 import pytest
 
 from tgmount import fs, vfs
@@ -130,3 +131,90 @@ async def test_fs1(mnt_dir, caplog):
         assert await ctx.listdir_set("subf") == {"ccc"}
 
     await ctx.run_test(lambda: fs1, test)
+
+
+def test_fs_update_merge():
+    update = fs.FileSystemOperationsUpdate()
+
+    # added and removed
+    update.add_new_file("/subf/aaa", f("aaa"))
+    update.add_removed_file("/subf/aaa")
+
+    # removed and added back
+    update.add_removed_file("/subf/bbb")
+    update.add_new_file("/subf/bbb", f("bbb"))
+
+    # added and updated
+    update.add_new_file("/subf/ccc", f("ccc"))
+    update.add_updated_item("/subf/ccc", ccc := f("ccc"))
+
+    # updated twice
+    update.add_updated_item("/subf/ddd", f("ddd"))
+    update.add_updated_item("/subf/ddd", ddd := f("ddd"))
+
+    # nothing is added into a removed directory
+    update.add_new_dir("/subd", d("subd", []))
+    update.add_new_file("/subd/eee", f("eee"))
+    update.add_removed_dir("/subd")
+
+    assert update.removed_files == ["/subf/bbb"]
+    assert update.removed_dirs == []
+    assert list(update.new_files) == ["/subf/bbb", "/subf/ccc"]
+    assert update.new_files["/subf/ccc"] is ccc
+    assert update.new_dirs == {}
+    assert update.update_items == {"/subf/ddd": ddd}
+    assert not update.is_empty()
+
+    update.add_removed_file("/subf/ccc")
+    update.add_removed_file("/subf/ddd")
+
+    assert update.removed_files == ["/subf/bbb", "/subf/ddd"]
+    assert update.update_items == {}
+
+
+@pytest.mark.asyncio
+async def test_fs_update_concurrent_read():
+    reading = asyncio.Event()
+    release = asyncio.Event()
+
+    async def readdir(handle, off):
+        reading.set()
+        await release.wait()
+        return [f("aaa")]
+
+    root = vfs.root(
+        vfs.DirLike("subd", vfs.DirContent(readdir)),
+        vfs.DirLike("subf", subf_content := vfs.DirContentList([])),
+    )
+    fs1 = fs.FileSystemOperationsUpdatable(root)
+
+    subd = await fs1.lookup(pyfuse3.ROOT_INODE, b"subd")
+    subf = await fs1.lookup(pyfuse3.ROOT_INODE, b"subf")
+
+    # a directory removed while being read gets no children
+    lookup = asyncio.create_task(fs1.lookup(subd.st_ino, b"aaa"))
+    await reading.wait()
+
+    update = fs.FileSystemOperationsUpdate()
+    update.add_removed_dir("/subd")
+    await fs1.update(update)
+
+    release.set()
+
+    with pytest.raises(pyfuse3.FUSEError):
+        await lookup
+
+    assert fs1.inodes.get_item_by_inode(subd.st_ino) is None
+    assert fs1.inodes._children.get(subd.st_ino) is None
+
+    # a new directory that was read before the update is matched by name
+    new_content = vfs.DirContentList([])
+    subf_content.content_list.append(vfs.DirLike("new", new_content))
+
+    new = await fs1.lookup(subf.st_ino, b"new")
+
+    update = fs.FileSystemOperationsUpdate()
+    update.add_new_dir("/subf/new", new_content)
+    await fs1.update(update)
+
+    assert fs1.inodes.get_by_path("/subf/new").inode == new.st_ino
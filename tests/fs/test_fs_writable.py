@@ -39,6 +39,11 @@ async def test_FileContentStringWritable(mnt_dir: str, caplog):
     assert await content.read_func(None, 0, 8) == b"12312345"
     assert content.size == 8
 
+    assert await content.write(None, 10, b"67") == 2
+
+    assert await content.read_func(None, 0, 12) == b"12312345\x00\x0067"
+    assert content.size == 12
+
 
 @pytest.mark.asyncio
 async def test_fs_operations1(mnt_dir: str, caplog):
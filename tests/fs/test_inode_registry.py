@@ -1,3 +1,4 @@
+import pytest
 from typing import Optional, TypeVar
 from tgmount.fs.inode import InodesRegistry, RegistryItem, RegistryRoot
 from tgmount.vfs.util import nappb
@@ -52,3 +53,204 @@ def test_inode_registry1():
     assert reg.get_item_path(root_item) == [
         b"/",
     ]
+
+
+def test_inode_registry_children_index():
+    reg = InodesRegistry[str]("root")
+
+    item1 = reg.add_item_to_inodes(b"item1", "item1 content")
+    subitem1 = reg.add_item_to_inodes(b"subitem1", "subitem1 content", item1)
+    subitem2 = reg.add_item_to_inodes(b"subitem2", "subitem2 content", item1)
+    subsubitem1 = reg.add_item_to_inodes(
+        b"subsubitem1", "subsubitem1 content", subitem1
+    )
+
+    # replacing an item keeps its place
+    subitem1 = reg.add_item_to_inodes(
+        b"subitem1", "subitem1 new content", item1, inode=subitem1.inode
+    )
+
+    assert reg.get_items_by_parent(item1) == [subitem1, subitem2]
+    assert reg.get_child_item_by_name(b"subitem1", item1) == subitem1
+
+    # renaming
+    subitem2 = reg.add_item_to_inodes(
+        b"subitem2_renamed", "subitem2 content", item1, inode=subitem2.inode
+    )
+
+    assert reg.get_child_item_by_name(b"subitem2", item1) is None
+    assert reg.get_child_item_by_name(b"subitem2_renamed", item1) == subitem2
+    assert reg.get_items_by_parent_dict(item1) == {
+        b"subitem1": subitem1,
+        b"subitem2_renamed": subitem2,
+    }
+
+    assert reg.remove_item_with_children(subitem1) == {subitem1, subsubitem1}
+
+    assert reg.get_items_by_parent(item1) == [subitem2]
+    assert reg.get_items_by_parent(subitem1) is None
+    assert reg.get_by_path(nappb("/item1/subitem1/subsubitem1")) is None
+
+
+def test_inode_registry_path_cache():
+    reg = InodesRegistry[str]("root")
+
+    item1 = reg.add_item_to_inodes(b"item1", "item1 content")
+    subitem1 = reg.add_item_to_inodes(b"subitem1", "subitem1 content", item1)
+    subsubitem1 = reg.add_item_to_inodes(
+        b"subsubitem1", "subsubitem1 content", subitem1
+    )
+
+    assert reg.get_by_path("/item1/subitem1/subsubitem1") == subsubitem1
+    assert reg.get_item_path(subsubitem1) == [
+        b"/",
+        b"item1",
+        b"subitem1",
+        b"subsubitem1",
+    ]
+
+    # renaming a directory invalidates the paths of its children
+    reg.add_item_to_inodes(b"renamed", "subitem1 content", item1, subitem1.inode)
+
+    assert reg.get_by_path("/item1/subitem1/subsubitem1") is None
+    assert reg.get_by_path("/item1/renamed/subsubitem1") == subsubitem1
+    assert reg.get_item_path(subsubitem1) == [
+        b"/",
+        b"item1",
+        b"renamed",
+        b"subsubitem1",
+    ]
+
+    reg.remove_item_with_children(item1)
+
+    assert reg.get_by_path("/item1/renamed/subsubitem1") is None
+    assert reg.get_item_path(subsubitem1) is None
+
+    item1 = reg.add_item_to_inodes(b"item1", "new item1 content")
+
+    assert reg.get_by_path("/item1") == item1
+
+
+def test_inode_registry_forget():
+    reg = InodesRegistry[str]("root")
+
+    item1 = reg.add_item_to_inodes(b"item1", "item1 content")
+    subitem1 = reg.add_item_to_inodes(b"subitem1", "subitem1 content", item1)
+
+    reg.lookup(item1)
+    reg.lookup(item1, 2)
+
+    assert reg.get_lookup_count(item1) == 3
+    assert reg.forget(item1, 2) is False
+    assert reg.forget(item1, 1) is True
+    assert reg.get_lookup_count(item1) == 0
+
+    # evicted items get their inodes back
+    reg.evict_item(item1)
+
+    assert reg.get_item_by_inode(item1.inode) is None
+    assert reg.get_item_by_inode(subitem1.inode) is None
+
+    evicted_inode = item1.inode
+    item1 = reg.add_item_to_inodes(b"item1", "item1 content")
+    subitem1 = reg.add_item_to_inodes(b"subitem1", "subitem1 content", item1)
+
+    assert item1.inode == evicted_inode
+    assert reg.get_by_path("/item1/subitem1") == subitem1
+
+    # removed items don't
+    reg.remove_item_with_children(item1)
+    item1 = reg.add_item_to_inodes(b"item1", "item1 content")
+
+    assert item1.inode != evicted_inode
+
+    with pytest.raises(ValueError):
+        reg.remove_item_with_children(reg.get_root())
+
+
+def test_inode_registry_keys():
+    reg1 = InodesRegistry[str]("root")
+    reg2 = InodesRegistry[str]("root")
+
+    item1 = reg1.add_item_to_inodes(b"item1", "item1 content", key=(1, 1000))
+    reg2.add_item_to_inodes(b"other", "other content")
+    item2 = reg2.add_item_to_inodes(b"renamed", "item1 content", key=(1, 1000))
+
+    # same key gives the same inode regardless of the name and the order
+    assert item1.inode == item2.inode
+
+    # a colliding key gets another inode
+    item3 = reg1.add_item_to_inodes(b"item3", "item3 content", key=(1, 1000))
+
+    assert item3.inode != item1.inode
+
+    reg1.remove_item_with_children(item1)
+    reg1.remove_item_with_children(item3)
+
+    assert reg1.add_item_to_inodes(b"item1", "", key=(1, 1000)).inode == item1.inode
+
+
+def test_inode_registry_evict_keyed():
+    reg = InodesRegistry[str]("root")
+
+    item1 = reg.add_item_to_inodes(b"item1", "item1 content", key=(1, 1000))
+    item2 = reg.add_item_to_inodes(b"item2", "item2 content")
+
+    reg.evict_item(item1)
+    reg.evict_item(item2)
+
+    # keyed items get their inodes from the keys
+    assert reg._stable_inodes == {(reg.ROOT_INODE, b"item2"): item2.inode}
+    assert reg.add_item_to_inodes(b"item1", "", key=(1, 1000)).inode == item1.inode
+
+
+def test_inode_registry_referenced_descendants():
+    reg = InodesRegistry[str]("root")
+
+    dir1 = reg.add_item_to_inodes(b"dir1", "dir1 content")
+    dir2 = reg.add_item_to_inodes(b"dir2", "dir2 content", dir1)
+    item1 = reg.add_item_to_inodes(b"item1", "item1 content", dir2)
+    dir3 = reg.add_item_to_inodes(b"dir3", "dir3 content")
+
+    reg.lookup(item1)
+    reg.lookup(item1)
+    reg.lookup(dir2)
+
+    assert reg.get_referenced_descendants(dir2) == 1
+    assert reg.get_referenced_descendants(dir1) == 2
+
+    # moving an item moves its references
+    reg.add_item_to_inodes(b"dir2", "dir2 content", dir3, inode=dir2.inode)
+
+    assert reg.get_referenced_descendants(dir1) == 0
+    assert reg.get_referenced_descendants(dir3) == 2
+
+    assert reg.forget(item1, 2) is True
+    assert reg.get_referenced_descendants(dir3) == 1
+
+    # removing an item drops its references
+    reg.remove_item_with_children(dir2)
+
+    assert reg.get_referenced_descendants(dir3) == 0
+    assert reg.get_referenced_descendants(reg.ROOT_INODE) == 0
+
+
+def test_inode_registry_colliding_keys():
+    reg1 = InodesRegistry[str]("root")
+    reg2 = InodesRegistry[str]("root")
+
+    reg1.add_item_to_inodes(b"a", "", key=(1, 1000))
+    reg1.add_item_to_inodes(b"b", "", key=(1, 1000))
+    c1 = reg1.add_item_to_inodes(b"c", "", key=(1, 1000))
+
+    reg2.add_item_to_inodes(b"a", "", key=(1, 1000))
+    c2 = reg2.add_item_to_inodes(b"c", "", key=(1, 1000))
+
+    # the first item takes the key's inode and the inodes of the following
+    # duplicates depend on their names
+    assert c1.inode == c2.inode
+
+    reg3 = InodesRegistry[str]("root")
+    b3 = reg3.add_item_to_inodes(b"b", "", key=(1, 1000))
+
+    assert b3.inode == reg2.get_by_path("/a").inode
@@ -1,4 +1,5 @@
 from .mocked_client import MockedClientReader, MockedClientWriter
+from .mocked_cdn import MockedCdnClientReader, MockedCdnResponder
 from .mocked_message import *
 from .mocked_storage import MockedTelegramStorage
 from .util import random_file_reference
@@ -0,0 +1,155 @@
+import hashlib
+import os
+
+from telethon import types
+from telethon.errors import FileReferenceExpiredError
+
+from tgmount.tgclient.cdn import CDN_HASH_PART_SIZE, cdn_decrypt
+from tgmount.tgclient.client_types import TgmountTelegramClientCdnProto
+from tgmount.tgclient.types import (
+    DocId,
+    InputDocumentFileLocation,
+    InputPhotoFileLocation,
+)
+
+from .mocked_client import MockedClientReader
+from .mocked_storage import MockedTelegramStorage
+
+
+class MockedCdnResponder:
+    """Serves files of `MockedTelegramStorage` the way a CDN data center does.
+
+    `upload.getFile` always answers with `upload.fileCdnRedirect`, parts are
+    encrypted and hashes are given for `part_size` sized parts.
+    """
+
+    def __init__(
+        self,
+        storage: MockedTelegramStorage,
+        *,
+        dc_id: int = 203,
+        part_size: int = CDN_HASH_PART_SIZE,
+        reupload_needed: bool = False,
+    ) -> None:
+        self._storage = storage
+        self._dc_id = dc_id
+        self._part_size = part_size
+        self._reupload_needed = reupload_needed
+
+        self._redirects: dict[DocId, types.upload.FileCdnRedirect] = {}
+        self._uploaded: set[DocId] = set()
+
+        self.corrupted = False
+        """ If set the CDN returns damaged parts """
+
+        self.requests: list[str] = []
+        """ Names of the served requests """
+
+    def _file_bytes(self, file_id: DocId) -> bytes:
+        return self._storage.files.get_item(file_id).file_bytes
+
+    def _file_id(self, cdn_redirect: types.upload.FileCdnRedirect) -> DocId:
+        return int.from_bytes(cdn_redirect.file_token, "big")
+
+    def file_hashes(
+        self, file_id: DocId, offset: int, count: int = 8
+    ) -> list[types.FileHash]:
+        file_bytes = self._file_bytes(file_id)
+        end = min(len(file_bytes), offset + count * self._part_size)
+
+        return [
+            types.FileHash(
+                offset=o,
+                limit=len(file_bytes[o : o + self._part_size]),
+                hash=hashlib.sha256(file_bytes[o : o + self._part_size]).digest(),
+            )
+            for o in range(offset, end, self._part_size)
+        ]
+
+    async def get_file_part(
+        self,
+        input_location: InputPhotoFileLocation | InputDocumentFileLocation,
+        *,
+        offset: int,
+        limit: int,
+    ):
+        self.requests.append("GetFileRequest")
+
+        file = self._storage.files.get_item(input_location.id)
+
+        if file.file_reference != input_location.file_reference:
+            raise FileReferenceExpiredError(None)
+
+        if (redirect := self._redirects.get(file.id)) is None:
+            redirect = self._redirects[file.id] = types.upload.FileCdnRedirect(
+                dc_id=self._dc_id,
+                file_token=file.id.to_bytes(8, "big"),
+                encryption_key=os.urandom(32),
+                encryption_iv=os.urandom(16),
+                file_hashes=self.file_hashes(file.id, 0, 1),
+            )
+
+        return redirect
+
+    async def get_cdn_file_part(
+        self,
+        cdn_redirect: types.upload.FileCdnRedirect,
+        *,
+        offset: int,
+        limit: int,
+    ):
+        self.requests.append("GetCdnFileRequest")
+
+        file_id = self._file_id(cdn_redirect)
+
+        if self._reupload_needed and file_id not in self._uploaded:
+            return types.upload.CdnFileReuploadNeeded(request_token=b"request")
+
+        data = self._file_bytes(file_id)[offset : offset + limit]
+
+        if self.corrupted and len(data) > 0:
+            data = bytes([data[0] ^ 0xFF]) + data[1:]
+
+        # AES-CTR encryption is the same operation as decryption
+        return types.upload.CdnFile(bytes=cdn_decrypt(cdn_redirect, offset, data))
+
+    async def reupload_cdn_file(
+        self, cdn_redirect: types.upload.FileCdnRedirect, request_token: bytes
+    ) -> list[types.FileHash]:
+        self.requests.append("ReuploadCdnFileRequest")
+
+        file_id = self._file_id(cdn_redirect)
+        self._uploaded.add(file_id)
+
+        return self.file_hashes(file_id, 0)
+
+    async def get_cdn_file_hashes(
+        self, cdn_redirect: types.upload.FileCdnRedirect, offset: int
+    ) -> list[types.FileHash]:
+        self.requests.append("GetCdnFileHashesRequest")
+
+        return self.file_hashes(self._file_id(cdn_redirect), offset)
+
+
+class MockedCdnClientReader(MockedClientReader, TgmountTelegramClientCdnProto):
+    """Client that downloads files through `MockedCdnResponder`"""
+
+    def __init__(
+        self, storage: MockedTelegramStorage, cdn: MockedCdnResponder | None = None
+    ) -> None:
+        super().__init__(storage)
+        self.cdn = cdn if cdn is not None else MockedCdnResponder(storage)
+
+    async def get_file_part(self, input_location, *, offset: int, limit: int):
+        return await self.cdn.get_file_part(input_location, offset=offset, limit=limit)
+
+    async def get_cdn_file_part(self, cdn_redirect, *, offset: int, limit: int):
+        return await self.cdn.get_cdn_file_part(
+            cdn_redirect, offset=offset, limit=limit
+        )
+
+    async def reupload_cdn_file(self, cdn_redirect, request_token: bytes):
+        return await self.cdn.reupload_cdn_file(cdn_redirect, request_token)
+
+    async def get_cdn_file_hashes(self, cdn_redirect, offset: int):
+        return await self.cdn.get_cdn_file_hashes(cdn_redirect, offset)
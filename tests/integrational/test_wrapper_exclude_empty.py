@@ -158,3 +158,45 @@ async def test_wrapper_nested_wrappers(caplog):
         TreeEventNewDirs(sender=ssd1, new_dirs=[sssd1.path]),
         TreeEventNewItems(sender=sssd1, new_items=[sd1f1]),
     ]
+
+
+@pytest.mark.asyncio
+async def test_wrapper_does_not_read_subdirs(monkeypatch):
+    t = VfsTree()
+
+    d1 = await t.create_dir("/")
+    d1.add_wrapper(WrapperEmpty(d1))
+
+    sd1 = await d1.create_dir("subdir1")
+    sd1.add_wrapper(WrapperEmpty(sd1))
+
+    sd2 = await d1.create_dir("subdir2")
+    ssd1 = await sd1.create_dir("subsubdir1")
+    ssd2 = await sd2.create_dir("subsubdir2")
+
+    await ssd1.put_content(vfs.text_file("file1.txt", "123"))
+
+    assert sd1.items_count == 1
+    assert sd2.items_count == 1
+    assert ssd2.items_count == 0
+
+    built = []
+    get_dir_content = t._get_dir_content
+
+    async def _get_dir_content(path: str):
+        built.append(path)
+        return await get_dir_content(path)
+
+    monkeypatch.setattr(t, "_get_dir_content", _get_dir_content)
+
+    assert (await read_dir(d1)).keys() == {"subdir1", "subdir2"}
+    assert (await read_dir(sd1)).keys() == {"subsubdir1"}
+    assert (await read_dir(sd2)).keys() == {"subsubdir2"}
+
+    # listing a dir doesn't build the listings of its subdirs
+    assert set(built) == {d1.path, sd1.path, sd2.path}
+
+    await ssd1.remove_subdir("/")
+
+    assert sd1.items_count == 0
+    assert (await read_dir(d1)).keys() == {"subdir2"}
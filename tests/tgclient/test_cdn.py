@@ -0,0 +1,112 @@
+import os
+
+import pytest
+from telethon import types
+
+from tgmount.tgclient import TelegramFilesSource
+from tgmount.tgclient.cdn import CdnDownloader, CdnHashMismatchError, cdn_file_key
+from tgmount.vfs.file import read_file_content_bytes
+
+from ..helpers.mocked import (
+    MockedCdnClientReader,
+    MockedCdnResponder,
+    MockedTelegramStorage,
+)
+
+FILE_BYTES = os.urandom(300 * 1024)
+
+
+async def create_document(tmpdir, storage: MockedTelegramStorage):
+    file_path = os.path.join(str(tmpdir), "file.bin")
+
+    with open(file_path, "wb") as f:
+        f.write(FILE_BYTES)
+
+    return await storage.get_entity("entity1").document(file_path)
+
+
+@pytest.mark.asyncio
+async def test_cdn_download(tmpdir):
+    storage, _ = MockedTelegramStorage.create_from_entities_list(["entity1"])
+    client = MockedCdnClientReader(storage)
+    files_source = TelegramFilesSource(client)
+
+    msg = await create_document(tmpdir, storage)
+    content = files_source.file_content(msg)
+
+    assert await read_file_content_bytes(content) == FILE_BYTES
+
+    # the redirect is remembered
+    assert client.cdn.requests.count("GetFileRequest") == 1
+    assert "GetCdnFileHashesRequest" in client.cdn.requests
+
+    assert await files_source.read(msg, 1000, 200000) == FILE_BYTES[1000:201000]
+    assert await files_source.read(msg, 300000, 20000) == FILE_BYTES[300000:]
+
+    assert client.cdn.requests.count("GetFileRequest") == 1
+
+
+@pytest.mark.asyncio
+async def test_cdn_download_reupload(tmpdir):
+    storage, _ = MockedTelegramStorage.create_from_entities_list(["entity1"])
+    client = MockedCdnClientReader(
+        storage, MockedCdnResponder(storage, reupload_needed=True)
+    )
+    files_source = TelegramFilesSource(client)
+
+    msg = await create_document(tmpdir, storage)
+
+    assert await files_source.read(msg, 0, 200000) == FILE_BYTES[:200000]
+    assert client.cdn.requests.count("ReuploadCdnFileRequest") == 1
+
+
+@pytest.mark.asyncio
+async def test_cdn_download_hash_mismatch(tmpdir):
+    storage, _ = MockedTelegramStorage.create_from_entities_list(["entity1"])
+    client = MockedCdnClientReader(storage)
+    files_source = TelegramFilesSource(client)
+
+    msg = await create_document(tmpdir, storage)
+
+    client.cdn.corrupted = True
+
+    with pytest.raises(CdnHashMismatchError):
+        await files_source.read(msg, 0, 4096)
+
+
+@pytest.mark.asyncio
+async def test_cdn_download_capacity(tmpdir):
+    storage, _ = MockedTelegramStorage.create_from_entities_list(["entity1"])
+    client = MockedCdnClientReader(storage)
+    files_source = TelegramFilesSource(client)
+    cdn_downloader = files_source._cdn_downloader = CdnDownloader(client, capacity=1)
+
+    msg1 = await create_document(tmpdir, storage)
+    msg2 = await create_document(tmpdir, storage)
+
+    key1 = (msg1.document.id, "")
+    key2 = (msg2.document.id, "")
+
+    assert await files_source.read(msg1, 0, 4096) == FILE_BYTES[:4096]
+    assert await files_source.read(msg2, 0, 4096) == FILE_BYTES[:4096]
+
+    # the least recently read file is forgotten with its hashes
+    assert cdn_downloader.get_redirect(key1) is None
+    assert cdn_downloader.get_redirect(key2) is not None
+    assert list(cdn_downloader._hashes.keys()) == [key2]
+
+    assert await files_source.read(msg1, 0, 4096) == FILE_BYTES[:4096]
+
+    assert client.cdn.requests.count("GetFileRequest") == 3
+    assert list(cdn_downloader._hashes.keys()) == [key1]
+
+
+def test_cdn_file_key():
+    def location(thumb_size: str):
+        return types.InputPhotoFileLocation(
+            id=1, access_hash=2, file_reference=b"", thumb_size=thumb_size
+        )
+
+    # sizes of a photo are separate files on the CDN
+    assert cdn_file_key(location("y")) != cdn_file_key(location("m"))
+    assert cdn_file_key(location("m")) == cdn_file_key(location("m"))
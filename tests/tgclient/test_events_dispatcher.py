@@ -0,0 +1,70 @@
+import pytest
+from telethon import events
+
+from tgmount.tgclient.events_disptacher import TelegramEventsDispatcher
+from tgmount.tgclient.message_source import MessageSource
+
+from ..helpers.mocked.mocked_message import MockedMessage
+
+
+def new_message(msg_id: int, text: str | None = None):
+    return MockedMessage(message_id=msg_id, message=text)
+
+
+@pytest.mark.asyncio
+async def test_events_dispatcher_batches():
+    source = MessageSource[MockedMessage]()
+    dispatcher = TelegramEventsDispatcher()
+    dispatcher.connect("chat", source)
+
+    calls = []
+
+    async def on_new(sender, messages):
+        calls.append(("new", [m.id for m in messages]))
+
+    async def on_removed(sender, messages):
+        calls.append(("removed", [m.id for m in messages]))
+
+    async def on_edited(sender, old_messages, new_messages):
+        calls.append(("edited", [m.text for m in new_messages]))
+
+    source.event_new_messages.subscribe(on_new)
+    source.event_removed_messages.subscribe(on_removed)
+    source.event_edited_messages.subscribe(on_edited)
+
+    # events are queued while paused
+    await dispatcher.process_events(
+        "chat",
+        [
+            events.NewMessage.Event(new_message(1)),
+            events.NewMessage.Event(new_message(2)),
+        ],
+    )
+
+    assert calls == []
+
+    await dispatcher.resume()
+
+    assert calls == [("new", [1, 2])]
+
+    calls.clear()
+
+    await dispatcher.process_events(
+        "chat",
+        [
+            events.NewMessage.Event(new_message(3)),
+            events.NewMessage.Event(new_message(4)),
+            events.MessageDeleted.Event([1], None),
+            events.MessageDeleted.Event([2], None),
+            events.MessageEdited.Event(new_message(3, "a")),
+            events.MessageEdited.Event(new_message(3, "b")),
+            events.NewMessage.Event(new_message(5)),
+        ],
+    )
+
+    assert calls == [
+        ("new", [3, 4]),
+        ("removed", [1, 2]),
+        ("edited", ["b"]),
+        ("new", [5]),
+    ]
@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+
+from tgmount import vfs
+from tgmount.tgclient.files_source import FileContentPhoto, PhotoThumbsCache
+from tgmount.tgclient.source.photo import SourceItemPhoto, get_photo_thumbs_types
+from tgmount.tgmount.vfs_tree_types import (
+    TreeEventNewItems,
+    TreeEventRemovedItems,
+    TreeEventUpdatedItems,
+)
+from tgmount.tgmount.wrappers.wrapper_photo_thumbs import (
+    WrapperPhotoThumbs,
+    WrapperPhotoThumbsProps,
+)
+
+from ..helpers.mocked.mocked_message import MockedPhoto
+from ..helpers.mocked.mocked_storage_files_photo import MockedPhotoSize
+
+
+class MockedPhotoSizeStripped:
+    type = "i"
+    bytes = b"\x01\x02"
+
+
+def test_photo_thumbs_types():
+    photo = MockedPhoto(
+        sizes=[
+            MockedPhotoSize(type="x", w=800, h=600, size=60000),
+            MockedPhotoSizeStripped(),
+            MockedPhotoSize(type="y", w=1280, h=960, size=120000),
+            MockedPhotoSize(type="m", w=320, h=240, size=15000),
+            MockedPhotoSize(type="s", w=90, h=67, size=1500),
+        ]
+    )
+
+    assert get_photo_thumbs_types(photo) == ["s", "m", "x"]
+
+    assert SourceItemPhoto(photo).size == 120000
+    assert SourceItemPhoto(photo, "m").size == 15000
+
+
+@pytest.mark.asyncio
+async def test_photo_thumbs_cache():
+    cache = PhotoThumbsCache(capacity=100)
+    fetched = []
+
+    def fetch(key, size):
+        async def _fetch():
+            await asyncio.sleep(0.01)
+            fetched.append(key)
+            return b"0" * size
+
+        return _fetch
+
+    results = await asyncio.gather(
+        cache.get((1, "s"), fetch((1, "s"), 40)),
+        cache.get((1, "s"), fetch((1, "s"), 40)),
+    )
+
+    assert results == [b"0" * 40, b"0" * 40]
+    assert fetched == [(1, "s")]
+
+    await cache.get((2, "s"), fetch((2, "s"), 40))
+    await cache.get((1, "s"), fetch((1, "s"), 40))
+    await cache.get((3, "s"), fetch((3, "s"), 40))
+
+    # the least recently used thumbnail is evicted
+    assert (2, "s") not in cache
+    assert (1, "s") in cache
+    assert cache.total_size == 80
+    assert fetched == [(1, "s"), (2, "s"), (3, "s")]
+
+
+def _photo(name: str, extra, thumb_types: list[str]):
+    async def read(handle, off, size):
+        return b""
+
+    return vfs.FileLike(
+        name,
+        FileContentPhoto(
+            size=100,
+            read_func=read,
+            thumbs={t: vfs.FileContent(size=10, read_func=read) for t in thumb_types},
+        ),
+        extra=extra,
+    )
+
+
+@pytest.mark.asyncio
+async def test_photo_thumbs_wrapper_update():
+    sender = object()
+    wrapper = WrapperPhotoThumbs(
+        sender, WrapperPhotoThumbsProps(mode="siblings", dir_name=".thumbs")  # type: ignore
+    )
+
+    photo = _photo("1_photo.jpg", (1, 10), ["s", "m"])
+    events = await wrapper.wrap_events(
+        [TreeEventNewItems(sender=sender, new_items=[photo])]
+    )
+
+    assert [i.name for i in events[0].new_items] == [
+        "1_photo.jpg",
+        "1_photo_s.jpg",
+        "1_photo_m.jpg",
+    ]
+    # thumbnails are not keyed like the photo
+    assert [i.extra for i in events[0].new_items] == [
+        (1, 10),
+        (1, 10, "s"),
+        (1, 10, "m"),
+    ]
+
+    edited = _photo("1_photo.jpg", (1, 11), ["s"])
+    events = await wrapper.wrap_events(
+        [TreeEventUpdatedItems(sender=sender, updated_items={photo.name: edited})]
+    )
+
+    assert isinstance(events[1], TreeEventRemovedItems)
+    assert [i.name for i in events[1].removed_items] == ["1_photo_m.jpg"]
+    assert isinstance(events[2], TreeEventUpdatedItems)
+    assert events[2].updated_items["1_photo_s.jpg"].extra == (1, 11, "s")
+
+    renamed = _photo("2_photo.jpg", (1, 11), ["s"])
+    events = await wrapper.wrap_events(
+        [TreeEventUpdatedItems(sender=sender, updated_items={edited.name: renamed})]
+    )
+
+    assert [i.name for i in events[1].removed_items] == ["1_photo_s.jpg"]
+    assert [i.name for i in events[2].new_items] == ["2_photo_s.jpg"]
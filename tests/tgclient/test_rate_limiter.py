@@ -0,0 +1,96 @@
+import time
+
+import pytest
+from telethon import errors
+
+from tgmount.tgclient.rate_limiter import (
+    RPC_CLASS_DOWNLOAD,
+    RPC_CLASS_OTHER,
+    RateLimit,
+    RateLimiter,
+)
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_bucket():
+    limiter = RateLimiter({RPC_CLASS_DOWNLOAD: RateLimit(rate=20, burst=2)})
+
+    async def rpc():
+        return 1
+
+    started = time.monotonic()
+
+    for _ in range(4):
+        assert await limiter.call(RPC_CLASS_DOWNLOAD, rpc) == 1
+
+    # two requests fit the burst, the other two wait for 1/20 s each
+    assert time.monotonic() - started >= 0.09
+
+    stats = limiter.stats()[RPC_CLASS_DOWNLOAD]
+
+    assert stats["requests"] == 4
+    assert stats["queue_depth"] == 0
+    assert stats["max_wait_time"] > 0
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_flood_wait():
+    limiter = RateLimiter(flood_sleep_threshold=5)
+    calls = 0
+
+    async def rpc():
+        nonlocal calls
+        calls += 1
+
+        if calls == 1:
+            raise errors.FloodWaitError(request=None, capture=1)
+
+        return calls
+
+    assert await limiter.call(RPC_CLASS_OTHER, rpc) == 2
+
+    stats = limiter.stats()[RPC_CLASS_OTHER]
+
+    assert stats["flood_waits"] == 1
+    assert stats["max_wait_time"] >= 0.9
+    assert stats["rate"] < 10
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_flood_wait_above_threshold():
+    limiter = RateLimiter(flood_sleep_threshold=5)
+
+    async def rpc():
+        raise errors.FloodWaitError(request=None, capture=100)
+
+    with pytest.raises(errors.FloodWaitError):
+        await limiter.call(RPC_CLASS_OTHER, rpc)
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_call_threshold():
+    limiter = RateLimiter(flood_sleep_threshold=5)
+
+    async def rpc():
+        raise errors.FloodWaitError(request=None, capture=1)
+
+    # the threshold passed with the call takes precedence
+    with pytest.raises(errors.FloodWaitError):
+        await limiter.call(RPC_CLASS_OTHER, rpc, flood_sleep_threshold=0)
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_downloads_unlimited():
+    limiter = RateLimiter()
+
+    async def rpc():
+        return 1
+
+    started = time.monotonic()
+
+    for _ in range(200):
+        await limiter.call(RPC_CLASS_DOWNLOAD, rpc)
+
+    # downloads are not throttled by default
+    assert time.monotonic() - started < 0.5
+    assert limiter.stats()[RPC_CLASS_DOWNLOAD]["rate"] is None
@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+from tgmount import vfs
+from tgmount.tgclient.streaming import (
+    download_file_content,
+    get_resume_offset,
+    stream_file_content,
+)
+
+CONTENT = bytes(range(256)) * 1000
+
+
+@pytest.mark.asyncio
+async def test_stream_file_content():
+    content = vfs.file_content_from_bytes(CONTENT)
+
+    chunks = [
+        chunk
+        async for chunk in stream_file_content(content, request_size=4096, queue_size=2)
+    ]
+
+    assert all(len(c) <= 4096 for c in chunks)
+    assert b"".join(chunks) == CONTENT
+
+    content = vfs.file_content_from_bytes(CONTENT)
+
+    chunks = [
+        chunk
+        async for chunk in stream_file_content(content, offset=1000, request_size=4096)
+    ]
+
+    assert b"".join(chunks) == CONTENT[1000:]
+
+
+@pytest.mark.asyncio
+async def test_stream_file_content_error():
+    async def read_func(handle, off, size):
+        if off > 0:
+            raise RuntimeError("read error")
+        return CONTENT[off : off + size]
+
+    content = vfs.FileContent(size=len(CONTENT), read_func=read_func)
+
+    with pytest.raises(RuntimeError):
+        async for _ in stream_file_content(content, request_size=4096):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_download_file_content_resume(tmpdir):
+    output_path = os.path.join(str(tmpdir), "file.bin")
+
+    with open(output_path, "wb") as f:
+        f.write(CONTENT[:10000])
+
+    offset = get_resume_offset(output_path, len(CONTENT))
+
+    assert offset == 10000
+
+    written = await download_file_content(
+        vfs.file_content_from_bytes(CONTENT),
+        output_path,
+        offset=offset,
+        request_size=4096,
+    )
+
+    assert written == len(CONTENT) - 10000
+
+    with open(output_path, "rb") as f:
+        assert f.read() == CONTENT
+
+    assert get_resume_offset(output_path, 100) == 0
@@ -0,0 +1,227 @@
+import asyncio
+import errno
+import os
+
+import pyfuse3
+import pytest
+from telethon import types
+
+from tgmount import vfs
+from tgmount.fs import FileSystemOperationsWritable
+from tgmount.tgclient.uploader import (
+    BIG_FILE_SIZE,
+    UPLOAD_PART_SIZE,
+    DirContentUpload,
+    FileUploader,
+)
+
+
+class MockedUploadClient:
+    def __init__(self) -> None:
+        self.parts: dict[int, dict[int, bytes]] = {}
+        self.big: set[int] = set()
+        self.sent = []
+
+    async def save_file_part(self, file_id, part, total_parts, data, *, big):
+        self.parts.setdefault(file_id, {})[part] = data
+
+        if big:
+            self.big.add(file_id)
+
+        return True
+
+    async def send_file(self, entity, file, **kwargs):
+        self.sent.append((entity, file))
+
+    def get_uploaded(self, file_id: int) -> bytes:
+        parts = self.parts[file_id]
+        return b"".join(parts[idx] for idx in sorted(parts.keys()))
+
+
+@pytest.mark.asyncio
+async def test_uploader():
+    client = MockedUploadClient()
+    uploader = FileUploader(client, workers=3)
+
+    for size in (10, UPLOAD_PART_SIZE * 3 + 1, BIG_FILE_SIZE + 1):
+        data = os.urandom(size)
+
+        async def read_part(offset: int, size: int):
+            return data[offset : offset + size]
+
+        input_file = await uploader.upload(read_part, len(data), "file.bin")
+
+        assert input_file.name == "file.bin"
+        assert input_file.parts == (size + UPLOAD_PART_SIZE - 1) // UPLOAD_PART_SIZE
+        assert client.get_uploaded(input_file.id) == data
+
+        if size > BIG_FILE_SIZE:
+            assert isinstance(input_file, types.InputFileBig)
+            assert input_file.id in client.big
+        else:
+            assert isinstance(input_file, types.InputFile)
+            assert input_file.id not in client.big
+
+
+@pytest.mark.asyncio
+async def test_dir_content_upload():
+    client = MockedUploadClient()
+    dir_content = DirContentUpload(client, "entity")
+
+    filelike = await dir_content.create("file.txt")
+    content = filelike.content
+
+    h1 = await content.open_func()
+    h2 = await content.open_func()
+
+    await content.write(h1, 0, b"hello ")
+    await content.write(h2, 6, b"world")
+
+    assert content.size == 11
+    assert await content.read_func(h1, 0, 11) == b"hello world"
+
+    await content.close_func(h1)
+
+    # uploaded only after the last handle is closed
+    assert client.sent == []
+
+    await content.close_func(h2)
+
+    [(entity, input_file)] = client.sent
+
+    assert entity == "entity"
+    assert input_file.name == "file.txt"
+    assert client.get_uploaded(input_file.id) == b"hello world"
+
+    # reading the file back does not upload it again
+    h3 = await content.open_func()
+    await content.close_func(h3)
+
+    assert len(client.sent) == 1
+
+
+@pytest.mark.asyncio
+async def test_dir_content_upload_error():
+    class FailingUploadClient(MockedUploadClient):
+        fail = True
+
+        async def send_file(self, entity, file, **kwargs):
+            if self.fail:
+                raise RuntimeError("send_file failed")
+
+            await super().send_file(entity, file, **kwargs)
+
+    client = FailingUploadClient()
+    dir_content = DirContentUpload(client, "entity")
+    fs = FileSystemOperationsWritable(vfs.root(vfs.DirLike("upload", dir_content)))
+
+    upload_dir = await fs.lookup(pyfuse3.ROOT_INODE, b"upload")
+    fi, attrs = await fs.create(
+        upload_dir.st_ino, b"file.txt", 0o644, os.O_WRONLY, None  # type: ignore
+    )
+
+    await fs.write(fi.fh, 0, b"hello")
+
+    # the failed upload is reported and the handle is released anyway
+    with pytest.raises(pyfuse3.FUSEError) as e:
+        await fs.release(fi.fh)
+
+    assert e.value.errno == errno.EIO
+    assert fs._handles.get_by_item(fs.inodes.get_item_by_inode(attrs.st_ino)) is None
+
+    # the written data is kept so the upload can be retried
+    [filelike] = dir_content.content_list
+    assert not filelike.content.closed
+
+    client.fail = False
+
+    fi = await fs.open(attrs.st_ino, os.O_RDONLY, None)  # type: ignore
+    assert await fs.read(fi.fh, 0, 5) == b"hello"
+    await fs.release(fi.fh)
+
+    [(_, input_file)] = client.sent
+    assert client.get_uploaded(input_file.id) == b"hello"
+    assert filelike.content.closed
+    assert dir_content.content_list == []
+
+
+@pytest.mark.asyncio
+async def test_dir_content_upload_fs():
+    client = MockedUploadClient()
+    dir_content = DirContentUpload(client, "entity")
+    fs = FileSystemOperationsWritable(vfs.root(vfs.DirLike("upload", dir_content)))
+
+    upload_dir = await fs.lookup(pyfuse3.ROOT_INODE, b"upload")
+    fi, attrs = await fs.create(
+        upload_dir.st_ino, b"file.txt", 0o644, os.O_WRONLY, None  # type: ignore
+    )
+
+    # a file with the same name is refused while the first one is written
+    with pytest.raises(pyfuse3.FUSEError) as e:
+        await fs.create(
+            upload_dir.st_ino, b"file.txt", 0o644, os.O_WRONLY, None  # type: ignore
+        )
+
+    assert e.value.errno == errno.EEXIST
+
+    await fs.write(fi.fh, 0, b"hello")
+
+    assert (await fs.lookup(upload_dir.st_ino, b"file.txt")).st_ino == attrs.st_ino
+
+    await fs.release(fi.fh)
+
+    [(_, input_file)] = client.sent
+    assert client.get_uploaded(input_file.id) == b"hello"
+
+    # the uploaded file is removed from the folder
+    assert dir_content.content_list == []
+    assert fs.inodes.get_item_by_inode(attrs.st_ino) is None
+    assert fs.inodes.get_items_by_parent(upload_dir.st_ino) == []
+
+    with pytest.raises(pyfuse3.FUSEError) as e:
+        await fs.lookup(upload_dir.st_ino, b"file.txt")
+
+    assert e.value.errno == errno.ENOENT
+
+    # a file that was created without writing is removed without uploading
+    fi, attrs = await fs.create(
+        upload_dir.st_ino, b"empty.txt", 0o644, os.O_WRONLY, None  # type: ignore
+    )
+    [filelike] = dir_content.content_list
+
+    await fs.release(fi.fh)
+
+    assert filelike.content.closed
+    assert dir_content.content_list == []
+    assert fs.inodes.get_item_by_inode(attrs.st_ino) is None
+    assert len(client.sent) == 1
+
+
+@pytest.mark.asyncio
+async def test_uploader_error_cancels_workers():
+    class FailingPartClient(MockedUploadClient):
+        async def save_file_part(self, file_id, part, total_parts, data, *, big):
+            if part == 0:
+                raise RuntimeError("save_file_part failed")
+
+            await asyncio.sleep(0.01)
+            return await super().save_file_part(
+                file_id, part, total_parts, data, big=big
+            )
+
+    client = FailingPartClient()
+    uploader = FileUploader(client, workers=3)
+    data = os.urandom(UPLOAD_PART_SIZE * 10)
+
+    async def read_part(offset: int, size: int):
+        return data[offset : offset + size]
+
+    with pytest.raises(RuntimeError):
+        await uploader.upload(read_part, len(data), "file.bin")
+
+    sent_parts = sum(len(parts) for parts in client.parts.values())
+    await asyncio.sleep(0.05)
+
+    # nothing is sent after the upload failed
+    assert sum(len(parts) for parts in client.parts.values()) == sent_parts
+    assert sent_parts < 9
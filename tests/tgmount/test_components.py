@@ -1,3 +1,4 @@
+import asyncio
 import os
 import random
 from dataclasses import asdict, dataclass, field
@@ -14,7 +15,9 @@ from tgmount import fs, vfs
 from tgmount.config.types import Config
 
 from tgmount.error import TgmountError
-from tgmount.tgmount.vfs_tree import VfsTree, VfsTreeDir
+from tgmount.tgmount.vfs_tree import TreeListener, VfsTree, VfsTreeDir
+from tgmount.tgmount.vfs_tree_types import TreeEventNewDirs, TreeEventRemovedDirs
+from tgmount.tgmount.wrappers.wrapper_exclude_empty_dirs import WrapperEmpty
 
 from ..config.fixtures import config_from_file
 
@@ -89,3 +92,197 @@ async def test_vfs_tree2():
     #     ProducerConfig(message_source=source, factory=factory, filters=[]),
     # )
     # await root_dir.produce()
+
+
+@pytest.mark.asyncio
+async def test_vfs_tree_content():
+    tree = VfsTree()
+    root_dir = await tree.create_dir("/")
+
+    file1 = vfs.text_file("file1.txt", "file1")
+    file2 = vfs.text_file("file2.txt", "file2")
+    file3 = vfs.text_file("file3.txt", "file3")
+
+    await root_dir.put_content([file1, file2, file3])
+
+    file2_edited = vfs.text_file("file2.txt", "file2 edited")
+
+    # edited items keep their position
+    await root_dir.update_content({"file2.txt": file2_edited})
+
+    assert await root_dir.get_dir_content_items() == [file1, file2_edited, file3]
+
+    # the replaced item is not in the dir anymore
+    await root_dir.remove_content(file2)
+
+    assert await root_dir.get_dir_content_items() == [file1, file2_edited, file3]
+
+    await root_dir.remove_content(file2_edited)
+
+    assert await root_dir.get_dir_content_items() == [file1, file3]
+
+    # renamed items are moved to the end under the new name
+    file1_renamed = vfs.text_file("file1_renamed.txt", "file1")
+
+    await root_dir.update_content({"file1.txt": file1_renamed})
+
+    assert await root_dir.get_dir_content_items() == [file3, file1_renamed]
+
+    await root_dir.remove_content(file1_renamed)
+    await root_dir.put_content(file1)
+
+    assert await root_dir.get_dir_content_items() == [file3, file1]
+
+    # an item renamed to the name of another one replaces it
+    file3_renamed = vfs.text_file("file1.txt", "file3")
+
+    await root_dir.update_content({"file3.txt": file3_renamed})
+
+    assert await root_dir.get_dir_content_items() == [file3_renamed]
+
+    # refused removals don't notify
+    listener = TreeListener(tree)
+
+    async with listener:
+        await root_dir.remove_content(file2)
+
+    assert listener.events == []
+
+
+@pytest.mark.asyncio
+async def test_vfs_tree_dir_content_snapshot():
+    tree = VfsTree()
+    root_dir = await tree.create_dir("/")
+    subdir = await root_dir.create_dir("/subdir")
+
+    await subdir.put_content(vfs.text_file("file1.txt", "file1"))
+
+    root_content = await tree._get_dir_content("/")
+    subdir_content = await tree._get_dir_content("/subdir")
+
+    # listings are reused until the dir changes
+    assert await tree._get_dir_content("/") is root_content
+    assert await tree._get_dir_content("/subdir") is subdir_content
+
+    await subdir.put_content(vfs.text_file("file2.txt", "file2"))
+
+    assert await tree._get_dir_content("/") is root_content
+    assert await tree._get_dir_content("/subdir") is not subdir_content
+
+    assert {
+        item.name
+        for item in await vfs.dir_content_read(await tree._get_dir_content("/subdir"))
+    } == {"file1.txt", "file2.txt"}
+
+    await root_dir.create_dir("/subdir2")
+
+    assert await tree._get_dir_content("/") is not root_content
+
+
+@pytest.mark.asyncio
+async def test_vfs_tree_links():
+    tree = VfsTree()
+    root_dir = await tree.create_dir("/")
+    subdir = await root_dir.create_dir("/subdir")
+    subsubdir = await subdir.create_dir("/subsubdir")
+    subdir2 = await root_dir.create_dir("/subdir2")
+
+    assert await subsubdir.get_parent() is subdir
+    assert await subdir.get_parent() is root_dir
+    assert await root_dir.get_parent() is tree
+
+    assert await tree.get_parents(subsubdir) == [subdir, root_dir, tree]
+    assert await tree.get_subdirs("/") == [subdir, subdir2]
+    assert await tree.get_subdirs("/", recursive=True) == [subdir, subsubdir, subdir2]
+
+    updates = []
+
+    async def on_update(sender, events):
+        updates.extend(events)
+
+    tree.subscribe(on_update)
+
+    await tree.remove_dir("/subdir")
+
+    assert await root_dir.get_subdirs() == [subdir2]
+    assert not await tree.exists("/subdir/subsubdir")
+    assert len(updates) == 1
+
+
+@pytest.mark.asyncio
+async def test_vfs_tree_lazy_producer():
+    tree = VfsTree(lazy=True)
+    root_dir = await tree.create_dir("/")
+    root_dir.add_wrapper(WrapperEmpty(root_dir))
+
+    subdir = tree.VfsTreeDir(tree, "/subdir")
+
+    produced = []
+
+    async def produce():
+        produced.append(subdir.path)
+
+        await subdir.put_content(vfs.text_file("file1.txt", "file1"))
+        await subdir.create_dir("/subsubdir")
+
+        # reads made by the producer don't wait for it
+        await vfs.dir_content_read(await subdir.get_dir_content())
+
+    subdir.set_lazy_producer(produce)
+    await tree.put_dir(subdir)
+
+    assert not subdir.is_produced
+    assert produced == []
+
+    # listing the parent doesn't produce the subdir which is shown until it's read
+    assert [
+        item.name
+        for item in await vfs.dir_content_read(await root_dir.get_dir_content())
+    ] == ["subdir"]
+
+    assert produced == []
+
+    listings = await asyncio.gather(
+        vfs.dir_content_read(await subdir.get_dir_content()),
+        vfs.dir_content_read(await subdir.get_dir_content()),
+    )
+
+    assert produced == ["/subdir"]
+    assert subdir.is_produced
+
+    for listing in listings:
+        assert [item.name for item in listing] == ["file1.txt", "subsubdir"]
+
+
+@pytest.mark.asyncio
+async def test_vfs_tree_lazy_producer_empty():
+    tree = VfsTree(lazy=True)
+    root_dir = await tree.create_dir("/")
+    wrapper = WrapperEmpty(root_dir)
+    root_dir.add_wrapper(wrapper)
+
+    subdir = tree.VfsTreeDir(tree, "/subdir")
+
+    async def produce():
+        pass
+
+    subdir.set_lazy_producer(produce)
+
+    listener = TreeListener(tree)
+
+    async with listener:
+        await tree.put_dir(subdir)
+
+        # the dir is shown until it's produced
+        assert listener.events == [
+            TreeEventNewDirs(sender=root_dir, new_dirs=["/subdir"])
+        ]
+
+        await vfs.dir_content_read(await subdir.get_dir_content())
+
+    # and is removed if the producer put nothing
+    assert listener.events[1:] == [
+        TreeEventRemovedDirs(sender=root_dir, removed_dirs=["/subdir"])
+    ]
+    assert wrapper._wrapped_nonempty_dir_subdirs == set()
+    assert await vfs.dir_content_read(await root_dir.get_dir_content()) == []
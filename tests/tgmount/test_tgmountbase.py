@@ -0,0 +1,47 @@
+import asyncio
+import logging
+
+import pytest
+
+from tgmount.tgmount.tgmountbase import TgmountBase
+
+
+class GatheringTgmountBase(TgmountBase):
+    def __init__(self, fail=False) -> None:
+        super().__init__(client=None, resources=None, root_config=None)  # type: ignore
+        self.processed = []
+        self.fail = fail
+
+    async def _process_events(self, pending_events):
+        if self.fail:
+            raise RuntimeError("processing failed")
+
+        self.processed.append(pending_events)
+
+
+@pytest.mark.asyncio
+async def test_tgmountbase_close_flushes_events():
+    tgm = GatheringTgmountBase()
+    tgm.set_update_window(100)
+
+    await tgm._on_event(1, "event1")  # type: ignore
+    await tgm._on_event(1, "event2")  # type: ignore
+
+    assert tgm.processed == []
+
+    await tgm.close()
+
+    assert tgm.processed == [[(1, "event1"), (1, "event2")]]
+    assert tgm._flush_task is None
+
+
+@pytest.mark.asyncio
+async def test_tgmountbase_flush_error_logged(caplog):
+    tgm = GatheringTgmountBase(fail=True)
+    tgm.set_update_window(0.01)
+
+    with caplog.at_level(logging.ERROR):
+        await tgm._on_event(1, "event1")  # type: ignore
+        await asyncio.sleep(0.05)
+
+    assert "processing failed" in caplog.text
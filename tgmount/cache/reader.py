@@ -1,6 +1,7 @@
 from collections import defaultdict
 from datetime import datetime
 import logging
+from tgmount.tgclient.source.util import join_blocks
 from tgmount.util import none_fallback
 from tgmount.util.func import snd
 from .types import (
@@ -52,10 +53,10 @@ class CacheBlockReaderWriter(CacheBlockReaderWriterBaseProto):
         """Get block ids for the range"""
 
         start = offset
-        end = offset + limit
+        end = offset + max(limit, 1)
 
         start_block_number = start // self._blocks_storage.block_size
-        end_block_number = end // self._blocks_storage.block_size
+        end_block_number = (end - 1) // self._blocks_storage.block_size
 
         return list(range(start_block_number, end_block_number + 1))
 
@@ -71,15 +72,15 @@ class CacheBlockReaderWriter(CacheBlockReaderWriterBaseProto):
 
         start = offset
         start_pos = start % self._blocks_storage.block_size
-        result = b""
+        blocks = []
 
         for block_number in self.range_blocks(offset, limit):
             if block := await self._blocks_storage.get(block_number):
-                result += block
+                blocks.append(block)
             else:
                 return None
 
-        return result[start_pos : start_pos + limit]
+        return join_blocks(blocks, start_pos, limit)
 
     async def fetch_block(self, range_fetcher: RangeFetcher, block_number: int):
         return await range_fetcher(
@@ -97,12 +98,9 @@ class CacheBlockReaderWriter(CacheBlockReaderWriterBaseProto):
         """Returns bytes for the range fetching and storing missing blocks"""
 
         start = offset
-        end = offset + limit
-
         start_pos = start % self._blocks_storage.block_size
-        end_pos = end % self._blocks_storage.block_size
 
-        result = b""
+        blocks = []
 
         for block_number in self.range_blocks(offset, limit):
             if block := await self.get_block(block_number):
@@ -120,7 +118,7 @@ class CacheBlockReaderWriter(CacheBlockReaderWriterBaseProto):
 
             self._blocks_read_count[block_number] += 1
 
-            result += block
+            blocks.append(block)
 
         self._last_read_time = datetime.now()
-        return result[start_pos : start_pos + limit]
+        return join_blocks(blocks, start_pos, limit)
@@ -6,3 +6,4 @@ from .mount import mount, add_mount_arguments
 from .logger import logger
 from .validate import validate, add_validate_arguments
 from .download import download, add_download_arguments
+from .upload import upload, add_upload_arguments
@@ -1,13 +1,16 @@
+import asyncio
 from argparse import ArgumentParser, Namespace
+from dataclasses import dataclass
 import os
+from typing import Callable, Optional
 
-from tgmount import util
+from tgmount import util, vfs
 from tqdm import tqdm
 from tqdm.contrib.logging import logging_redirect_tqdm
-import aiofiles
 from tgmount.tgclient.client import TgmountTelegramClient
 from tgmount.tgclient.files_source import TelegramFilesSource
 from tgmount.tgclient.guards import MessageDownloadable, MessageWithFilename
+from tgmount.tgclient.streaming import download_file_content, get_resume_offset
 from tgmount.tgmount.tgmount_builder import MyFileFactoryDefault
 from .logger import logger
 
@@ -35,6 +38,43 @@ def add_download_arguments(command_download: ArgumentParser):
         default=256 * 1024,
         help="How much data to fetch per request",
     )
+    command_download.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        dest="jobs",
+        default=1,
+        help="Number of files to download simultaneously",
+    )
+    command_download.add_argument(
+        "--max-in-flight",
+        type=util.get_bytes_count,
+        dest="max_in_flight",
+        default="16MB",
+        help="Maximum amount of fetched data held in memory shared by all the jobs",
+    )
+    command_download.add_argument(
+        "--skip-same-size",
+        action="store_true",
+        default=False,
+        dest="skip_same_size",
+        help="Skip files that already exist and have the same size",
+    )
+    command_download.add_argument(
+        "--resume",
+        action="store_true",
+        default=False,
+        dest="resume",
+        help="Continue downloading into existing partial files",
+    )
+
+
+@dataclass
+class DownloadJob:
+    message_id: int
+    content: vfs.FileContentProto
+    output_file_path: str
+    offset: int = 0
 
 
 async def download(
@@ -50,12 +90,14 @@ async def download(
         ids=args.ids,
     )
 
+    jobs: list[DownloadJob] = []
+    output_paths: set[str] = set()
+
     for m in messages:
         if not MessageDownloadable.guard(m):
             logger.warning(f"{m.id} is not a downloadable message.")
             continue
 
-        total_fetched = 0
         filelike = await factory.file(m)
         file_size = filelike.content.size
 
@@ -64,34 +106,94 @@ async def download(
         else:
             output_file_path = os.path.join(args.output_dir, filelike.name)
 
-        telegram_file = await filelike.content.open_func()
-        output_file = await aiofiles.open(output_file_path, "wb")
-
-        tq = tqdm(
-            total=file_size,
-            desc=output_file_path,
-            unit="B",
-            unit_divisor=1024,
-            unit_scale=True,
-            # leave=True,
-            ascii=True,
+        if output_file_path in output_paths:
+            logger.warning(
+                f"Skipping {m.id}. {output_file_path} is already the destination of another message."
+            )
+            continue
+
+        output_paths.add(output_file_path)
+
+        if (
+            args.skip_same_size
+            and os.path.exists(output_file_path)
+            and os.path.getsize(output_file_path) == file_size
+        ):
+            logger.info(f"Skipping {output_file_path}. Already downloaded.")
+            continue
+
+        offset = get_resume_offset(output_file_path, file_size) if args.resume else 0
+
+        jobs.append(
+            DownloadJob(
+                message_id=m.id,
+                content=filelike.content,
+                output_file_path=output_file_path,
+                offset=offset,
+            )
         )
 
-        while total_fetched < file_size:
-            request_size = min(args.request_size, file_size - total_fetched)
+    if len(jobs) == 0:
+        return
+
+    tq = tqdm(
+        total=sum(job.content.size for job in jobs),
+        initial=sum(job.offset for job in jobs),
+        desc=f"{len(jobs)} files",
+        unit="B",
+        unit_divisor=1024,
+        unit_scale=True,
+        ascii=True,
+    )
 
-            block = await filelike.content.read_func(
-                telegram_file, total_fetched, request_size
+    try:
+        with logging_redirect_tqdm():
+            await download_jobs(
+                jobs,
+                jobs_number=args.jobs,
+                request_size=args.request_size,
+                max_in_flight=args.max_in_flight,
+                on_progress=tq.update,
             )
+    finally:
+        tq.close()
 
-            await output_file.write(block)
 
-            total_fetched += len(block)
-            # print(".", end="", flush=True)
-            # print(f"{file_size-total_fetched},", end="", flush=True)
-            tq.update(len(block))
+async def download_jobs(
+    jobs: list[DownloadJob],
+    *,
+    jobs_number: int,
+    request_size: int,
+    max_in_flight: int,
+    on_progress: Optional[Callable[[int], None]] = None,
+):
+    """Downloads `jobs` running `jobs_number` of them simultaneously. If a job fails the other jobs are cancelled and the error is raised."""
+    jobs_number = max(1, jobs_number)
+
+    # the budget of bytes in flight is split between the simultaneous jobs
+    queue_size = max(1, max_in_flight // (jobs_number * request_size))
+    semaphore = asyncio.Semaphore(jobs_number)
+
+    async def _download(job: DownloadJob):
+        async with semaphore:
+            logger.debug(f"Downloading {job.message_id} into {job.output_file_path}")
+
+            await download_file_content(
+                job.content,
+                job.output_file_path,
+                offset=job.offset,
+                request_size=request_size,
+                queue_size=queue_size,
+                on_progress=on_progress,
+            )
 
-        tq.close()
+    tasks = [asyncio.ensure_future(_download(job)) for job in jobs]
+
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
 
-        await output_file.close()
-        await filelike.content.close_func(telegram_file)
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
@@ -12,7 +12,7 @@ from tgmount.tgclient.fetcher import TelegramMessagesFetcher
 from tgmount.tgmount.tgmount_builder import TgmountBuilder
 from tgmount.tgmount.tgmount_providers import ProducersProvider
 from tgmount.tgmount.validator import ConfigValidator
-from tgmount.util import int_or_string, map_none, yes
+from tgmount.util import get_bytes_count, int_or_string, map_none, yes
 
 from .logger import logger
 
@@ -82,6 +82,57 @@ def add_mount_arguments(command_mount: ArgumentParser):
     )
 
     command_mount.add_argument("--min-tasks", default=10, type=int, dest="min_tasks")
+    command_mount.add_argument(
+        "--max-tasks",
+        type=int,
+        dest="max_tasks",
+        help="Maximum number of FUSE requests processed simultaneously",
+    )
+
+    command_mount.add_argument(
+        "--entry-timeout",
+        type=float,
+        dest="entry_timeout",
+        help="Seconds the kernel caches file names",
+    )
+    command_mount.add_argument(
+        "--attr-timeout",
+        type=float,
+        dest="attr_timeout",
+        help="Seconds the kernel caches file attributes",
+    )
+    command_mount.add_argument(
+        "--update-window",
+        type=float,
+        dest="update_window",
+        help="Seconds telegram updates are gathered before being applied together",
+    )
+    command_mount.add_argument(
+        "--update-batch-size",
+        type=int,
+        dest="update_batch_size",
+        help="Number of gathered telegram updates that are applied without waiting for the window to end",
+    )
+    command_mount.add_argument(
+        "--direct-io",
+        type=str,
+        action="append",
+        dest="direct_io_dirs",
+        help="Folder inside the mount whose files are read bypassing the kernel page cache. Can be repeated",
+    )
+    command_mount.add_argument(
+        "--max-read",
+        type=get_bytes_count,
+        dest="max_read",
+        help="Maximum size of a single read request",
+    )
+    command_mount.add_argument(
+        "--lazy",
+        default=False,
+        action="store_true",
+        dest="lazy",
+        help="Produce the content of a folder when it is accessed for the first time",
+    )
 
 
 async def mount(
@@ -194,4 +245,12 @@ async def mount(
         mount_dir=args.mount_dir,
         debug_fuse=args.debug_fuse,
         min_tasks=args.min_tasks,
+        max_tasks=args.max_tasks,
+        entry_timeout=args.entry_timeout,
+        attr_timeout=args.attr_timeout,
+        update_window=args.update_window,
+        update_batch_size=args.update_batch_size,
+        direct_io_dirs=args.direct_io_dirs,
+        max_read=args.max_read,
+        lazy=args.lazy,
     )
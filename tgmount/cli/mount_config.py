@@ -12,6 +12,7 @@ from tgmount.controlserver import ControlServer
 from tgmount.tgmount.tgmount_builder import TgmountBuilder
 from tgmount.error import TgmountError
 from tgmount.tgmount.validator import ConfigValidator
+from tgmount.util import get_bytes_count
 from .logger import logger
 
 
@@ -25,6 +26,57 @@ def add_mount_config_arguments(command_mount: ArgumentParser):
     )
 
     command_mount.add_argument("--min-tasks", default=10, type=int, dest="min_tasks")
+    command_mount.add_argument(
+        "--max-tasks",
+        type=int,
+        dest="max_tasks",
+        help="Maximum number of FUSE requests processed simultaneously",
+    )
+
+    command_mount.add_argument(
+        "--entry-timeout",
+        type=float,
+        dest="entry_timeout",
+        help="Seconds the kernel caches file names",
+    )
+    command_mount.add_argument(
+        "--attr-timeout",
+        type=float,
+        dest="attr_timeout",
+        help="Seconds the kernel caches file attributes",
+    )
+    command_mount.add_argument(
+        "--update-window",
+        type=float,
+        dest="update_window",
+        help="Seconds telegram updates are gathered before being applied together",
+    )
+    command_mount.add_argument(
+        "--update-batch-size",
+        type=int,
+        dest="update_batch_size",
+        help="Number of gathered telegram updates that are applied without waiting for the window to end",
+    )
+    command_mount.add_argument(
+        "--direct-io",
+        type=str,
+        action="append",
+        dest="direct_io_dirs",
+        help="Folder inside the mount whose files are read bypassing the kernel page cache. Can be repeated",
+    )
+    command_mount.add_argument(
+        "--max-read",
+        type=get_bytes_count,
+        dest="max_read",
+        help="Maximum size of a single read request",
+    )
+    command_mount.add_argument(
+        "--lazy",
+        default=False,
+        action="store_true",
+        dest="lazy",
+        help="Produce the content of a folder when it is accessed for the first time",
+    )
 
 
 async def mount_config(
@@ -36,6 +88,14 @@ async def mount_config(
     debug_fuse=False,
     run_server=False,
     min_tasks=10,
+    max_tasks: Optional[int] = None,
+    entry_timeout: Optional[float] = None,
+    attr_timeout: Optional[float] = None,
+    update_window: Optional[float] = None,
+    update_batch_size: Optional[int] = None,
+    direct_io_dirs: Optional[list[str]] = None,
+    max_read: Optional[int] = None,
+    lazy: bool = False,
 ):
     builder = TgmountBuilder()
     validator = ConfigValidator(builder)
@@ -88,7 +148,17 @@ async def mount_config(
         server_task = asyncio.create_task(server_cor)
 
         mount_cor = tgm.mount(
-            mount_dir=mount_dir, debug_fuse=debug_fuse, min_tasks=min_tasks
+            mount_dir=mount_dir,
+            debug_fuse=debug_fuse,
+            min_tasks=min_tasks,
+            max_tasks=max_tasks,
+            entry_timeout=entry_timeout,
+            attr_timeout=attr_timeout,
+            update_window=update_window,
+            update_batch_size=update_batch_size,
+            direct_io_dirs=direct_io_dirs,
+            max_read=max_read,
+            lazy=lazy,
         )
         mount_task = asyncio.create_task(mount_cor)
 
@@ -101,4 +171,12 @@ async def mount_config(
             mount_dir=mount_dir,
             debug_fuse=debug_fuse,
             min_tasks=min_tasks,
+            max_tasks=max_tasks,
+            entry_timeout=entry_timeout,
+            attr_timeout=attr_timeout,
+            update_window=update_window,
+            update_batch_size=update_batch_size,
+            direct_io_dirs=direct_io_dirs,
+            max_read=max_read,
+            lazy=lazy,
         )
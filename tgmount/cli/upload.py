@@ -1,6 +1,65 @@
-def add_upload_args():
-    pass
+import os
+from argparse import ArgumentParser, Namespace
 
+from tqdm import tqdm
+from tqdm.contrib.logging import logging_redirect_tqdm
 
-async def upload():
-    pass
+from tgmount import util
+from tgmount.tgclient.client import TgmountTelegramClient
+from tgmount.tgclient.uploader import DEFAULT_UPLOAD_WORKERS, FileUploader
+from .logger import logger
+
+
+def add_upload_arguments(command_upload: ArgumentParser):
+    command_upload.add_argument(
+        "entity", type=util.int_or_string, help="Entity to upload into"
+    )
+    command_upload.add_argument("files", type=str, nargs="+", help="Files to upload")
+    command_upload.add_argument(
+        "--workers",
+        "-j",
+        type=int,
+        dest="workers",
+        default=DEFAULT_UPLOAD_WORKERS,
+        help="Number of file parts uploaded simultaneously",
+    )
+
+
+async def upload(
+    client: TgmountTelegramClient,
+    args: Namespace,
+):
+    uploader = FileUploader(client, workers=args.workers)
+
+    for file_path in args.files:
+        if not os.path.isfile(file_path):
+            logger.warning(f"{file_path} is not a file.")
+            continue
+
+        with open(file_path, "rb") as f:
+            fd = f.fileno()
+            file_size = os.fstat(fd).st_size
+
+            async def read_part(offset: int, size: int) -> bytes:
+                return os.pread(fd, size, offset)
+
+            tq = tqdm(
+                total=file_size,
+                desc=os.path.basename(file_path),
+                unit="B",
+                unit_divisor=1024,
+                unit_scale=True,
+                ascii=True,
+            )
+
+            with logging_redirect_tqdm():
+                input_file = await uploader.upload(
+                    read_part,
+                    file_size,
+                    os.path.basename(file_path),
+                    on_progress=tq.update,
+                )
+
+            tq.close()
+
+        await client.send_file(args.entity, input_file, force_document=True)
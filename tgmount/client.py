@@ -42,6 +42,7 @@ def get_parser():
     command_validate = commands_subparsers.add_parser("validate")
     # command_stats = commands_subparsers.add_parser("stats")
     command_download = commands_subparsers.add_parser("download")
+    command_upload = commands_subparsers.add_parser("upload")
 
     command_list = commands_subparsers.add_parser("list")
     command_list_subparsers = command_list.add_subparsers(dest="list_subcommand")
@@ -55,6 +56,7 @@ def get_parser():
     cli.add_mount_arguments(command_mount_args)
     cli.add_validate_arguments(command_validate)
     cli.add_download_arguments(command_download)
+    cli.add_upload_arguments(command_upload)
 
     return parser, command_list
 
@@ -99,6 +101,14 @@ async def client_main(loop):
             mount_dir=args.mount_dir,
             debug_fuse=args.debug_fuse,
             min_tasks=args.min_tasks,
+            max_tasks=args.max_tasks,
+            entry_timeout=args.entry_timeout,
+            attr_timeout=args.attr_timeout,
+            update_window=args.update_window,
+            update_batch_size=args.update_batch_size,
+            direct_io_dirs=args.direct_io_dirs,
+            max_read=args.max_read,
+            lazy=args.lazy,
             # use_ipv6=args.use_ipv6,
         )
     elif args.command == "mount":
@@ -127,6 +137,12 @@ async def client_main(loop):
             session, api_id, api_hash, loop=loop, use_ipv6=args.use_ipv6
         ) as client:
             await cli.download(client, args)
+    elif args.command == "upload":
+        session, api_id, api_hash = get_tgapp_and_session(args)
+        async with get_client(
+            session, api_id, api_hash, loop=loop, use_ipv6=args.use_ipv6
+        ) as client:
+            await cli.upload(client, args)
 
     else:
         parser.print_help()
@@ -2,6 +2,7 @@ from .operations import FileSystemOperations
 from .update import FileSystemOperationsUpdatable, FileSystemOperationsUpdate
 from .writable import FileSystemOperationsWritable
 from .util import exception_handler
+from .metrics import FileSystemMetrics
 from .logger import logger
 
 
@@ -29,7 +29,7 @@ class FileSystemHandles(Generic[T]):
         return self._fh_by_item.get(item)
 
     def open_fh(self, item: T, data=None):
-        self.logger.debug(f"open_fh({item})")
+        self.logger.debug("open_fh(%s)", item)
 
         fh = self._new_fh()
         self._fhs[fh] = item, data
@@ -50,7 +50,7 @@ class FileSystemHandles(Generic[T]):
         return item
 
     def release_fh(self, fh: int):
-        self.logger.debug(f"release_fh({fh})")
+        self.logger.debug("release_fh(%s)", fh)
 
         if fh in self._fhs:
             item, handle = self._fhs[fh]
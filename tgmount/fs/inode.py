@@ -1,9 +1,11 @@
+import hashlib
 import logging
 import os
-from dataclasses import dataclass
 from typing import (
     Dict,
     Generic,
+    Hashable,
+    Mapping,
     Optional,
     TypeVar,
     overload,
@@ -19,32 +21,47 @@ from .logger import logger
 T = TypeVar("T")
 
 
-@dataclass
 class RegistryItem(Generic[T]):
-    inode: int
-    name: bytes
-    data: T
-    parent_inode: int
+    __slots__ = ("inode", "name", "data", "parent_inode")
+
+    def __init__(self, inode: int, name: bytes, data: T, parent_inode: int) -> None:
+        self.inode = inode
+        self.name = name
+        self.data = data
+        self.parent_inode = parent_inode
 
     def __hash__(self) -> int:
         return self.inode
 
+    def __repr__(self) -> str:
+        return f"RegistryItem(inode={self.inode}, name={self.name}, data={self.data}, parent_inode={self.parent_inode})"
+
 
-@dataclass
 class RegistryRoot(Generic[T]):
-    inode: int
-    data: T
+    __slots__ = ("inode", "data")
+
     name = b"<root>"
 
+    def __init__(self, inode: int, data: T) -> None:
+        self.inode = inode
+        self.data = data
+
     def __hash__(self) -> int:
         return self.inode
 
+    def __repr__(self) -> str:
+        return f"RegistryRoot(inode={self.inode}, data={self.data})"
+
 
 InodesRegistryItem = RegistryRoot[T] | RegistryItem[T]
 
 
 class InodesRegistry(Generic[T]):
     ROOT_INODE: int = pyfuse3.ROOT_INODE
+    KEY_INODE_MASK: int = (1 << 63) - 1
+    """ Inodes derived from keys are kept in 63 bits """
+    STABLE_INODES_MAX: int = 100_000
+    """ Number of remembered inodes of evicted items. The oldest ones are dropped first """
     logger = logger.getChild(f"InodesRegistry")
     # logger.setLevel(logging.DEBUG)
 
@@ -60,8 +77,32 @@ class InodesRegistry(Generic[T]):
             # InodesRegistry.ROOT_INODE: root_item
         }
 
+        self._children: Dict[int, Dict[bytes, RegistryItem[T]]] = {}
+        """ Children of every directory by name in the order they were added """
+
+        self._path_cache: Dict[tuple[bytes, ...], int] = {}
+        """ Inodes of the resolved paths relative to the root """
+
+        self._inode_paths: Dict[int, tuple[bytes, ...]] = {}
+        """ Reverse of `_path_cache` used for invalidation """
+
         self._dir_content_read: set[int] = set()
 
+        self._lookup_counts: Dict[int, int] = {}
+        """ Number of references the kernel holds for an inode """
+
+        self._referenced_descendants: Dict[int, int] = {}
+        """ Number of descendants of a directory referenced by the kernel """
+
+        self._evicted_names: Dict[int, set[bytes]] = {}
+        """ Names of the evicted children of the directories whose content was read """
+
+        self._stable_inodes: Dict[tuple[int, bytes], int] = {}
+        """ Inodes of the evicted items by parent inode and name so they get the same inode when they are added back """
+
+        self._keyed_inodes: set[int] = set()
+        """ Inodes derived from keys. They are derived again so they are not kept in `_stable_inodes` """
+
     def set_content_read(self, inode: int | InodesRegistryItem[T]):
         self._dir_content_read.add(self.get_inode(inode))
 
@@ -140,7 +181,6 @@ class InodesRegistry(Generic[T]):
     ) -> set[RegistryItem[T]] | None:
 
         inode = InodesRegistry.get_inode(inode_or_item)
-        removed = set()
         item = self.get_item_by_inode(inode)
 
         if item is None:
@@ -149,35 +189,161 @@ class InodesRegistry(Generic[T]):
             )
             return None
 
-        if (subitems := self.get_item_children_inodes_recursively(item)) is not None:
-            for _item in subitems:
-                removed.add(_item)
-                self._dir_content_read -= {_item}
-                del self._inodes[_item.inode]
+        if isinstance(item, RegistryRoot):
+            raise ValueError("You cannot remove root")
+
+        return self._remove_subtree(item, keep_inodes=False)
+
+    def evict_item(self, inode_or_item: int | RegistryItem[T]):
+        """Removes the item and its children which are not referenced by the kernel anymore. The parent directory stays read and remembers the name so the item can be added back on the next lookup. Evicted items get the same inodes when they are added back"""
+
+        item = self.get_item_by_inode(self.get_inode(inode_or_item))
+
+        if item is None or isinstance(item, RegistryRoot):
+            return None
+
+        removed = self._remove_subtree(item, keep_inodes=True)
 
+        if item.parent_inode in self._dir_content_read:
+            self._evicted_names.setdefault(item.parent_inode, set()).add(item.name)
+
+        return removed
+
+    def was_evicted(
+        self, name: bytes, parent_inode: int | InodesRegistryItem[T]
+    ) -> bool:
+        return name in self._evicted_names.get(self.get_inode(parent_inode), ())
+
+    def has_evicted_children(self, inode_or_item: int | InodesRegistryItem[T]) -> bool:
+        return bool(self._evicted_names.get(self.get_inode(inode_or_item)))
+
+    def discard_evicted(
+        self, inode_or_item: int | InodesRegistryItem[T], name: bytes | None = None
+    ):
+        """Forgets the evicted name or all the evicted children of the directory"""
+        inode = self.get_inode(inode_or_item)
+
+        if name is None:
+            self._evicted_names.pop(inode, None)
+        elif (names := self._evicted_names.get(inode)) is not None:
+            names.discard(name)
+
+            if not names:
+                del self._evicted_names[inode]
+
+    def _remove_subtree(
+        self, item: RegistryItem[T], keep_inodes: bool
+    ) -> set[RegistryItem[T]]:
+        removed = none_fallback(self.get_item_children_inodes_recursively(item), set())
         removed.add(item)
-        del self._inodes[item.inode]
-        self._dir_content_read -= {item.inode}
+
+        self._remove_from_parent(item)
+        self._update_referenced_descendants(item.parent_inode, -self._referenced(item))
+
+        for _item in removed:
+            self._dir_content_read.discard(_item.inode)
+            self._children.pop(_item.inode, None)
+            self._lookup_counts.pop(_item.inode, None)
+            self._referenced_descendants.pop(_item.inode, None)
+            self._evicted_names.pop(_item.inode, None)
+            self._invalidate_path(_item.inode)
+            del self._inodes[_item.inode]
+
+            if _item.inode in self._keyed_inodes:
+                self._keyed_inodes.discard(_item.inode)
+            elif keep_inodes:
+                self._keep_inode(_item)
+            else:
+                self._stable_inodes.pop((_item.parent_inode, _item.name), None)
+
         return removed
 
+    def _keep_inode(self, item: RegistryItem[T]):
+        self._stable_inodes[(item.parent_inode, item.name)] = item.inode
+
+        if len(self._stable_inodes) > self.STABLE_INODES_MAX:
+            del self._stable_inodes[next(iter(self._stable_inodes))]
+
+    def lookup(self, inode_or_item: int | InodesRegistryItem[T], count: int = 1):
+        """Increments the kernel lookup count"""
+        inode = self.get_inode(inode_or_item)
+        lookup_count = self._lookup_counts.get(inode, 0)
+
+        self._lookup_counts[inode] = lookup_count + count
+
+        if lookup_count == 0 and (item := self._inodes.get(inode)) is not None:
+            self._update_referenced_descendants(item.parent_inode, 1)
+
+    def forget(self, inode_or_item: int | InodesRegistryItem[T], count: int) -> bool:
+        """Decrements the kernel lookup count. Returns True if the inode is not referenced anymore"""
+        inode = self.get_inode(inode_or_item)
+        lookup_count = self._lookup_counts.get(inode, 0) - count
+
+        if lookup_count > 0:
+            self._lookup_counts[inode] = lookup_count
+            return False
+
+        if (
+            self._lookup_counts.pop(inode, None) is not None
+            and (item := self._inodes.get(inode)) is not None
+        ):
+            self._update_referenced_descendants(item.parent_inode, -1)
+
+        return True
+
+    def get_lookup_count(self, inode_or_item: int | InodesRegistryItem[T]) -> int:
+        return self._lookup_counts.get(self.get_inode(inode_or_item), 0)
+
+    def get_referenced_descendants(
+        self, inode_or_item: int | InodesRegistryItem[T]
+    ) -> int:
+        """Number of descendants of the directory referenced by the kernel"""
+        return self._referenced_descendants.get(self.get_inode(inode_or_item), 0)
+
+    def _referenced(self, item: RegistryItem[T]) -> int:
+        """Number of referenced items in the subtree of `item` including itself"""
+        return int(
+            item.inode in self._lookup_counts
+        ) + self._referenced_descendants.get(item.inode, 0)
+
+    def _update_referenced_descendants(self, parent_inode: int, count: int):
+        if count == 0:
+            return
+
+        inode: int | None = parent_inode
+
+        while inode is not None:
+            referenced = self._referenced_descendants.get(inode, 0) + count
+
+            if referenced > 0:
+                self._referenced_descendants[inode] = referenced
+            else:
+                self._referenced_descendants.pop(inode, None)
+
+            parent = self._inodes.get(inode)
+            inode = parent.parent_inode if parent is not None else None
+
+    def _remove_from_parent(self, item: RegistryItem[T]):
+        siblings = self._children.get(item.parent_inode)
+
+        if siblings is not None and siblings.get(item.name) is item:
+            del siblings[item.name]
+
     def get_item_children_inodes_recursively(
         self, inode_or_item: int | RegistryItem[T] | RegistryRoot[T]
     ) -> Optional[set[RegistryItem[T]]]:
-        result = set()
-        children = self.get_items_by_parent(inode_or_item)
+        inode = self.get_inode(inode_or_item)
 
-        if children is None:
+        if not self.is_inode_exists(inode):
             return None
 
-        result = result.union(set(item for item in children))
-
-        for subitem in children:
-            _inodes = self.get_item_children_inodes_recursively(subitem)
-
-            if _inodes is None:
-                continue
+        result = set()
+        stack = [inode]
 
-            result = result.union(_inodes)
+        while stack:
+            for child in self._get_children(stack.pop()).values():
+                result.add(child)
+                stack.append(child.inode)
 
         return result
 
@@ -191,13 +357,43 @@ class InodesRegistry(Generic[T]):
         data: T,
         parent_inode: int | RegistryItem[T] = ROOT_INODE,
         inode: int | None = None,
+        key: Hashable | None = None,
     ) -> RegistryItem[T]:
+        """Adds the item or replaces the one with `inode`. If `key` is passed the new inode is derived from it so it is the same every time the item is added"""
 
-        inode = none_fallback(inode, self._new_inode())
+        parent_inode = self.get_inode(parent_inode)
 
-        item = self._inodes[inode] = RegistryItem(
-            inode, name, data, self.get_inode(parent_inode)
-        )
+        if inode is None and key is not None:
+            inode = self._key_inode(key, name)
+            self._keyed_inodes.add(inode)
+        elif inode is None:
+            inode = self._stable_inodes.pop((parent_inode, name), None)
+
+            if inode is None or inode in self._inodes:
+                inode = self._new_inode()
+
+        # replacing an item keeps its position unless it was moved or renamed
+        if (old_item := self._inodes.get(inode)) is not None and (
+            old_item.parent_inode != parent_inode or old_item.name != name
+        ):
+            self._remove_from_parent(old_item)
+            self._invalidate_subtree_paths(old_item)
+
+            if old_item.parent_inode != parent_inode:
+                referenced = self._referenced(old_item)
+                self._update_referenced_descendants(old_item.parent_inode, -referenced)
+                self._update_referenced_descendants(parent_inode, referenced)
+
+        siblings = self._children.setdefault(parent_inode, {})
+
+        # an item with the same name gets shadowed
+        if (shadowed := siblings.get(name)) is not None and shadowed.inode != inode:
+            self._invalidate_subtree_paths(shadowed)
+
+        item = self._inodes[inode] = RegistryItem(inode, name, data, parent_inode)
+
+        siblings[name] = item
+        self.discard_evicted(parent_inode, name)
 
         return item
 
@@ -225,12 +421,7 @@ class InodesRegistry(Generic[T]):
         if parent_item is None:
             return
 
-        child_items = self.get_items_by_parent_dict(parent_inode)
-
-        # child_items_dict = self._items_dict_by_parent.get(parent_inode)
-
-        if child_items is None:
-            return
+        child_items = self._get_children(parent_inode)
 
         if name == b".":
             return parent_item
@@ -258,42 +449,52 @@ class InodesRegistry(Generic[T]):
         if not self.is_inode_exists(parent_inode):
             return
 
-        return [item for item in self.get_items() if item.parent_inode == parent_inode]
+        return list(self._get_children(parent_inode).values())
 
     def get_items_by_parent_dict(
         self,
         parent_inode: int | RegistryItem[T] = ROOT_INODE,
     ):
-        items = self.get_items_by_parent(parent_inode)
+        parent_inode = self.get_inode(parent_inode)
 
-        if items is None:
+        if not self.is_inode_exists(parent_inode):
             return
 
-        return {item.name: item for item in items}
+        return dict(self._get_children(parent_inode))
+
+    def _get_children(self, parent_inode: int) -> Mapping[bytes, RegistryItem[T]]:
+        return self._children.get(parent_inode, {})
 
     def get_item_path(
         self, inode: int | RegistryItem[T] | RegistryRoot[T]
     ) -> Optional[list[bytes]]:
         inode = self.get_inode(inode)
-        item = self.get_item_by_inode(inode)
-
-        if item is None:
-            return
 
-        if isinstance(item, RegistryRoot):
+        if inode == InodesRegistry.ROOT_INODE:
             return [b"/"]
 
-        parent_item = self.get_parent(item)
+        if (path := self._inode_paths.get(inode)) is not None:
+            return [b"/", *path]
 
-        if parent_item is None:
-            return
+        item = self._inodes.get(inode)
+        names = []
+
+        while item is not None:
+            names.append(item.name)
 
-        parent_path = self.get_item_path(parent_item)
+            if item.parent_inode == InodesRegistry.ROOT_INODE:
+                break
 
-        if parent_path is None:
+            item = self._inodes.get(item.parent_inode)
+
+        if item is None:
             return
 
-        return [*parent_path, item.name]
+        names.reverse()
+
+        self._cache_path(tuple(names), inode)
+
+        return [b"/", *names]
 
     def get_by_path(
         self,
@@ -303,8 +504,6 @@ class InodesRegistry(Generic[T]):
 
         if isinstance(path, str):
             path = str_to_bytes(path.split(os.path.sep))
-            if len(path) > 0 and path[0] == b"":
-                path = path[1:]
 
         parent_inode = self.get_inode(parent)
         parent_item = self.get_item_by_inode(parent_inode)
@@ -312,29 +511,50 @@ class InodesRegistry(Generic[T]):
         if parent_item is None:
             return
 
-        if path == b"" or path == [b""]:
+        if path == b"":
             return parent_item
 
-        if path == []:
-            return parent_item
+        names = tuple(name for name in path if name != b"" and name != b"/")
 
-        if path == [b"/"]:
+        if len(names) == 0:
             return parent_item
 
-        if path[0] == b"/":
-            path = path[1:]
+        # only paths from the root are cached
+        cacheable = parent_inode == InodesRegistry.ROOT_INODE and not (
+            b"." in names or b".." in names
+        )
+
+        if cacheable and (inode := self._path_cache.get(names)) is not None:
+            return self._inodes.get(inode)
 
-        [subitem_name, *rest] = path
+        item = parent_item
 
-        subitem = self.get_child_item_by_name(subitem_name, parent_item)
+        for name in names:
+            item = self.get_child_item_by_name(name, item)
 
-        if subitem is None:
-            return
+            if item is None:
+                return
 
-        if rest == []:
-            return subitem
+        if cacheable:
+            self._cache_path(names, item.inode)
 
-        return self.get_by_path(rest, subitem)
+        return item
+
+    def _cache_path(self, path: tuple[bytes, ...], inode: int):
+        self._path_cache[path] = inode
+        self._inode_paths[inode] = path
+
+    def _invalidate_path(self, inode: int):
+        if (path := self._inode_paths.pop(inode, None)) is not None:
+            self._path_cache.pop(path, None)
+
+    def _invalidate_subtree_paths(self, item: RegistryItem[T]):
+        self._invalidate_path(item.inode)
+
+        for child in none_fallback(
+            self.get_item_children_inodes_recursively(item), set()
+        ):
+            self._invalidate_path(child.inode)
 
     @overload
     @staticmethod
@@ -356,4 +576,26 @@ class InodesRegistry(Generic[T]):
         #     return self._last_inode
 
         self._last_inode += 1
+
+        # skip the inodes derived from keys
+        while self._last_inode in self._inodes:
+            self._last_inode += 1
+
         return self._last_inode
+
+    def _key_inode(self, key: Hashable, name: bytes) -> int:
+        """Hashes `repr(key)` so the key has to be built of values with a stable `repr`. The first item added with the key gets its hash. If the inode is taken the key is hashed again with the name and the attempt number, so the inodes of the following duplicates depend on their names rather than on how many items were added before them"""
+        attempt = 0
+
+        while True:
+            digest = hashlib.blake2b(
+                repr(key if attempt == 0 else (key, name, attempt)).encode("utf-8"),
+                digest_size=8,
+            ).digest()
+
+            inode = int.from_bytes(digest, "big") & self.KEY_INODE_MASK
+
+            if inode > self.ROOT_INODE and inode not in self._inodes:
+                return inode
+
+            attempt += 1
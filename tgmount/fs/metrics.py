@@ -0,0 +1,115 @@
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+""" Upper bounds of the latency histogram buckets in seconds. The last bucket takes everything slower """
+
+
+class OperationStats:
+    """Counters of a single FUSE operation"""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def started(self):
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def finished(self, duration: float, failed: bool):
+        self.in_flight -= 1
+        self.total_time += duration
+        self.max_time = max(self.max_time, duration)
+
+        if failed:
+            self.errors += 1
+
+        for idx, bound in enumerate(LATENCY_BUCKETS):
+            if duration <= bound:
+                self.histogram[idx] += 1
+                break
+        else:
+            self.histogram[-1] += 1
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "average_time": (
+                self.total_time / self.requests if self.requests > 0 else 0.0
+            ),
+            "max_time": self.max_time,
+            "histogram": list(self.histogram),
+        }
+
+
+class FileSystemMetrics:
+    """Counters and latency histograms per operation and for all operations together"""
+
+    def __init__(self) -> None:
+        self._operations: dict[str, OperationStats] = {}
+        self._total = OperationStats()
+
+    @property
+    def in_flight(self) -> int:
+        """Requests being processed. When it reaches `max_tasks` new requests wait in the kernel queue"""
+        return self._total.in_flight
+
+    @property
+    def max_in_flight(self) -> int:
+        return self._total.max_in_flight
+
+    def get_operation(self, name: str) -> OperationStats:
+        if (op := self._operations.get(name)) is None:
+            op = self._operations[name] = OperationStats()
+
+        return op
+
+    @contextmanager
+    def measure(self, name: str):
+        op = self.get_operation(name)
+        op.started()
+        self._total.started()
+
+        started = time.monotonic()
+        failed = False
+
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            duration = time.monotonic() - started
+
+            op.finished(duration, failed)
+            self._total.finished(duration, failed)
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {name: op.stats() for name, op in self._operations.items()}
+
+    def total(self) -> dict[str, Any]:
+        """Stats of all operations together"""
+        return self._total.stats()
+
+
+def measured(func):
+    """Collects metrics of a `FileSystemOperations` method"""
+    name = func.__name__
+
+    @wraps(func)
+    async def inner_function(self, *args, **kwargs):
+        with self.metrics.measure(name):
+            return await func(self, *args, **kwargs)
+
+    return inner_function
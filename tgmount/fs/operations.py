@@ -1,20 +1,30 @@
 import errno
+import logging
 import os
-from dataclasses import dataclass, replace
-from typing import Any, Optional, TypedDict, overload
+from typing import (
+    Any,
+    Hashable,
+    Iterable,
+    Optional,
+    TypeGuard,
+    TypedDict,
+    overload,
+)
 
 import pyfuse3
 from datetime import datetime
 from tgmount import vfs
-from tgmount.util import none_fallback, measure_time
-from tgmount.vfs.util import MyLock
+from tgmount.util import none_fallback
+from tgmount.util.asyn import KeyedLocks
 from .fh import FileSystemHandles
+from .metrics import FileSystemMetrics, measured
 from .inode import InodesRegistry, RegistryItem, RegistryRoot
 from .util import (
     create_directory_attributes,
     create_file_attributes,
     exception_handler,
     flags_to_str,
+    str_to_bytes,
 )
 
 
@@ -25,20 +35,51 @@ lookup coconut
 """
 
 
-@dataclass
 class FileSystemItem:
-    structure_item: vfs.DirContentItem
-    attrs: pyfuse3.EntryAttributes
+    """Keeps only what is needed to build `pyfuse3.EntryAttributes` which are created on request"""
+
+    __slots__ = ("structure_item", "inode", "ctime_ns", "mtime_ns")
+
+    def __init__(
+        self,
+        structure_item: vfs.DirContentItem,
+        inode: int = 0,
+        ctime_ns: int | None = None,
+        mtime_ns: int | None = None,
+    ) -> None:
+        self.structure_item = structure_item
+        self.inode = inode
+        self.ctime_ns = none_fallback(
+            ctime_ns, int(structure_item.creation_time.timestamp() * 1e9)
+        )
+        self.mtime_ns = none_fallback(mtime_ns, self.ctime_ns)
 
     def __repr__(self) -> str:
         return f"FileSystemItem({self.structure_item})"
 
+    @property
+    def attrs(self) -> pyfuse3.EntryAttributes:
+        if isinstance(self.structure_item, vfs.DirLike):
+            attrs = create_directory_attributes(self.inode, stamp=self.ctime_ns)
+        else:
+            attrs = create_file_attributes(
+                size=self.structure_item.content.size,
+                stamp=self.ctime_ns,
+                inode=self.inode,
+            )
+
+        attrs.st_mtime_ns = self.mtime_ns
+
+        return attrs
+
     def set_structure_item(self, structure_item: vfs.DirContentItem):
-        return replace(self, structure_item=structure_item)
+        return FileSystemItem(structure_item, self.inode, self.ctime_ns, self.mtime_ns)
 
 
 InodesRegistryItem = RegistryItem[FileSystemItem] | RegistryRoot[FileSystemItem]
 
+DirListingEntry = tuple[bytes, pyfuse3.EntryAttributes, RegistryItem[FileSystemItem]]
+
 
 InodesTreeFile = TypedDict(
     "InodesTreeFile", inode=int, path=list[str], path_str=str, name=str, extra=Any
@@ -104,6 +145,23 @@ class FileSystemOperationsMixin:
 from .logger import logger
 
 
+DEFAULT_ENTRY_TIMEOUT = 300
+DEFAULT_ATTR_TIMEOUT = 300
+
+
+def is_immutable_file(structure_item: vfs.DirContentItem) -> bool:
+    """Files made from telegram documents never change. Edited documents become new items"""
+    extra = structure_item.extra
+
+    return (
+        isinstance(structure_item, vfs.FileLike)
+        and not structure_item.writable
+        and isinstance(extra, tuple)
+        and len(extra) > 1
+        and extra[1] is not None
+    )
+
+
 class FileSystemOperations(pyfuse3.Operations, FileSystemOperationsMixin):
     FsRegistryItem = RegistryItem[FileSystemItem] | RegistryRoot[FileSystemItem]
     logger = logger.getChild(f"FileSystemOperations")
@@ -111,14 +169,30 @@ class FileSystemOperations(pyfuse3.Operations, FileSystemOperationsMixin):
     def __init__(
         self,
         root: vfs.DirLike,
+        *,
+        entry_timeout: float | None = None,
+        attr_timeout: float | None = None,
+        direct_io_dirs: Iterable[str] | None = None,
     ):
         super(FileSystemOperations, self).__init__()
         self._root = root
 
-        """ Locks while updating """
-        self._update_lock = MyLock(
-            "FileSystemOperations.update_lock", logger=self.logger
-        )
+        self._entry_timeout = none_fallback(entry_timeout, DEFAULT_ENTRY_TIMEOUT)
+        """ Seconds the kernel caches names """
+
+        self._attr_timeout = none_fallback(attr_timeout, DEFAULT_ATTR_TIMEOUT)
+        """ Seconds the kernel caches attributes """
+
+        self._direct_io_dirs: list[tuple[bytes, ...]] = [
+            tuple(str_to_bytes([n for n in d.split(os.path.sep) if n != ""]))
+            for d in none_fallback(direct_io_dirs, [])
+        ]
+        """ Files in these folders are read bypassing the kernel page cache """
+
+        self.metrics = FileSystemMetrics()
+
+        self._dir_locks = KeyedLocks[int]()
+        """ Locks of directories by inode. Taken while a directory content is being read or updated """
 
         self._init()
 
@@ -130,16 +204,16 @@ class FileSystemOperations(pyfuse3.Operations, FileSystemOperationsMixin):
         self.logger.debug(f"init_root")
 
         self._inodes = InodesRegistry[FileSystemItem](
-            self.create_FileSystemItem(
-                root,
-                self._create_attributes_for_item(root, InodesRegistry.ROOT_INODE),
-            ),
+            self.create_FileSystemItem(root, InodesRegistry.ROOT_INODE),
             last_inode=last_inode,
         )
 
     def _init_handles(self, last_fh=None):
         self._handles = FileSystemHandles[InodesRegistryItem](last_fh=last_fh)
 
+        self._dir_listings: dict[int, list[DirListingEntry]] = {}
+        """ Directory entries with their attributes by opened directory handle """
+
     @overload
     def _str_to_bytes(self, s: str) -> bytes:
         ...
@@ -172,32 +246,52 @@ class FileSystemOperations(pyfuse3.Operations, FileSystemOperationsMixin):
     def create_FileSystemItem(
         self,
         structure_item: vfs.DirContentItem,
-        attrs: pyfuse3.EntryAttributes,
+        inode: int = 0,
+        ctime_ns: int | None = None,
+        mtime_ns: int | None = None,
     ):
-        return FileSystemItem(structure_item, attrs)
+        return FileSystemItem(structure_item, inode, ctime_ns, mtime_ns)
+
+    def get_inode_key(
+        self, vfs_item: vfs.DirContentItem, parent_inode: int
+    ) -> Hashable:
+        """
+        The inode of an item is derived from this key so it stays the same
+        between remounts and re-listings.
+
+        Files made from messages are identified by the message and the
+        document ids and keep their inodes if renamed. Other items, including
+        files inside zip archives, are identified by name. Since the key
+        contains the parent's inode the source folder and the path in a zip
+        are a part of it. Different files made from the same message carry
+        different extras, e.g. thumbnails append their type.
+        """
+        extra = vfs_item.extra
+
+        if (
+            isinstance(vfs_item, vfs.FileLike)
+            and isinstance(extra, tuple)
+            and len(extra) > 0
+            and extra[0] is not None
+        ):
+            return (parent_inode, "message", *extra)
 
-    def _create_attributes_for_item(
-        self,
-        item: vfs.DirContentItem,
-        inode: int | None,
-    ):
-        if isinstance(item, vfs.DirLike):
-            return create_directory_attributes(
-                inode,
-                stamp=int(item.creation_time.timestamp() * 1e9),
-            )
-        else:
-            return create_file_attributes(
-                size=item.content.size,
-                stamp=int(item.creation_time.timestamp() * 1e9),
-            )
+        return (parent_inode, vfs_item.name)
+
+    def get_attrs(self, item: InodesRegistryItem) -> pyfuse3.EntryAttributes:
+        attrs = item.data.attrs
+        attrs.entry_timeout = self._entry_timeout
+        attrs.attr_timeout = self._attr_timeout
+
+        return attrs
 
     def update_subitem(
         self, path: str, new_item: vfs.DirContentItem, parent_inode: int
     ):
-        self.logger.debug(
-            f"update_subitem: {new_item.name}, parent_inode={parent_inode} ({self.inodes.get_item_path(parent_inode)})"
-        )
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                f"update_subitem: {new_item.name}, parent_inode={parent_inode} ({self.inodes.get_item_path(parent_inode)})"
+            )
 
         # old_fs_item = self.inodes.get_child_item_by_name(new_item.name, parent_inode)
         old_fs_item = self.inodes.get_by_path(path)
@@ -208,7 +302,7 @@ class FileSystemOperations(pyfuse3.Operations, FileSystemOperationsMixin):
             self.add_subitem(new_item, parent_inode)
             return
 
-        self.logger.debug(f"update_subitem: old={old_fs_item}")
+        self.logger.debug("update_subitem: old=%s", old_fs_item)
 
         if self._bytes_to_str(old_fs_item.name) != new_item.name:
             self.logger.debug(f"update_subitem: item renamed")
@@ -223,7 +317,9 @@ class FileSystemOperations(pyfuse3.Operations, FileSystemOperationsMixin):
 
         fs_item = self.create_FileSystemItem(
             new_item,
-            self._create_attributes_for_item(new_item, inode=0),
+            inode=old_fs_item.inode,
+            ctime_ns=old_fs_item.data.ctime_ns,
+            mtime_ns=int(datetime.now().timestamp() * 1e9),
         )
 
         item = self.inodes.add_item_to_inodes(
@@ -233,29 +329,27 @@ class FileSystemOperations(pyfuse3.Operations, FileSystemOperationsMixin):
             inode=old_fs_item.inode,
         )
 
-        item.data.attrs.st_ino = item.inode
-        item.data.attrs.st_ctime_ns = old_fs_item.data.attrs.st_ctime_ns
-        item.data.attrs.st_mtime_ns = int(datetime.now().timestamp() * 1e9)
-
         return item
 
     def add_subitem(self, vfs_item: vfs.DirContentItem, parent_inode: int):
-        self.logger.debug(
-            f"add_subitem: {vfs_item.name}, parent_inode={parent_inode} ({self.inodes.get_item_path(parent_inode)})"
-        )
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                f"add_subitem: {vfs_item.name}, parent_inode={parent_inode} ({self.inodes.get_item_path(parent_inode)})"
+            )
 
-        fs_item = self.create_FileSystemItem(
-            vfs_item,
-            self._create_attributes_for_item(vfs_item, inode=0),
-        )
+        return self._add_subitem(vfs_item, parent_inode)
+
+    def _add_subitem(self, vfs_item: vfs.DirContentItem, parent_inode: int):
+        fs_item = self.create_FileSystemItem(vfs_item)
 
         item = self.inodes.add_item_to_inodes(
             name=self._str_to_bytes(vfs_item.name),
             data=fs_item,
             parent_inode=parent_inode,
+            key=self.get_inode_key(vfs_item, parent_inode),
         )
 
-        item.data.attrs.st_ino = item.inode
+        item.data.inode = item.inode
 
         return item
 
@@ -268,6 +362,7 @@ class FileSystemOperations(pyfuse3.Operations, FileSystemOperationsMixin):
         if item is not None:
             self.inodes.remove_item_with_children(item.inode)
 
+    @measured
     @exception_handler
     async def getattr(self, inode: int, ctx=None):
         item = self._inodes.get_item_by_inode(inode)
@@ -276,17 +371,21 @@ class FileSystemOperations(pyfuse3.Operations, FileSystemOperationsMixin):
             self.logger.error(f"= getattr({inode}): missing in inodes registry")
             raise pyfuse3.FUSEError(errno.ENOENT)
 
-        self.logger.debug(f"getattr({inode}) = {item.name}")
+        self.logger.debug("= getattr(%s) = %s", inode, item.name)
 
-        self.logger.debug(f"= getattr({inode},)\t{item.data.structure_item.name}")
-
-        return item.data.attrs
+        return self.get_attrs(item)
 
     # @measure_time(logger_func=measure_time_logger.debug)
     @exception_handler
     async def _read_dir_content(self, parent_item: InodesRegistryItem):
         self.logger.debug(f"_read_dir_content {parent_item.name}")
-        async with self._update_lock:
+        async with self._dir_locks.lock(parent_item.inode):
+            # has been read while waiting for the lock
+            if self._inodes.was_content_read(
+                parent_item.inode
+            ) and not self._inodes.has_evicted_children(parent_item.inode):
+                return none_fallback(self._inodes.get_items_by_parent(parent_item), [])
+
             handle = None
             structure_item = parent_item.data.structure_item
 
@@ -295,17 +394,77 @@ class FileSystemOperations(pyfuse3.Operations, FileSystemOperationsMixin):
                 raise pyfuse3.FUSEError(errno.ENOENT)
 
             handle = await structure_item.content.opendir_func()
+            child_items = await structure_item.content.readdir_func(handle, 0)
+            await structure_item.content.releasedir_func(handle)
+
+            # the directory can be removed by an update while being read
+            if self._inodes.get_item_by_inode(parent_item.inode) is not parent_item:
+                self.logger.debug("_read_dir_content: %s was removed", parent_item.name)
+                raise pyfuse3.FUSEError(errno.ENOENT)
+
             res = []
 
-            for child_item in await structure_item.content.readdir_func(handle, 0):
-                item = self.add_subitem(child_item, parent_item.inode)
+            # items that were not evicted are kept with their lookup counts
+            children = none_fallback(
+                self._inodes.get_items_by_parent_dict(parent_item), {}
+            )
+
+            for child_item in child_items:
+                item = children.get(self._str_to_bytes(child_item.name))
+
+                if item is None:
+                    item = self._add_subitem(child_item, parent_item.inode)
+                elif item.data.structure_item is not child_item:
+                    self._inodes.set_data_for_item(
+                        item, item.data.set_structure_item(child_item)
+                    )
+
                 res.append(item)
 
-            await structure_item.content.releasedir_func(handle)
+            self._inodes.set_content_read(parent_item.inode)
+            self._inodes.discard_evicted(parent_item.inode)
 
         return res
 
+    @exception_handler
+    async def _restore_evicted(
+        self, parent_item: InodesRegistryItem, name: bytes
+    ) -> InodesRegistryItem | None:
+        """Adds back the evicted child of the directory whose content was read"""
+        async with self._dir_locks.lock(parent_item.inode):
+            # has been added while waiting for the lock
+            if (
+                item := self._inodes.get_child_item_by_name(name, parent_item)
+            ) is not None:
+                return item
+
+            if not self._inodes.was_evicted(name, parent_item.inode):
+                return None
+
+            structure_item = parent_item.data.structure_item
+
+            if not isinstance(structure_item, vfs.DirLike):
+                self.logger.error("_restore_evicted(): parent_item is not DirLike")
+                raise pyfuse3.FUSEError(errno.ENOENT)
+
+            handle = await structure_item.content.opendir_func()
+            child_items = await structure_item.content.readdir_func(handle, 0)
+            await structure_item.content.releasedir_func(handle)
+
+            if self._inodes.get_item_by_inode(parent_item.inode) is not parent_item:
+                self.logger.debug("_restore_evicted: %s was removed", parent_item.name)
+                raise pyfuse3.FUSEError(errno.ENOENT)
+
+            self._inodes.discard_evicted(parent_item.inode, name)
+
+            for child_item in child_items:
+                if self._str_to_bytes(child_item.name) == name:
+                    return self._add_subitem(child_item, parent_item.inode)
+
+        return None
+
     # @measure_time(logger_func=measure_time_logger.debug)
+    @measured
     @exception_handler
     async def lookup(
         self, parent_inode: int, name: bytes, ctx=None
@@ -313,7 +472,7 @@ class FileSystemOperations(pyfuse3.Operations, FileSystemOperationsMixin):
         # Calls to lookup acquire a read-lock on the inode of the parent directory (meaning that lookups in the same
         #         directory may run concurrently, but never at the same time as e.g. a rename or mkdir operation).
 
-        self.logger.debug(f"= lookup({parent_inode}, {name})")
+        self.logger.debug("= lookup(%s, %s)", parent_inode, name)
 
         parent_item = self._inodes.get_item_by_inode(parent_inode)
 
@@ -323,8 +482,6 @@ class FileSystemOperations(pyfuse3.Operations, FileSystemOperationsMixin):
             )
             raise pyfuse3.FUSEError(errno.ENOENT)
 
-        self.logger.debug(f"lookup(): parent_item={parent_item.name}")
-
         if not vfs.DirLike.guard(parent_item.data.structure_item):
             self.logger.error("lookup(): parent_item is not DirLike")
             raise pyfuse3.FUSEError(errno.ENOENT)
@@ -333,29 +490,62 @@ class FileSystemOperations(pyfuse3.Operations, FileSystemOperationsMixin):
 
         if not self._inodes.was_content_read(parent_item.inode):
             await self._read_dir_content(parent_item)
-            self._inodes.set_content_read(parent_item.inode)
 
         item = self._inodes.get_child_item_by_name(name, parent_inode)
 
+        # evicted after the kernel had forgotten it
+        if item is None and self._inodes.was_evicted(name, parent_inode):
+            item = await self._restore_evicted(parent_item, name)
+
         if item is None:
-            self.logger.debug(
-                f"lookup(parent_inode={parent_inode},name={name}): not found"
-            )
+            self.logger.debug("lookup(%s, %s): not found", parent_inode, name)
             raise pyfuse3.FUSEError(errno.ENOENT)
 
-        self.logger.debug(f"lookup(): returning {item}")
+        self._inodes.lookup(item)
 
-        return item.data.attrs
+        return self.get_attrs(item)
 
+    @measured
     @exception_handler
     async def forget(self, inode_list):
-        self.logger.debug(f"= forget({inode_list}")
+        self.logger.debug("= forget(%s)", inode_list)
+
+        for inode, nlookup in inode_list:
+            if not self._inodes.forget(inode, nlookup):
+                continue
+
+            item = self._inodes.get_item_by_inode(inode)
+
+            # a directory that was kept for its children goes with the last of them
+            while self._evict_unreferenced(item):
+                item = self._inodes.get_item_by_inode(item.parent_inode)
+
+    def _evict_unreferenced(
+        self, item: InodesRegistryItem | None
+    ) -> TypeGuard[RegistryItem[FileSystemItem]]:
+        """Evicts the item if neither it nor its subitems are referenced by the kernel or open. Returns True if it was evicted"""
+
+        if item is None or isinstance(item, RegistryRoot):
+            return False
+
+        if self._inodes.get_lookup_count(item) > 0:
+            return False
+
+        if self._handles.get_by_item(item) is not None:
+            return False
+
+        # a directory stays while the kernel references any of its children
+        if self._inodes.get_referenced_descendants(item) > 0:
+            return False
+
+        self._inodes.evict_item(item)
+
+        return True
 
     # @measure_time(logger_func=measure_time_logger.debug)
+    @measured
     @exception_handler
     async def opendir(self, inode: int, ctx):
-        self.logger.debug(f"= opendir({inode})")
-
         item = self._inodes.get_item_by_inode(inode)
 
         if item is None:
@@ -364,31 +554,26 @@ class FileSystemOperations(pyfuse3.Operations, FileSystemOperationsMixin):
             )
             raise pyfuse3.FUSEError(errno.EBADF)
 
-        self.logger.debug(f"= opendir({inode}) {item.data.structure_item.name}")
-
         if not vfs.DirLike.guard(item.data.structure_item):
             self.logger.error(f"opendir({inode}): structure_item is not DirLike")
             raise pyfuse3.FUSEError(errno.ENOTDIR)
 
-        path = self._inodes.get_item_path(item.inode)
-
-        if path is not None:
-            vfs_path = InodesRegistry.join_path(path)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            path = self._inodes.get_item_path(item.inode)
 
-            if vfs_path is None:
-                self.logger.error("opendir(): missing vfs_path")
-                raise pyfuse3.FUSEError(errno.ENOENT)
-
-            self.logger.debug(f"opendir(): vfs_path = {vfs_path}")
+            self.logger.debug(
+                f"= opendir({inode}) {item.data.structure_item.name}, path = {InodesRegistry.join_path(path) if path is not None else None}"
+            )
 
         handle = await item.data.structure_item.content.opendir_func()
 
         fh = self._handles.open_fh(item, handle)
 
-        self.logger.debug(f"= opendir({inode}) = {fh}")
+        self.logger.debug("= opendir(%s) = %s", inode, fh)
         return fh
 
     # @measure_time(logger_func=measure_time_logger.debug)
+    @measured
     @exception_handler
     async def readdir(self, fh, off, token: pyfuse3.ReaddirToken):
         dir_item, handle = self._handles.get_by_fh(fh)
@@ -397,50 +582,66 @@ class FileSystemOperations(pyfuse3.Operations, FileSystemOperationsMixin):
             self.logger.error("= readdir(fh={fh}, off={off}): missing dir_item")
             raise pyfuse3.FUSEError()
 
-        self.logger.debug(f"= readdir({dir_item.name}, fh={fh}, off={off})")
+        self.logger.debug("= readdir(%s, fh=%s, off=%s)", dir_item.name, fh, off)
 
         if isinstance(dir_item, vfs.DirLike):
             self.logger.error("= readdir(fh={fh}, off={off}): dir_item is not a folder")
             raise pyfuse3.FUSEError(errno.ENOTDIR)
 
-        content = self._inodes.get_items_by_parent(dir_item)
-
-        if content is None:
+        if not self._inodes.is_inode_exists(dir_item.inode):
             self.logger.error(
                 "= readdir(fh={fh}, off={off}): dir_item is not registered  in inodes"
             )
             raise pyfuse3.FUSEError(errno.ENOENT)
 
-        # XXX
-        if not self._inodes.was_content_read(dir_item.inode):
-            content = await self._read_dir_content(dir_item)
-            self._inodes.set_content_read(dir_item.inode)
+        # the listing is made once per opened directory and the following
+        # calls continue from the offset
+        listing = self._dir_listings.get(fh)
 
-        content = content[off:]
+        if listing is None or off == 0:
+            listing = self._dir_listings[fh] = await self._get_dir_listing(dir_item)
 
-        for idx, sub_item in enumerate(content, off):
-            resp = pyfuse3.readdir_reply(
-                token,
-                str.encode(sub_item.data.structure_item.name),
-                sub_item.data.attrs,
-                idx + 1,
-            )
+        for idx in range(off, len(listing)):
+            name, attrs, sub_item = listing[idx]
+
+            # removed while the directory was being listed
+            if not self._inodes.is_inode_exists(sub_item.inode):
+                continue
 
-            if resp is False:
+            if not pyfuse3.readdir_reply(token, name, attrs, idx + 1):
                 break
 
+            # readdirplus replies count as lookups
+            self._inodes.lookup(sub_item)
+
+    async def _get_dir_listing(
+        self, dir_item: InodesRegistryItem
+    ) -> list[DirListingEntry]:
+        if not self._inodes.was_content_read(
+            dir_item.inode
+        ) or self._inodes.has_evicted_children(dir_item.inode):
+            content = await self._read_dir_content(dir_item)
+        else:
+            content = none_fallback(self._inodes.get_items_by_parent(dir_item), [])
+
+        return [(item.name, self.get_attrs(item), item) for item in content]
+
+    @measured
     @exception_handler
     async def releasedir(self, fh):
         """If the directory was removed at this poing."""
+        self._dir_listings.pop(fh, None)
+
         item, handle = self._handles.get_by_fh(fh)
 
         if item is None:
             self.logger.debug(
-                f"releasedir(): missing {fh} in open handles. Probably the directory was removed."
+                "releasedir(): missing %s in open handles. Probably the directory was removed.",
+                fh,
             )
             return
 
-        self.logger.debug(f"= releasedir({item.name}, {fh})")
+        self.logger.debug("= releasedir(%s, %s)", item.name, fh)
 
         if item is None:
             self.logger.error(f"releasedir(): missing item with handle {fh}")
@@ -455,7 +656,21 @@ class FileSystemOperations(pyfuse3.Operations, FileSystemOperationsMixin):
         self._handles.release_fh(fh)
         self.logger.debug("= releasedir(): ok")
 
-    @measure_time(logger_func=logger.debug)
+    def is_direct_io(self, item: RegistryItem[FileSystemItem]) -> bool:
+        """Large reads of these files go straight to `read` without splitting them into pages"""
+        if len(self._direct_io_dirs) == 0:
+            return False
+
+        path = self._inodes.get_item_path(item)
+
+        if path is None:
+            return False
+
+        names = tuple(path[1:])
+
+        return any(names[: len(d)] == d for d in self._direct_io_dirs)
+
+    @measured
     @exception_handler
     async def open(self, inode, flags, ctx):
         handle = None
@@ -471,9 +686,10 @@ class FileSystemOperations(pyfuse3.Operations, FileSystemOperationsMixin):
             raise pyfuse3.FUSEError(errno.EIO)
 
         # parent_dir.data.structure_item.writable
-        self.logger.debug(
-            f"= open({inode}, flags={flags_to_str(flags)}) = {item.data.structure_item.name}"
-        )
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                f"= open({inode}, flags={flags_to_str(flags)}) = {item.data.structure_item.name}"
+            )
 
         if flags & os.O_RDWR or flags & os.O_WRONLY:
             self.logger.error("open(): readonly")
@@ -483,16 +699,20 @@ class FileSystemOperations(pyfuse3.Operations, FileSystemOperationsMixin):
 
         fh = self._handles.open_fh(item, handle)
 
-        self.logger.debug(
-            f"- done open({inode}): fh={fh}, name={item.data.structure_item.name}"
-        )
+        self.logger.debug("- done open(%s): fh=%s", inode, fh)
 
-        return pyfuse3.FileInfo(fh=fh)
+        if self.is_direct_io(item):
+            return pyfuse3.FileInfo(fh=fh, direct_io=True, keep_cache=False)
+
+        # the kernel keeps the page cache of immutable files between opens
+        return pyfuse3.FileInfo(
+            fh=fh, keep_cache=is_immutable_file(item.data.structure_item)
+        )
 
-    @measure_time(logger_func=logger.debug)
+    @measured
     @exception_handler
     async def read(self, fh, off, size):
-        self.logger.debug(f"= read(fh={fh},off={off},size={size}).")
+        self.logger.debug("= read(fh=%s,off=%s,size=%s)", fh, off, size)
 
         item, handle = self._handles.get_by_fh(fh)
 
@@ -507,13 +727,14 @@ class FileSystemOperations(pyfuse3.Operations, FileSystemOperationsMixin):
         chunk = await item.data.structure_item.content.read_func(handle, off, size)
 
         self.logger.debug(
-            f"- read(fh={fh},off={off},size={size}) returns { len(chunk)} bytes"
+            "- read(fh=%s,off=%s,size=%s) returns %s bytes", fh, off, size, len(chunk)
         )
         return chunk
 
+    @measured
     @exception_handler
     async def release(self, fh):
-        self.logger.debug(f"= release({fh})")
+        self.logger.debug("= release(%s)", fh)
         item, data = self._handles.get_by_fh(fh)
 
         if item is None:
@@ -526,9 +747,16 @@ class FileSystemOperations(pyfuse3.Operations, FileSystemOperationsMixin):
             self.logger.error(f"release({fh}): is not file")
             raise pyfuse3.FUSEError(errno.EIO)
 
-        await item.data.structure_item.content.close_func(data)
-
-        self._handles.release_fh(fh)
+        try:
+            await item.data.structure_item.content.close_func(data)
+        except pyfuse3.FUSEError:
+            raise
+        except Exception as e:
+            # e.g. uploading a written file failed
+            self.logger.error(f"release({fh}): error closing {item.name}: {e}")
+            raise pyfuse3.FUSEError(errno.EIO) from e
+        finally:
+            self._handles.release_fh(fh)
 
     # async def forget(self, inode_list):
     #     pass
@@ -1,5 +1,6 @@
 import os
 from dataclasses import dataclass, field
+from typing import Iterable
 
 import pyfuse3
 
@@ -46,109 +47,135 @@ class FileSystemOperationsUpdate:
             # update_dir_content=map_keys(_prepend, self.update_dir_content),
         )
 
-    def __repr__(self) -> str:
-        return f"FileSystemOperationsUpdate(new_files={list(self.new_files.keys())}, new_dirs={list(self.new_dirs.keys())}, removed_files={self.removed_files}, removed_dir_contents={self.removed_dirs}, update_items={self.update_items})"
-
+    def is_empty(self) -> bool:
+        return not (
+            self.new_files
+            or self.new_dirs
+            or self.removed_dirs
+            or self.removed_files
+            or self.update_items
+        )
 
-class FileSystemOperationsUpdatable(FileSystemOperations):
-    def __init__(self, root: vfs.DirLike):
-        super().__init__(root)
+    def add_new_file(self, path: str, item: vfs.FileLike):
+        self.new_files[path] = item
 
-        self._removed_items = []
+    def add_new_dir(self, path: str, item: vfs.DirLike | vfs.DirContentProto):
+        self.new_dirs[path] = item
 
-    async def update(self, update: FileSystemOperationsUpdate):
-        for f in update.new_files:
-            self.logger.info(f"New file: {f}")
+    def add_updated_item(self, path: str, item: vfs.DirContentItem):
+        # an item added in the same update is just added with the new value
+        if path in self.new_files and isinstance(item, vfs.FileLike):
+            self.new_files[path] = item
+        elif path in self.new_dirs and isinstance(item, vfs.DirLike):
+            self.new_dirs[path] = item
+        else:
+            self.update_items[path] = item
 
-        for path, filelike in update.update_items.items():
-            parent_path = os.path.dirname(path)
-            parent_item = self.inodes.get_by_path(parent_path)
+    def add_removed_file(self, path: str):
+        if self._cancel(path):
+            return
 
-            if parent_item is None:
-                self.logger.debug(
-                    f"on_update: new_files: {parent_path} is not in inodes"
-                )
-                continue
+        if path not in self.removed_files:
+            self.removed_files.append(path)
 
-            if not self.inodes.was_content_read(parent_item):
-                continue
+    def add_removed_dir(self, path: str):
+        # nothing is added inside a removed directory
+        prefix = path.rstrip("/") + "/"
 
-            self.update_subitem(path, filelike, parent_item.inode)
+        for paths in (self.new_files, self.new_dirs, self.update_items):
+            for p in [p for p in paths if p.startswith(prefix)]:
+                del paths[p]
 
-            # pyfuse3.invalidate_inode(parent_item.inode)
+        if self._cancel(path):
+            return
 
-        for path, filelike in update.new_files.items():
-            parent_path = os.path.dirname(path)
-            parent_item = self.inodes.get_by_path(parent_path)
+        if path not in self.removed_dirs:
+            self.removed_dirs.append(path)
 
-            if parent_item is None:
-                self.logger.debug(
-                    f"on_update: new_files: {parent_path} is not in inodes"
-                )
-                continue
+    def _cancel(self, path: str) -> bool:
+        """Drops changes of a removed item. Returns True if the item was added in this update so it doesn't need to be removed"""
+        self.update_items.pop(path, None)
 
-            # if content of the parent hasn't been accessed yet
-            # skip adding subitems into inode registries
-            if not self.inodes.was_content_read(parent_item):
-                continue
+        added_file = self.new_files.pop(path, None)
+        added_dir = self.new_dirs.pop(path, None)
 
-            self.add_subitem(filelike, parent_item.inode)
+        return added_file is not None or added_dir is not None
 
-        for path, dir_like_or_content in update.new_dirs.items():
-            parent_path = os.path.dirname(path)
-            name = os.path.basename(path)
-            parent_item = self.inodes.get_by_path(parent_path)
+    def __repr__(self) -> str:
+        return f"FileSystemOperationsUpdate(new_files={list(self.new_files.keys())}, new_dirs={list(self.new_dirs.keys())}, removed_files={self.removed_files}, removed_dir_contents={self.removed_dirs}, update_items={self.update_items})"
 
-            if parent_item is None:
-                self.logger.debug(f"on_update: new_files: {path} is not in inodes")
-                continue
 
-            # if content of the parent hasn't been accessed yet
-            # skip adding subitems into inode registries
-            if not self.inodes.was_content_read(parent_item):
-                continue
+class FileSystemOperationsUpdatable(FileSystemOperations):
+    def __init__(self, root: vfs.DirLike, **kwargs):
+        super().__init__(root, **kwargs)
 
-            vfs_item = (
-                dir_like_or_content
-                if isinstance(dir_like_or_content, vfs.DirLike)
-                else vfs.DirLike(name, dir_like_or_content)
-            )
+        self._removed_items = []
 
-            self.add_subitem(vfs_item, parent_item.inode)
+    async def update(self, update: FileSystemOperationsUpdate):
+        """
+        Removals are applied first so an item removed and added back in the
+        same update is replaced.
+
+        Paths are grouped by their parent directory which is resolved and
+        locked once per group. Every lock only blocks reading the changed
+        directory.
+        """
+        for f in update.new_files:
+            self.logger.info(f"New file: {f}")
 
         for path in update.removed_files:
             self.logger.info(f"Removed file: {path}")
 
-            item = self.inodes.get_by_path(path)
-            if item is None:
-                self.logger.debug(
-                    f"on_update: update_dir_content: {path} is not in inodes"
-                )
-                continue
-            if isinstance(item, RegistryItem):
-                pyfuse3.invalidate_entry_async(
-                    item.parent_inode, item.name, ignore_enoent=True
-                )
-
-            await self._remove_item(item)
-
         for path in update.removed_dirs:
             self.logger.info(f"Removed dir: {path}")
 
-            item = self.inodes.get_by_path(path)
-
-            if item is None:
-                self.logger.debug(
-                    f"on_update: update_dir_content: {path} is not in inodes"
-                )
-                continue
-
-            if isinstance(item, RegistryItem):
-                pyfuse3.invalidate_entry_async(
-                    item.parent_inode, item.name, ignore_enoent=True
-                )
-
-            await self._remove_item(item)
+        for parent_item, paths in self._group_by_parent(update.removed_files):
+            async with self._dir_locks.lock(parent_item.inode):
+                for path in paths:
+                    await self._remove_child(parent_item, os.path.basename(path))
+
+        for parent_item, paths in self._group_by_parent(update.removed_dirs):
+            async with self._dir_locks.lock(parent_item.inode):
+                for path in paths:
+                    await self._remove_child(parent_item, os.path.basename(path))
+
+        for parent_item, paths in self._group_by_parent(update.update_items):
+            async with self._dir_locks.lock(parent_item.inode):
+                if not self.inodes.was_content_read(parent_item):
+                    continue
+
+                for path in paths:
+                    self.update_subitem(
+                        path, update.update_items[path], parent_item.inode
+                    )
+
+        for parent_item, paths in self._group_by_parent(update.new_dirs):
+            async with self._dir_locks.lock(parent_item.inode):
+                # if content of the parent hasn't been accessed yet
+                # skip adding subitems into inode registries
+                if not self.inodes.was_content_read(parent_item):
+                    continue
+
+                for path in paths:
+                    dir_like_or_content = update.new_dirs[path]
+
+                    vfs_item = (
+                        dir_like_or_content
+                        if isinstance(dir_like_or_content, vfs.DirLike)
+                        else vfs.DirLike(os.path.basename(path), dir_like_or_content)
+                    )
+
+                    self._add_new_subitem(vfs_item, parent_item.inode)
+
+        for parent_item, paths in self._group_by_parent(update.new_files):
+            async with self._dir_locks.lock(parent_item.inode):
+                # if content of the parent hasn't been accessed yet
+                # skip adding subitems into inode registries
+                if not self.inodes.was_content_read(parent_item):
+                    continue
+
+                for path in paths:
+                    self._add_new_subitem(update.new_files[path], parent_item.inode)
 
         # for path, dir_like_or_content in update.update_dir_content.items():
         #     item = self.inodes.get_by_path(path)
@@ -167,6 +194,64 @@ class FileSystemOperationsUpdatable(FileSystemOperations):
 
         #     item.data.structure_item.content = dir_like_or_content
 
+    def _add_new_subitem(self, vfs_item: vfs.DirContentItem, parent_inode: int):
+        existing = self.inodes.get_child_item_by_name(vfs_item.name, parent_inode)
+
+        if not isinstance(existing, RegistryItem):
+            self.add_subitem(vfs_item, parent_inode)
+            return
+
+        # the directory content was read after the item had appeared
+        if existing.data.structure_item is vfs_item:
+            return
+
+        # new directories are wrapped into a new `DirLike` every time so they
+        # are matched by name
+        if isinstance(vfs_item, vfs.DirLike) and isinstance(
+            existing.data.structure_item, vfs.DirLike
+        ):
+            self.inodes.set_data_for_item(
+                existing, existing.data.set_structure_item(vfs_item)
+            )
+            return
+
+        self.add_subitem(vfs_item, parent_inode)
+
+    def _group_by_parent(
+        self, paths: Iterable[str]
+    ) -> list[tuple[FileSystemOperations.FsRegistryItem, list[str]]]:
+        """Groups `paths` by their parent directories skipping those which are not in the registry"""
+        groups: dict[str, list[str]] = {}
+
+        for path in paths:
+            groups.setdefault(os.path.dirname(path), []).append(path)
+
+        result = []
+
+        for parent_path, group in groups.items():
+            parent_item = self.inodes.get_by_path(parent_path)
+
+            if parent_item is None:
+                self.logger.debug(f"on_update: {parent_path} is not in inodes")
+                continue
+
+            result.append((parent_item, group))
+
+        return result
+
+    async def _remove_child(
+        self, parent_item: FileSystemOperations.FsRegistryItem, name: str
+    ):
+        item = self.inodes.get_child_item_by_name(name, parent_item)
+
+        if item is None or not isinstance(item, RegistryItem):
+            self.logger.debug(f"on_update: {name} is not in inodes")
+            return
+
+        pyfuse3.invalidate_entry_async(item.parent_inode, item.name, ignore_enoent=True)
+
+        await self._remove_item(item)
+
     async def _invalidate_children_by_path(
         self, path: list[bytes], parent_inode: int = InodesRegistry.ROOT_INODE
     ):
@@ -78,6 +78,10 @@ def create_directory_attributes(
     )
 
 
+_UID = os.getuid()
+_GID = os.getgid()
+
+
 def create_attributes(st_mode: int, stamp: int, size: int, inode: Optional[int] = None):
     attrs = pyfuse3.EntryAttributes()
     #
@@ -94,8 +98,8 @@ def create_attributes(st_mode: int, stamp: int, size: int, inode: Optional[int]
     attrs.st_ctime_ns = stamp
     attrs.st_mtime_ns = stamp
 
-    attrs.st_gid = os.getgid()
-    attrs.st_uid = os.getuid()
+    attrs.st_gid = _GID
+    attrs.st_uid = _UID
 
     if inode is not None:
         attrs.st_ino = inode
@@ -13,13 +13,14 @@ from tgmount.vfs.types.file import FileContentWritableProto
 from .inode import InodesRegistry, RegistryItem
 from .operations import FileSystemOperations
 from .logger import logger
+from .metrics import measured
 
 
 class FileSystemOperationsWritable(FileSystemOperationsUpdatable):
     logger = logger.getChild("FileSystemOperationsWritable")
 
-    def __init__(self, root: vfs.DirLike):
-        super().__init__(root)
+    def __init__(self, root: vfs.DirLike, **kwargs):
+        super().__init__(root, **kwargs)
 
     """ 
     Create a file with permissions *mode* and open it with *flags*.
@@ -35,6 +36,7 @@ class FileSystemOperationsWritable(FileSystemOperationsUpdatable):
     the returned inode by one.
     """
 
+    @measured
     async def create(
         self,
         parent_inode: int,
@@ -71,9 +73,13 @@ class FileSystemOperationsWritable(FileSystemOperationsUpdatable):
             self.logger.warning("create(): parent_dir content is not writable")
             raise pyfuse3.FUSEError(errno.EPERM)
 
-        filelike = await parent_dir.data.structure_item.content.create(
-            self._bytes_to_str(name)
-        )
+        try:
+            filelike = await parent_dir.data.structure_item.content.create(
+                self._bytes_to_str(name)
+            )
+        except FileExistsError:
+            self.logger.warning(f"create(): {name} already exists")
+            raise pyfuse3.FUSEError(errno.EEXIST)
 
         item = self.add_subitem(filelike, parent_inode)
 
@@ -83,9 +89,12 @@ class FileSystemOperationsWritable(FileSystemOperationsUpdatable):
         # item = self.inodes.add_item_to_inodes(name, fs_item, parent_inode=parent_inode)
         # attrs.st_ino = item.inode
 
-        fh = self._handles.open_fh(item, None)
+        handle = await filelike.content.open_func()
+        fh = self._handles.open_fh(item, handle)
+
+        self.inodes.lookup(item)
 
-        return (pyfuse3.FileInfo(fh), item.data.attrs)
+        return (pyfuse3.FileInfo(fh), self.get_attrs(item))
 
     """ 
     Write *buf* into *fh* at *off*.
@@ -100,6 +109,7 @@ class FileSystemOperationsWritable(FileSystemOperationsUpdatable):
 
     """
 
+    @measured
     async def write(self, fh: int, off: int, buf: bytes):
         self.logger.debug(f"= write(fh={fh},off={off},buf={len(buf)} bytes).")
 
@@ -133,6 +143,35 @@ class FileSystemOperationsWritable(FileSystemOperationsUpdatable):
             self.logger.error(f"Error while writing: {e}")
             raise e
 
-        item.data.attrs.st_size = content.size
-
         return byte_written
+
+    async def release(self, fh):
+        item, _ = self._handles.get_by_fh(fh)
+
+        await super().release(fh)
+
+        if item is not None:
+            await self._remove_if_dropped(item)
+
+    async def _remove_if_dropped(self, item: RegistryItem):
+        """A writable folder may drop a file once it is released, e.g. after uploading it"""
+        parent_item = self.inodes.get_item_by_inode(item.parent_inode)
+
+        if parent_item is None or not vfs.DirLike.guard(
+            parent_item.data.structure_item
+        ):
+            return
+
+        content = parent_item.data.structure_item.content
+
+        if not vfs.DirContentWritableProto.guard(content):
+            return
+
+        name = self._bytes_to_str(item.name)
+
+        if any(i.name == name for i in await vfs.dir_content_read(content)):
+            return
+
+        self.logger.debug(f"release(): {name} was dropped from {parent_item.name}")
+
+        await self._remove_child(parent_item, name)
@@ -44,6 +44,8 @@ async def mount_ops(
     *,
     mount_dir: str,
     min_tasks: int,
+    max_tasks: int | None = None,
+    max_read: int | None = None,
     debug=False,
     fsname: str = "tgmount_fs",
 ):
@@ -58,11 +60,20 @@ async def mount_ops(
     if debug:
         fuse_options.add("debug")
 
+    # the kernel is still limited by its `max_pages` (1MB by default)
+    if max_read is not None:
+        fuse_options.add(f"max_read={max_read}")
+
     pyfuse3.init(fs_ops, mount_dir, fuse_options)
 
     main.mounted = True
 
-    await pyfuse3.main(min_tasks=min_tasks)
+    # pyfuse3 starts new workers while all of them are busy, e.g. waiting for
+    # the network, until there are `max_tasks` of them
+    if max_tasks is not None:
+        await pyfuse3.main(min_tasks=min_tasks, max_tasks=max_tasks)
+    else:
+        await pyfuse3.main(min_tasks=min_tasks)
 
 
 def run_main(main_func, forever=None, loop=None):
@@ -0,0 +1,261 @@
+import hashlib
+from collections import OrderedDict
+
+from telethon import errors, types
+from telethon.crypto import AESModeCTR
+
+from tgmount.error import TgmountError
+
+from .client_types import TgmountTelegramClientCdnProto
+from .source.util import BLOCK_SIZE, split_range
+from .types import DocId, InputDocumentFileLocation, InputPhotoFileLocation
+from .logger import logger as module_logger
+
+CDN_HASH_PART_SIZE = 128 * 1024
+""" Size of a CDN file part covered by one `FileHash` """
+
+CDN_FILES_MAX = 1024
+""" Number of files whose CDN redirects and hashes are remembered. The least recently read are dropped first """
+
+CdnFileKey = tuple[DocId, str]
+""" Document or photo id and the thumbnail size. Sizes of a photo are different files """
+
+
+class CdnError(TgmountError):
+    pass
+
+
+class CdnHashMismatchError(CdnError):
+    pass
+
+
+def cdn_decrypt(
+    cdn_redirect: types.upload.FileCdnRedirect, offset: int, data: bytes
+) -> bytes:
+    """CDN files are encrypted with AES-256-CTR. The last 4 bytes of the IV hold `offset / 16` in big endian"""
+    iv = cdn_redirect.encryption_iv[:12] + (offset // 16).to_bytes(4, "big")
+    return AESModeCTR(key=cdn_redirect.encryption_key, iv=iv).decrypt(data)
+
+
+def is_file_token_invalid(e: errors.RPCError) -> bool:
+    return "FILE_TOKEN_INVALID" in str(getattr(e, "message", ""))
+
+
+def cdn_file_key(
+    input_location: InputDocumentFileLocation | InputPhotoFileLocation,
+) -> CdnFileKey:
+    return (input_location.id, input_location.thumb_size)
+
+
+class CdnDownloader:
+    """
+    Downloads file parts with `upload.getFile` following `upload.fileCdnRedirect`.
+
+    A redirect and the CDN file hashes are remembered per file and thumbnail
+    size so the next reads go straight to the CDN. Only the `capacity` most
+    recently read files are remembered. Every part fetched from the CDN is
+    decrypted and checked against its sha256 hash.
+    """
+
+    logger = module_logger.getChild("CdnDownloader")
+
+    def __init__(
+        self, client: TgmountTelegramClientCdnProto, capacity: int = CDN_FILES_MAX
+    ) -> None:
+        self._client = client
+        self._capacity = capacity
+        self._redirects: OrderedDict[CdnFileKey, types.upload.FileCdnRedirect] = (
+            OrderedDict()
+        )
+        self._hashes: dict[CdnFileKey, dict[int, types.FileHash]] = {}
+
+    def get_redirect(self, file_id: CdnFileKey) -> types.upload.FileCdnRedirect | None:
+        if (cdn_redirect := self._redirects.get(file_id)) is not None:
+            self._redirects.move_to_end(file_id)
+
+        return cdn_redirect
+
+    async def retrieve(
+        self,
+        input_location: InputDocumentFileLocation | InputPhotoFileLocation,
+        offset: int,
+        limit: int,
+        *,
+        request_size: int = BLOCK_SIZE,
+    ) -> bytes:
+        file_id = cdn_file_key(input_location)
+
+        try:
+            return await self._retrieve(input_location, offset, limit, request_size)
+        except errors.RPCError as e:
+            if not is_file_token_invalid(e) or file_id not in self._redirects:
+                raise
+
+            self.logger.warning(f"CDN file token for {file_id} expired.")
+            self._remove_redirect(file_id)
+
+            return await self._retrieve(input_location, offset, limit, request_size)
+
+    async def _retrieve(
+        self,
+        input_location: InputDocumentFileLocation | InputPhotoFileLocation,
+        offset: int,
+        limit: int,
+        request_size: int,
+    ) -> bytes:
+        file_id = cdn_file_key(input_location)
+
+        if (cdn_redirect := self.get_redirect(file_id)) is not None:
+            return await self._cdn_read(file_id, cdn_redirect, offset, limit)
+
+        ranges = split_range(offset, limit, request_size)
+        result = bytearray()
+
+        for part_offset in ranges[:-1]:
+            part = await self._client.get_file_part(
+                input_location, offset=part_offset, limit=request_size
+            )
+
+            if isinstance(part, types.upload.FileCdnRedirect):
+                self.logger.debug(f"File {file_id} is redirected to CDN {part.dc_id}")
+                cdn_redirect = self._set_redirect(file_id, part)
+
+                # the rest comes from the CDN
+                result += await self._cdn_read(
+                    file_id,
+                    cdn_redirect,
+                    part_offset,
+                    ranges[-1] - part_offset,
+                )
+                break
+
+            result += part.bytes
+
+            if len(part.bytes) < request_size:
+                break
+
+        return bytes(
+            memoryview(result)[offset - ranges[0] : offset - ranges[0] + limit]
+        )
+
+    async def _cdn_read(
+        self,
+        file_id: CdnFileKey,
+        cdn_redirect: types.upload.FileCdnRedirect,
+        offset: int,
+        limit: int,
+    ) -> bytes:
+        """Reads the range by parts aligned to the hashed parts so each of them can be verified"""
+        part_size = self._get_part_size(file_id)
+        start = offset - offset % part_size
+        result = bytearray()
+
+        for part_offset in range(start, offset + limit, part_size):
+            part = await self._cdn_read_part(
+                file_id, cdn_redirect, part_offset, part_size
+            )
+            result += part
+
+            if len(part) < part_size:
+                break
+
+        return bytes(memoryview(result)[offset - start : offset - start + limit])
+
+    async def _cdn_read_part(
+        self,
+        file_id: CdnFileKey,
+        cdn_redirect: types.upload.FileCdnRedirect,
+        offset: int,
+        limit: int,
+    ) -> bytes:
+        result = await self._client.get_cdn_file_part(
+            cdn_redirect, offset=offset, limit=limit
+        )
+
+        if isinstance(result, types.upload.CdnFileReuploadNeeded):
+            self.logger.debug(f"File {file_id} needs reuploading to the CDN.")
+
+            self._add_hashes(
+                file_id,
+                await self._client.reupload_cdn_file(
+                    cdn_redirect, result.request_token
+                ),
+            )
+
+            result = await self._client.get_cdn_file_part(
+                cdn_redirect, offset=offset, limit=limit
+            )
+
+            if isinstance(result, types.upload.CdnFileReuploadNeeded):
+                raise CdnError(f"File {file_id} is missing on the CDN after reupload")
+
+        data = cdn_decrypt(cdn_redirect, offset, result.bytes)
+
+        await self._verify(file_id, cdn_redirect, offset, data)
+
+        return data
+
+    async def _verify(
+        self,
+        file_id: CdnFileKey,
+        cdn_redirect: types.upload.FileCdnRedirect,
+        offset: int,
+        data: bytes,
+    ):
+        if len(data) == 0:
+            return
+
+        hashes = self._hashes.get(file_id, {})
+
+        if offset not in hashes:
+            hashes = self._add_hashes(
+                file_id,
+                await self._client.get_cdn_file_hashes(cdn_redirect, offset),
+            )
+
+        if (file_hash := hashes.get(offset)) is None:
+            raise CdnError(f"Missing CDN hash for file {file_id} at {offset}")
+
+        if hashlib.sha256(data).digest() != file_hash.hash:
+            raise CdnHashMismatchError(
+                f"CDN hash mismatch for file {file_id} at {offset}"
+            )
+
+    def _get_part_size(self, file_id: CdnFileKey) -> int:
+        return max(
+            (h.limit for h in self._hashes.get(file_id, {}).values()),
+            default=CDN_HASH_PART_SIZE,
+        )
+
+    def _set_redirect(
+        self, file_id: CdnFileKey, cdn_redirect: types.upload.FileCdnRedirect
+    ) -> types.upload.FileCdnRedirect:
+        # hashes of the previous redirect are dropped with it
+        self._remove_redirect(file_id)
+
+        self._redirects[file_id] = cdn_redirect
+        self._hashes[file_id] = {}
+        self._add_hashes(file_id, getattr(cdn_redirect, "file_hashes", []))
+
+        while len(self._redirects) > self._capacity:
+            evicted_id, _ = self._redirects.popitem(last=False)
+            self._hashes.pop(evicted_id, None)
+
+        return cdn_redirect
+
+    def _remove_redirect(self, file_id: CdnFileKey):
+        self._redirects.pop(file_id, None)
+        self._hashes.pop(file_id, None)
+
+    def _add_hashes(
+        self, file_id: CdnFileKey, file_hashes: list[types.FileHash]
+    ) -> dict[int, types.FileHash]:
+        # the redirect may have been dropped while the hashes were fetched
+        hashes = (
+            self._hashes.setdefault(file_id, {}) if file_id in self._redirects else {}
+        )
+
+        for file_hash in file_hashes:
+            hashes[file_hash.offset] = file_hash
+
+        return hashes
@@ -1,11 +1,14 @@
 import asyncio
+import functools
 import logging
+from collections import OrderedDict
 
 import typing
 from typing import Optional
 
 import telethon
-from telethon import TelegramClient
+from telethon import TelegramClient, errors, functions, types
+from telethon.sessions import MemorySession
 from tgmount import tglog
 
 from tgmount.tgclient.message_source_types import Subscribable
@@ -14,24 +17,33 @@ from tgmount.util import map_none_else, yes
 from .auth import TelegramAuthen
 
 from .search.search import TelegramSearch
+from .rate_limiter import RateLimit, RateLimiter, RpcClass, get_rpc_class
 from .client_types import (
     ListenerEditedMessage,
+    TgmountTelegramClientCdnProto,
     TgmountTelegramClientEventProto,
+    TgmountTelegramClientUploadProto,
     ListenerNewMessages,
     ListenerRemovedMessages,
 )
 from telethon import events
 from .message_reaction_event import MessageReactionEvent
 
+from .types import DocId, InputDocumentFileLocation, InputPhotoFileLocation
 from .logger import logger as module_logger
 from ..constants import client_info
 
+FILES_DC_IDS_MAX = 1024
+""" Number of files whose data centers are remembered. The least recently read are dropped first """
+
 
 class TgmountTelegramClient(
     TelegramClient,
     TelegramAuthen,
     TelegramSearch,
     TgmountTelegramClientEventProto,
+    TgmountTelegramClientCdnProto,
+    TgmountTelegramClientUploadProto,
 ):
     logger = module_logger.getChild("TgmountTelegramClient")
 
@@ -64,7 +76,14 @@ class TgmountTelegramClient(
         loop: Optional[asyncio.AbstractEventLoop] = None,
         base_logger: Optional[typing.Union[str, logging.Logger]] = None,
         receive_updates: bool = True,
+        rate_limits: Optional[typing.Mapping[RpcClass, RateLimit]] = None,
     ):
+        # flood waits are handled by the rate limiter so telethon is asked
+        # to raise them instead of sleeping
+        self._rate_limiter = RateLimiter(
+            rate_limits, flood_sleep_threshold=flood_sleep_threshold
+        )
+
         super().__init__(
             session,
             api_id,
@@ -78,7 +97,7 @@ class TgmountTelegramClient(
             retry_delay=retry_delay,
             auto_reconnect=auto_reconnect,
             sequential_updates=sequential_updates,
-            flood_sleep_threshold=flood_sleep_threshold,
+            flood_sleep_threshold=0,
             raise_last_call_error=raise_last_call_error,
             device_model=device_model,
             system_version=system_version,
@@ -106,6 +125,12 @@ class TgmountTelegramClient(
 
         self._reconnections = 0
 
+        self._files_dc_ids: OrderedDict[DocId, int] = OrderedDict()
+        """ Data centers of the files that caught `FileMigrateError` """
+
+        self._cdn_clients: dict[int, TelegramClient] = {}
+        self._cdn_clients_lock = asyncio.Lock()
+
         # self.on(events.Raw)(aprint)
 
         # self._wait_disconnected_handle = self.loop.create_task(
@@ -118,6 +143,153 @@ class TgmountTelegramClient(
     def reconnections(self):
         return self._reconnections
 
+    @property
+    def rate_limiter(self) -> RateLimiter:
+        return self._rate_limiter
+
+    async def _call(self, sender, request, ordered=False, flood_sleep_threshold=None):
+        """Every RPC passes through here including downloads from other DCs"""
+        # flood waits are handled by the limiter so telethon doesn't sleep on them
+        return await self._rate_limiter.call(
+            get_rpc_class(request),
+            functools.partial(super()._call, flood_sleep_threshold=0),
+            sender,
+            request,
+            ordered=ordered,
+            flood_sleep_threshold=flood_sleep_threshold,
+        )
+
+    async def get_file_part(
+        self,
+        input_location: InputPhotoFileLocation | InputDocumentFileLocation,
+        *,
+        offset: int,
+        limit: int,
+    ) -> types.upload.File | types.upload.FileCdnRedirect:
+        request = functions.upload.GetFileRequest(
+            input_location, offset=offset, limit=limit, cdn_supported=True
+        )
+
+        dc_id = self._files_dc_ids.get(input_location.id)
+
+        if dc_id is None:
+            try:
+                return await self._call(self._sender, request)
+            except errors.FileMigrateError as e:
+                dc_id = self._files_dc_ids[input_location.id] = e.new_dc
+
+                if len(self._files_dc_ids) > FILES_DC_IDS_MAX:
+                    self._files_dc_ids.popitem(last=False)
+        else:
+            self._files_dc_ids.move_to_end(input_location.id)
+
+        sender = await self._borrow_exported_sender(dc_id)
+
+        try:
+            return await self._call(sender, request)
+        finally:
+            await self._return_exported_sender(sender)
+
+    async def get_cdn_file_part(
+        self,
+        cdn_redirect: types.upload.FileCdnRedirect,
+        *,
+        offset: int,
+        limit: int,
+    ) -> types.upload.CdnFile | types.upload.CdnFileReuploadNeeded:
+        cdn_client = await self._get_cdn_client_reused(cdn_redirect.dc_id)
+        request = functions.upload.GetCdnFileRequest(
+            cdn_redirect.file_token, offset=offset, limit=limit
+        )
+
+        # the CDN client is a separate TelegramClient which doesn't pass through `_call`
+        return await self._rate_limiter.call(
+            get_rpc_class(request),
+            functools.partial(cdn_client, flood_sleep_threshold=0),
+            request,
+        )
+
+    async def reupload_cdn_file(
+        self, cdn_redirect: types.upload.FileCdnRedirect, request_token: bytes
+    ) -> list[types.FileHash]:
+        return await self(
+            functions.upload.ReuploadCdnFileRequest(
+                cdn_redirect.file_token, request_token
+            )
+        )
+
+    async def get_cdn_file_hashes(
+        self, cdn_redirect: types.upload.FileCdnRedirect, offset: int
+    ) -> list[types.FileHash]:
+        return await self(
+            functions.upload.GetCdnFileHashesRequest(cdn_redirect.file_token, offset)
+        )
+
+    async def save_file_part(
+        self,
+        file_id: int,
+        part: int,
+        total_parts: int,
+        data: bytes,
+        *,
+        big: bool,
+    ) -> bool:
+        if big:
+            request = functions.upload.SaveBigFilePartRequest(
+                file_id, part, total_parts, data
+            )
+        else:
+            request = functions.upload.SaveFilePartRequest(file_id, part, data)
+
+        return await self(request)
+
+    async def _get_cdn_client_reused(self, dc_id: int) -> TelegramClient:
+        """Unlike telethon which connects on every redirect one connection per CDN data center is kept"""
+        async with self._cdn_clients_lock:
+            if (cdn_client := self._cdn_clients.get(dc_id)) is not None:
+                return cdn_client
+
+            self.logger.info(f"Connecting to CDN {dc_id}")
+
+            dc = await self._get_dc(dc_id, cdn=True)
+
+            # CDN data centers require their own authorization key which is
+            # generated on connecting with an empty session
+            session = MemorySession()
+            session.set_dc(dc.id, dc.ip_address, dc.port)
+
+            cdn_client = TelegramClient(
+                session,
+                self.api_id,
+                self.api_hash,
+                proxy=self._proxy,
+                timeout=self._timeout,
+                loop=self.loop,
+            )
+
+            await cdn_client._sender.connect(
+                self._connection(
+                    session.server_address,
+                    session.port,
+                    session.dc_id,
+                    loggers=self._log,
+                    proxy=self._proxy,
+                    local_addr=self._local_addr,
+                )
+            )
+
+            self._cdn_clients[dc_id] = cdn_client
+
+            return cdn_client
+
+    async def _disconnect_coro(self):
+        for cdn_client in self._cdn_clients.values():
+            await cdn_client.disconnect()
+
+        self._cdn_clients.clear()
+
+        await super()._disconnect_coro()
+
     async def _handle_auto_reconnect(self):
         self._reconnections += 1
         tglog.getLogger("TgmountTelegramClient").warning("Reconnected")
@@ -1,7 +1,7 @@
 from abc import abstractmethod
-from typing import Awaitable, Callable, Protocol
+from typing import Any, Awaitable, Callable, Protocol, TypeGuard
 
-from telethon import events
+from telethon import events, types
 
 from tgmount.tgclient.message_reaction_event import MessageReactionEvent
 from tgmount.tgclient.message_types import MessageProto
@@ -63,6 +63,66 @@ class TgmountTelegramClientIterDownloadProto(Protocol):
         pass
 
 
+class TgmountTelegramClientCdnProto(Protocol):
+    """Client that downloads file parts with `upload.getFile` allowing redirects to CDN data centers"""
+
+    @abstractmethod
+    async def get_file_part(
+        self,
+        input_location: InputPhotoFileLocation | InputDocumentFileLocation,
+        *,
+        offset: int,
+        limit: int,
+    ) -> types.upload.File | types.upload.FileCdnRedirect:
+        pass
+
+    @abstractmethod
+    async def get_cdn_file_part(
+        self,
+        cdn_redirect: types.upload.FileCdnRedirect,
+        *,
+        offset: int,
+        limit: int,
+    ) -> types.upload.CdnFile | types.upload.CdnFileReuploadNeeded:
+        pass
+
+    @abstractmethod
+    async def reupload_cdn_file(
+        self, cdn_redirect: types.upload.FileCdnRedirect, request_token: bytes
+    ) -> list[types.FileHash]:
+        pass
+
+    @abstractmethod
+    async def get_cdn_file_hashes(
+        self, cdn_redirect: types.upload.FileCdnRedirect, offset: int
+    ) -> list[types.FileHash]:
+        pass
+
+    @staticmethod
+    def guard(client: Any) -> TypeGuard["TgmountTelegramClientCdnProto"]:
+        return hasattr(client, "get_cdn_file_part")
+
+
+class TgmountTelegramClientUploadProto(Protocol):
+    """Client that uploads files by parts with `upload.saveFilePart` and `upload.saveBigFilePart`"""
+
+    @abstractmethod
+    async def save_file_part(
+        self,
+        file_id: int,
+        part: int,
+        total_parts: int,
+        data: bytes,
+        *,
+        big: bool,
+    ) -> bool:
+        pass
+
+    @abstractmethod
+    async def send_file(self, *args, **kwargs):
+        pass
+
+
 class TgmountTelegramClientDeleteMessagesProto(Protocol):
     @abstractmethod
     async def delete_messages(self, *args, **kwargs):
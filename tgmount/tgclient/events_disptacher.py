@@ -1,4 +1,5 @@
 import copy
+import itertools
 
 from telethon import events
 
@@ -20,6 +21,19 @@ EventType = (
 )
 
 
+def get_event_type(event: EventType) -> type | None:
+    """Reactions updates are treated as edits"""
+    # `MessageEdited.Event` is a subclass of `NewMessage.Event`
+    if isinstance(event, (events.MessageEdited.Event, MessageReactionEvent.Event)):
+        return events.MessageEdited.Event
+    elif isinstance(event, events.NewMessage.Event):
+        return events.NewMessage.Event
+    elif isinstance(event, events.MessageDeleted.Event):
+        return events.MessageDeleted.Event
+
+    return None
+
+
 class TelegramEventsDispatcher:
     """
     Connects TelegramClient to MessageSources. Receives telethon.events and passes them to the corresponding messages sources.
@@ -62,6 +76,15 @@ class TelegramEventsDispatcher:
     async def process_edited_message_event(self, chat_id, ev):
         await self._on_edited_message(chat_id, ev)
 
+    async def process_events(self, chat_id: EntityId, events_list: list[EventType]):
+        """Passes events from `chat_id` to its message source. Consecutive events of the same kind are passed in a single call"""
+        if self.is_paused:
+            for event in events_list:
+                await self._enqueue_event(chat_id, event)
+            return
+
+        await self._dispatch_events(chat_id, events_list)
+
     def _get_total(self):
         total = {}
         for k, v in self._sources_events_queue.items():
@@ -156,6 +179,65 @@ class TelegramEventsDispatcher:
 
         await source.remove_messages_ids(event.deleted_ids)
 
+    async def _dispatch_events(self, chat_id: EntityId, events_list: list[EventType]):
+        source = self._sources.get(chat_id)
+
+        if source is None:
+            self.logger.error(f"_dispatch_events: Missing {chat_id}")
+            return
+
+        for event_type, group in itertools.groupby(events_list, key=get_event_type):
+            group = list(group)
+
+            if event_type is events.NewMessage.Event:
+                await source.add_messages([ev.message for ev in group])
+            elif event_type is events.MessageDeleted.Event:
+                await source.remove_messages_ids(
+                    list(dict.fromkeys(i for ev in group for i in ev.deleted_ids))
+                )
+            elif event_type is events.MessageEdited.Event:
+                await self._edit_messages(source, group)
+            else:
+                self.logger.error(f"Invalid event type: {event_type}")
+
+    async def _edit_messages(
+        self,
+        source: MessageSourceProto[MessageProto],
+        events_list: list[events.MessageEdited.Event | MessageReactionEvent.Event],
+    ):
+        edited: dict[int, MessageProto] = {}
+
+        for event in events_list:
+            if isinstance(event, events.MessageEdited.Event):
+                edited[event.message.id] = event.message
+                continue
+
+            # the message may have been edited earlier in the same batch
+            if (message := edited.get(event.msg_id)) is None:
+                messages = await source.get_by_ids([event.msg_id])
+
+                if messages is None or len(messages) == 0:
+                    self.logger.error(
+                        f"_edit_messages: Missing message with id {event.msg_id}"
+                    )
+                    continue
+
+                message = messages[0]
+
+            message = copy.copy(message)
+            message.reactions = event.reactions
+            edited[event.msg_id] = message
+
+        if len(edited) == 0:
+            return
+
+        # a message missing in the source would discard the whole batch
+        if len(edited) > 1 and await source.get_by_ids(list(edited.keys())) is None:
+            for message in edited.values():
+                await source.edit_messages([message])
+        else:
+            await source.edit_messages(list(edited.values()))
+
     async def pause(self):
         """Stops dispatching events"""
         self._is_paused = True
@@ -168,14 +250,4 @@ class TelegramEventsDispatcher:
         for chat_id, q in self._sources_events_queue.items():
             self.logger.debug(f"Resume {chat_id}, {len(q)} events")
 
-            for ev in q:
-                if isinstance(ev, events.NewMessage.Event):
-                    await self._on_new_message(chat_id, ev)
-                elif isinstance(
-                    ev, (events.MessageEdited.Event, MessageReactionEvent.Event)
-                ):
-                    await self._on_edited_message(chat_id, ev)
-                elif isinstance(ev, events.MessageDeleted().Event):
-                    await self._on_delete_message(chat_id, ev)
-                else:
-                    self.logger.error(f"Invalid event type: {ev}")
+            await self._dispatch_events(chat_id, q)
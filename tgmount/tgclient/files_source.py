@@ -1,5 +1,7 @@
+import asyncio
 import logging
-from typing import Any, TypeGuard, TypeVar
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Mapping, TypeGuard, TypeVar
 
 from telethon.errors import FileReferenceExpiredError, FileReferenceInvalidError
 from tgmount import tgclient, vfs
@@ -7,11 +9,13 @@ from tgmount.tgclient.message_types import MessageProto
 from tgmount.error import TgmountError
 from tgmount.util import none_fallback
 
+from .cdn import CdnDownloader
+from .client_types import TgmountTelegramClientCdnProto
 from .guards import MessageDownloadable, MessageWithCompressedPhoto, MessageWithDocument
 from .source.document import SourceItemDocument
 from .source.item import FileSourceItem, InputLocation
-from .source.photo import SourceItemPhoto
-from .source.util import BLOCK_SIZE, split_range
+from .source.photo import SourceItemPhoto, get_photo_thumbs_types
+from .source.util import BLOCK_SIZE, join_blocks, split_range
 from .types import (
     DocId,
     InputDocumentFileLocation,
@@ -23,11 +27,82 @@ from .logger import logger as module_logger
 
 T = TypeVar("T")
 
+PHOTO_THUMBS_CACHE_CAPACITY = 16 * 1024 * 1024
+
+PhotoThumbKey = tuple[DocId, str]
+
 
 class FilesSourceError(TgmountError):
     pass
 
 
+class FileContentPhoto(vfs.FileContent):
+    """Content of the largest size of a photo. `thumbs` maps types of the smaller sizes to their contents ordered from the smallest one"""
+
+    def __init__(
+        self,
+        size: int,
+        read_func: Callable[[Any, int, int], Awaitable[bytes]],
+        thumbs: Mapping[str, vfs.FileContentProto],
+    ) -> None:
+        super().__init__(size=size, read_func=read_func)
+        self.thumbs = thumbs
+
+    @staticmethod
+    def guard(fc: Any) -> TypeGuard["FileContentPhoto"]:
+        return isinstance(fc, FileContentPhoto)
+
+    def __repr__(self):
+        return f"FileContentPhoto(size={self.size}, thumbs={list(self.thumbs.keys())})"
+
+
+class PhotoThumbsCache:
+    """Bounded LRU cache of whole photo thumbnails. Thumbnails are small so they are fetched in one request and kept apart from the documents cache"""
+
+    def __init__(self, capacity: int = PHOTO_THUMBS_CACHE_CAPACITY) -> None:
+        self._capacity = capacity
+        self._total_size = 0
+        self._thumbs: OrderedDict[PhotoThumbKey, bytes] = OrderedDict()
+        self._fetching: dict[PhotoThumbKey, asyncio.Task[bytes]] = {}
+
+    @property
+    def total_size(self):
+        return self._total_size
+
+    def __contains__(self, key: PhotoThumbKey):
+        return key in self._thumbs
+
+    async def get(
+        self, key: PhotoThumbKey, fetch: Callable[[], Awaitable[bytes]]
+    ) -> bytes:
+        """Returns the cached thumbnail calling `fetch` if it's missing. Simultaneous requests for the same thumbnail share one fetch"""
+        if (data := self._thumbs.get(key)) is not None:
+            self._thumbs.move_to_end(key)
+            return data
+
+        if (task := self._fetching.get(key)) is None:
+            task = self._fetching[key] = asyncio.ensure_future(fetch())
+            task.add_done_callback(lambda _: self._fetching.pop(key, None))
+
+        data = await asyncio.shield(task)
+
+        if key not in self._thumbs:
+            self._put(key, data)
+
+        return data
+
+    def _put(self, key: PhotoThumbKey, data: bytes):
+        if len(data) > self._capacity:
+            return
+
+        self._thumbs[key] = data
+        self._total_size += len(data)
+
+        while self._total_size > self._capacity:
+            _, evicted = self._thumbs.popitem(last=False)
+            self._total_size -= len(evicted)
+
+
 def get_message_downloadable_size(message: MessageDownloadable):
     if MessageWithCompressedPhoto.guard(message):
         return SourceItemPhoto(message.photo).size
@@ -47,19 +122,30 @@ class TelegramFilesSource:
         self,
         client: tgclient.client_types.TgmountTelegramClientReaderProto,
         request_size: int | None = None,
+        thumbs_cache: PhotoThumbsCache | None = None,
     ) -> None:
         self._client = client
         self._items_file_references: dict[DocId, bytes] = {}
         self._request_size = none_fallback(request_size, BLOCK_SIZE)
+        self._thumbs_cache = none_fallback(thumbs_cache, PhotoThumbsCache())
+
+        # clients that support `upload.getCdnFile` download through the CDN
+        self._cdn_downloader = (
+            CdnDownloader(client)
+            if TgmountTelegramClientCdnProto.guard(client)
+            else None
+        )
 
     def is_message_downloadable(
         self, message: MessageProto
     ) -> TypeGuard[MessageDownloadable]:
         return MessageDownloadable.guard(message)
 
-    def get_filesource_item(self, message: MessageDownloadable) -> FileSourceItem:
+    def get_filesource_item(
+        self, message: MessageDownloadable, thumb_type: str | None = None
+    ) -> FileSourceItem:
         if MessageWithCompressedPhoto.guard(message):
-            return SourceItemPhoto(message.photo)
+            return SourceItemPhoto(message.photo, thumb_type)
 
         if MessageWithDocument.guard(message):
             return SourceItemDocument(message.document)
@@ -73,10 +159,42 @@ class TelegramFilesSource:
         async def read_func(handle: Any, off: int, size: int) -> bytes:
             return await self.read(message, off, size)
 
+        if MessageWithCompressedPhoto.guard(message):
+            return FileContentPhoto(
+                size=item.size,
+                read_func=read_func,
+                thumbs={
+                    thumb_type: self.photo_thumb_content(message, thumb_type)
+                    for thumb_type in get_photo_thumbs_types(message.photo)
+                },
+            )
+
         fc = vfs.FileContent(size=item.size, read_func=read_func)
 
         return fc
 
+    def photo_thumb_content(
+        self, message: MessageWithCompressedPhoto, thumb_type: str
+    ) -> vfs.FileContent:
+        item = self.get_filesource_item(message, thumb_type)
+
+        async def read_func(handle: Any, off: int, size: int) -> bytes:
+            data = await self.read_photo_thumb(message, thumb_type)
+            return data[off : off + size]
+
+        return vfs.FileContent(size=item.size, read_func=read_func)
+
+    async def read_photo_thumb(
+        self, message: MessageWithCompressedPhoto, thumb_type: str
+    ) -> bytes:
+        """Returns the whole thumbnail fetching it on the first access"""
+        item = self.get_filesource_item(message, thumb_type)
+
+        return await self._thumbs_cache.get(
+            (item.id, thumb_type),
+            lambda: self._item_read(message, item, 0, item.size),
+        )
+
     async def read(
         self, message: MessageDownloadable, offset: int, limit: int
     ) -> bytes:
@@ -136,9 +254,14 @@ class TelegramFilesSource:
         request_size=BLOCK_SIZE,
     ) -> bytes:
 
+        if self._cdn_downloader is not None:
+            return await self._cdn_downloader.retrieve(
+                input_location, offset, limit, request_size=request_size
+            )
+
         # XXX adjust request_size
         ranges = split_range(offset, limit, request_size)
-        result = bytes()
+        chunks = []
 
         # if random() > 0.9:
         #     raise FileReferenceExpiredError(None)
@@ -151,9 +274,9 @@ class TelegramFilesSource:
             file_size=document_size,
         ):
             self.logger.trace(f"chunk = {len(chunk)} bytes")
-            result += chunk
+            chunks.append(chunk)
 
-        return result[offset - ranges[0] : offset - ranges[0] + limit]
+        return join_blocks(chunks, offset - ranges[0], limit)
 
     async def _message_read(
         self,
@@ -161,8 +284,17 @@ class TelegramFilesSource:
         offset: int,
         limit: int,
     ) -> bytes:
-        item = self.get_filesource_item(message)
+        return await self._item_read(
+            message, self.get_filesource_item(message), offset, limit
+        )
 
+    async def _item_read(
+        self,
+        message: MessageDownloadable,
+        item: FileSourceItem,
+        offset: int,
+        limit: int,
+    ) -> bytes:
         self.logger.trace(
             f"TelegramFilesSource._item_read_function(Message(id={message.id},chat_id={message.chat_id}), item(name={message.file.name}, id={item.id}, offset={offset}, limit={limit})"
         )
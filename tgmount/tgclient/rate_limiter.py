@@ -0,0 +1,248 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Mapping, Optional
+
+from telethon import errors
+
+from tgmount.util import none_fallback
+
+from .logger import logger as module_logger
+
+RpcClass = str
+
+RPC_CLASS_DOWNLOAD: RpcClass = "download"
+RPC_CLASS_UPLOAD: RpcClass = "upload"
+RPC_CLASS_MESSAGES: RpcClass = "messages"
+RPC_CLASS_ENTITIES: RpcClass = "entities"
+RPC_CLASS_OTHER: RpcClass = "other"
+
+RPC_CLASSES: Mapping[str, RpcClass] = {
+    "GetFileRequest": RPC_CLASS_DOWNLOAD,
+    "GetCdnFileRequest": RPC_CLASS_DOWNLOAD,
+    "ReuploadCdnFileRequest": RPC_CLASS_DOWNLOAD,
+    "GetCdnFileHashesRequest": RPC_CLASS_DOWNLOAD,
+    "GetFileHashesRequest": RPC_CLASS_DOWNLOAD,
+    "SaveFilePartRequest": RPC_CLASS_UPLOAD,
+    "SaveBigFilePartRequest": RPC_CLASS_UPLOAD,
+    "GetHistoryRequest": RPC_CLASS_MESSAGES,
+    "GetMessagesRequest": RPC_CLASS_MESSAGES,
+    "SearchRequest": RPC_CLASS_MESSAGES,
+    "SearchGlobalRequest": RPC_CLASS_MESSAGES,
+    "GetRepliesRequest": RPC_CLASS_MESSAGES,
+    "GetUsersRequest": RPC_CLASS_ENTITIES,
+    "GetFullUserRequest": RPC_CLASS_ENTITIES,
+    "GetChannelsRequest": RPC_CLASS_ENTITIES,
+    "GetFullChannelRequest": RPC_CLASS_ENTITIES,
+    "GetChatsRequest": RPC_CLASS_ENTITIES,
+    "ResolveUsernameRequest": RPC_CLASS_ENTITIES,
+    "GetParticipantRequest": RPC_CLASS_ENTITIES,
+}
+""" Maps telethon request class names to the rate limiter class """
+
+
+@dataclass
+class RateLimit:
+    rate: Optional[float]
+    """ Tokens per second. `None` doesn't limit the rate, flood waits still pause the class """
+
+    burst: int
+    """ Bucket capacity """
+
+
+DEFAULT_RATE_LIMITS: Mapping[RpcClass, RateLimit] = {
+    # file transfers are only paused by flood waits unless a limit is passed
+    RPC_CLASS_DOWNLOAD: RateLimit(rate=None, burst=0),
+    RPC_CLASS_UPLOAD: RateLimit(rate=None, burst=0),
+    RPC_CLASS_MESSAGES: RateLimit(rate=3, burst=5),
+    RPC_CLASS_ENTITIES: RateLimit(rate=5, burst=10),
+    RPC_CLASS_OTHER: RateLimit(rate=10, burst=10),
+}
+
+FloodError = tuple(
+    getattr(errors, name)
+    for name in (
+        "FloodWaitError",
+        "FloodPremiumWaitError",
+        "FloodTestPhoneWaitError",
+    )
+    if hasattr(errors, name)
+)
+
+
+def get_rpc_class(request: Any) -> RpcClass:
+    if isinstance(request, (list, tuple)):
+        if len(request) == 0:
+            return RPC_CLASS_OTHER
+        request = request[0]
+
+    return RPC_CLASSES.get(type(request).__name__, RPC_CLASS_OTHER)
+
+
+class TokenBucket:
+    """Token bucket which slows down after a flood wait and recovers its rate on successful calls"""
+
+    MIN_RATE_FACTOR = 0.1
+    RECOVERY_STEP = 0.05
+
+    def __init__(self, rate: Optional[float], burst: int) -> None:
+        self._max_rate = rate
+        self._rate = rate
+        self._burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+        self.waiting = 0
+        """ Number of callers waiting for a token """
+        self.requests = 0
+        self.flood_waits = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    @property
+    def rate(self):
+        return self._rate
+
+    def _refill(self, now: float):
+        assert self._rate is not None
+
+        self._tokens = min(
+            self._burst, self._tokens + (now - self._updated) * self._rate
+        )
+        self._updated = now
+
+    def _delay(self, now: float) -> float:
+        if now < self._blocked_until:
+            return self._blocked_until - now
+
+        if self._rate is None:
+            return 0
+
+        self._refill(now)
+
+        if self._tokens >= 1:
+            return 0
+
+        return (1 - self._tokens) / self._rate
+
+    async def acquire(self):
+        started = time.monotonic()
+        self.waiting += 1
+
+        try:
+            async with self._lock:
+                while (delay := self._delay(time.monotonic())) > 0:
+                    await asyncio.sleep(delay)
+
+                self._tokens -= 1
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - started
+
+        self.requests += 1
+        self.total_wait_time += waited
+        self.max_wait_time = max(self.max_wait_time, waited)
+
+    def on_success(self):
+        if self._rate is None or self._max_rate is None:
+            return
+
+        if self._rate < self._max_rate:
+            self._rate = min(
+                self._max_rate, self._rate + self._max_rate * self.RECOVERY_STEP
+            )
+
+    def on_flood_wait(self, seconds: float):
+        """Blocks the bucket for `seconds` and halves the rate"""
+        self.flood_waits += 1
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+        if self._rate is None or self._max_rate is None:
+            return
+
+        self._rate = max(self._max_rate * self.MIN_RATE_FACTOR, self._rate / 2)
+        self._tokens = 0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "rate": self._rate,
+            "queue_depth": self.waiting,
+            "requests": self.requests,
+            "flood_waits": self.flood_waits,
+            "total_wait_time": self.total_wait_time,
+            "max_wait_time": self.max_wait_time,
+            "average_wait_time": (
+                self.total_wait_time / self.requests if self.requests > 0 else 0.0
+            ),
+        }
+
+
+class RateLimiter:
+    """Holds a `TokenBucket` per RPC class. Retries requests that caught a flood wait shorter than `flood_sleep_threshold`"""
+
+    logger = module_logger.getChild("RateLimiter")
+
+    def __init__(
+        self,
+        rate_limits: Optional[Mapping[RpcClass, RateLimit]] = None,
+        flood_sleep_threshold: int = 60,
+    ) -> None:
+        rate_limits = {**DEFAULT_RATE_LIMITS, **none_fallback(rate_limits, {})}
+
+        self._buckets: dict[RpcClass, TokenBucket] = {
+            rpc_class: TokenBucket(rate=limit.rate, burst=limit.burst)
+            for rpc_class, limit in rate_limits.items()
+        }
+
+        self.flood_sleep_threshold = flood_sleep_threshold
+
+    def get_bucket(self, rpc_class: RpcClass) -> TokenBucket:
+        return self._buckets.get(rpc_class, self._buckets[RPC_CLASS_OTHER])
+
+    @asynccontextmanager
+    async def limit(self, rpc_class: RpcClass):
+        bucket = self.get_bucket(rpc_class)
+        await bucket.acquire()
+
+        try:
+            yield
+        except FloodError as e:
+            self.logger.warning(f"{rpc_class}: flood wait for {e.seconds} seconds.")
+            bucket.on_flood_wait(max(1, e.seconds))
+            raise
+        else:
+            bucket.on_success()
+
+    async def call(
+        self,
+        rpc_class: RpcClass,
+        func,
+        *args,
+        flood_sleep_threshold: Optional[int] = None,
+        **kwargs,
+    ):
+        """Calls `func` acquiring a token before each attempt. `flood_sleep_threshold` overrides the limiter's one for this call"""
+        threshold = none_fallback(flood_sleep_threshold, self.flood_sleep_threshold)
+
+        while True:
+            try:
+                async with self.limit(rpc_class):
+                    return await func(*args, **kwargs)
+            except FloodError as e:
+                if e.seconds > threshold:
+                    raise
+            except errors.SlowModeWaitError as e:
+                # slow mode is chat specific so it doesn't affect the bucket
+                if e.seconds > threshold:
+                    raise
+
+                await asyncio.sleep(e.seconds)
+
+    def stats(self) -> dict[RpcClass, dict[str, Any]]:
+        return {
+            rpc_class: bucket.stats() for rpc_class, bucket in self._buckets.items()
+        }
@@ -2,10 +2,13 @@ from typing import Optional
 
 from telethon.tl.custom.file import File
 
-from tgmount.tgclient.message_types import PhotoProto
+from tgmount.tgclient.message_types import PhotoProto, PhotoSizeProto
 from ..types import InputPhotoFileLocation, TypeInputFileLocation, DocId
 from .item import FileSourceItem, InputLocation
 
+PHOTO_INLINE_SIZE_TYPES = frozenset({"i", "j"})
+""" Stripped thumbnails and vector outlines are embedded into the message and cannot be downloaded """
+
 
 def get_photo_input_location(
     photo: PhotoProto,
@@ -15,48 +18,81 @@ def get_photo_input_location(
     return InputPhotoFileLocation(
         id=photo.id,
         access_hash=photo.access_hash,
-        file_reference=file_reference
-        if file_reference is not None
-        else photo.file_reference,
+        file_reference=(
+            file_reference if file_reference is not None else photo.file_reference
+        ),
         thumb_size=type,
     )
 
 
+def get_photo_size_bytes_count(photo_size: PhotoSizeProto) -> int | None:
+    if hasattr(photo_size, "size"):
+        return photo_size.size
+    elif hasattr(photo_size, "sizes"):
+        return max(photo_size.sizes)
+
+    return None
+
+
+def get_photo_largest_size_type(photo: PhotoProto) -> str:
+    max_size = photo.sizes[0]
+
+    for s in photo.sizes:
+        if getattr(max_size, "h", 0) < getattr(s, "h", 0):
+            max_size = s
+
+    return max_size.type
+
+
+def get_photo_thumbs_types(photo: PhotoProto) -> list[str]:
+    """Returns types of the downloadable sizes of the photo except the largest one ordered from the smallest to the largest"""
+    largest_type = get_photo_largest_size_type(photo)
+
+    thumbs = [
+        s
+        for s in photo.sizes
+        if s.type != largest_type
+        and s.type not in PHOTO_INLINE_SIZE_TYPES
+        and hasattr(s, "w")
+        and get_photo_size_bytes_count(s)
+    ]
+
+    return [
+        s.type for s in sorted(thumbs, key=lambda s: getattr(s, "w") * getattr(s, "h"))
+    ]
+
+
 class SourceItemPhoto(FileSourceItem):
     id: DocId
     file_reference: bytes
     access_hash: int
     size: int
 
-    def __init__(self, photo: PhotoProto) -> None:
+    def __init__(self, photo: PhotoProto, thumb_type: Optional[str] = None) -> None:
+        """`thumb_type` selects one of the photo sizes. By default the largest size is used"""
         self.id = photo.id
         self.file_reference = photo.file_reference
         self.access_hash = photo.access_hash
         self.photo = photo
+        self.thumb_type = thumb_type
         self.size = self.get_size()
         # self.size = File(photo).size  # type: ignore
 
     def get_size(self):
         for s in self.photo.sizes:
             if s.type == self._type():
-                if hasattr(s, "size"):
-                    return s.size
-                elif hasattr(s, "sizes"):
-                    return max(s.sizes)
+                if (size := get_photo_size_bytes_count(s)) is not None:
+                    return size
 
         raise RuntimeError(
             f"Error getting size for the photo: missing type {self._type()}"
         )
 
     def _type(self):
+        if self.thumb_type is not None:
+            return self.thumb_type
 
-        max_size = self.photo.sizes[0]
-
-        for s in self.photo.sizes:
-            if getattr(max_size, "h", 0) < getattr(s, "h", 0):
-                max_size = s
-
-        return max_size.type
+        return get_photo_largest_size_type(self.photo)
 
     def input_location(self, file_reference: Optional[bytes]) -> InputLocation:
         return get_photo_input_location(
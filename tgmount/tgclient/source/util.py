@@ -34,3 +34,28 @@ def split_range(offset: int, limit: int, block_size=BLOCK_SIZE):
     rngs.append(rngs[-1] + block_size)
 
     return rngs
+
+
+def join_blocks(blocks: list[bytes], offset: int, limit: int) -> bytes:
+    """Returns `limit` bytes at `offset` of the concatenated `blocks` copying the data once"""
+    if len(blocks) == 1:
+        # slicing the whole block returns the block itself
+        return blocks[0][offset : offset + limit]
+
+    parts = []
+
+    for block in blocks:
+        if limit <= 0:
+            break
+
+        if offset >= len(block):
+            offset -= len(block)
+            continue
+
+        part = memoryview(block)[offset : offset + limit]
+        parts.append(part)
+
+        limit -= len(part)
+        offset = 0
+
+    return b"".join(parts)
@@ -0,0 +1,144 @@
+import asyncio
+import os
+from contextlib import suppress
+from typing import AsyncGenerator, Callable, Optional
+
+import aiofiles
+
+from tgmount import vfs
+
+from .source.util import BLOCK_SIZE
+from .logger import logger as module_logger
+
+logger = module_logger.getChild("streaming")
+
+STREAM_QUEUE_SIZE = 8
+""" Default number of chunks that may be fetched ahead of the consumer """
+
+_STREAM_END = object()
+
+
+class _StreamError:
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+
+async def stream_file_content(
+    content: vfs.FileContentProto,
+    *,
+    offset: int = 0,
+    request_size: int = BLOCK_SIZE,
+    queue_size: int = STREAM_QUEUE_SIZE,
+) -> AsyncGenerator[bytes, None]:
+    """Yields the content starting from `offset` in chunks of `request_size`.
+
+    Chunks are fetched by a background task into a queue of `queue_size`
+    elements so fetching the next chunk overlaps with whatever the consumer
+    does with the current one. At most `queue_size * request_size` bytes are
+    held in memory.
+    """
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    async def _fetch():
+        try:
+            handle = await content.open_func()
+
+            try:
+                position = offset
+
+                while position < content.size:
+                    block = await content.read_func(
+                        handle, position, min(request_size, content.size - position)
+                    )
+
+                    if len(block) == 0:
+                        break
+
+                    await queue.put(block)
+                    position += len(block)
+            finally:
+                await content.close_func(handle)
+        except Exception as e:
+            await queue.put(_StreamError(e))
+            return
+
+        await queue.put(_STREAM_END)
+
+    fetch_task = asyncio.create_task(_fetch())
+
+    try:
+        while True:
+            item = await queue.get()
+
+            if item is _STREAM_END:
+                break
+
+            if isinstance(item, _StreamError):
+                raise item.error
+
+            yield item
+    finally:
+        fetch_task.cancel()
+
+        with suppress(asyncio.CancelledError):
+            await fetch_task
+
+
+def get_resume_offset(output_path: str, size: int) -> int:
+    """Returns the offset a download into `output_path` can be resumed from. Returns 0 if the file is missing or is larger than `size`."""
+    if not os.path.exists(output_path):
+        return 0
+
+    existing_size = os.path.getsize(output_path)
+
+    if existing_size > size:
+        return 0
+
+    return existing_size
+
+
+async def download_file_content(
+    content: vfs.FileContentProto,
+    output_path: str,
+    *,
+    offset: int = 0,
+    request_size: int = BLOCK_SIZE,
+    queue_size: int = STREAM_QUEUE_SIZE,
+    on_progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    """Writes the content into `output_path` returning the number of bytes written.
+
+    If `offset` is greater than zero the file is truncated to `offset` and the
+    download continues from there, so a partial file left by an interrupted
+    download can be completed with `offset=get_resume_offset(output_path, content.size)`.
+    """
+
+    if offset > 0:
+        output_file = await aiofiles.open(output_path, "r+b")
+        await output_file.truncate(offset)
+        await output_file.seek(offset)
+    else:
+        output_file = await aiofiles.open(output_path, "wb")
+
+    written = 0
+
+    try:
+        async for chunk in stream_file_content(
+            content,
+            offset=offset,
+            request_size=request_size,
+            queue_size=queue_size,
+        ):
+            await output_file.write(chunk)
+            written += len(chunk)
+
+            if on_progress is not None:
+                on_progress(len(chunk))
+    finally:
+        await output_file.close()
+
+    logger.debug(f"download_file_content({output_path}): {written} bytes written")
+
+    return written
+
@@ -0,0 +1,209 @@
+import asyncio
+import os
+import tempfile
+from typing import Any, Awaitable, Callable, Optional, Sequence
+
+from telethon import helpers, types
+
+from tgmount import vfs
+from tgmount.error import TgmountError
+from tgmount.vfs.types.file import FileContentWritableProto
+
+from .client_types import TgmountTelegramClientUploadProto
+from .logger import logger as module_logger
+
+UPLOAD_PART_SIZE = 512 * 1024
+""" The largest part size telegram accepts """
+
+BIG_FILE_SIZE = 10 * 1024 * 1024
+""" Files larger than this are uploaded with `upload.saveBigFilePart` """
+
+DEFAULT_UPLOAD_WORKERS = 4
+
+ReadPart = Callable[[int, int], Awaitable[bytes]]
+""" Returns `size` bytes of the uploaded file at `offset` """
+
+
+class UploadError(TgmountError):
+    pass
+
+
+class FileUploader:
+    """
+    Uploads a file by parts. The parts are sent by several workers at once
+    which keeps multiple requests in flight.
+
+    Returns `InputFile` or `InputFileBig` to be passed to `send_file`.
+    """
+
+    logger = module_logger.getChild("FileUploader")
+
+    def __init__(
+        self,
+        client: TgmountTelegramClientUploadProto,
+        *,
+        part_size: int = UPLOAD_PART_SIZE,
+        workers: int = DEFAULT_UPLOAD_WORKERS,
+    ) -> None:
+        self._client = client
+        self._part_size = part_size
+        self._workers = max(1, workers)
+
+    async def upload(
+        self,
+        read_part: ReadPart,
+        size: int,
+        name: str,
+        *,
+        on_progress: Optional[Callable[[int], Any]] = None,
+    ) -> types.InputFile | types.InputFileBig:
+        file_id = helpers.generate_random_long()
+        big = size > BIG_FILE_SIZE
+        total_parts = max(1, (size + self._part_size - 1) // self._part_size)
+
+        self.logger.debug(f"Uploading {name}, {size} bytes in {total_parts} parts")
+
+        # the workers share the iterator so every part is taken once
+        parts = iter(range(total_parts))
+
+        async def _worker():
+            for part in parts:
+                data = await read_part(part * self._part_size, self._part_size)
+
+                if not await self._client.save_file_part(
+                    file_id, part, total_parts, data, big=big
+                ):
+                    raise UploadError(f"Failed uploading part {part} of {name}")
+
+                if on_progress is not None:
+                    on_progress(len(data))
+
+        workers = [
+            asyncio.ensure_future(_worker())
+            for _ in range(min(self._workers, total_parts))
+        ]
+
+        # the parts of a failed upload are useless so the rest is not sent
+        try:
+            await asyncio.gather(*workers)
+        except BaseException:
+            for worker in workers:
+                worker.cancel()
+
+            await asyncio.gather(*workers, return_exceptions=True)
+            raise
+
+        if big:
+            return types.InputFileBig(file_id, total_parts, name)
+
+        return types.InputFile(file_id, total_parts, name, md5_checksum="")
+
+
+class FileContentUpload(FileContentWritableProto):
+    """
+    Spools writes into a temporary file. When the last handle is released
+    after a write `on_complete` is called to upload the data.
+
+    Once the data is uploaded, or if nothing was written, the temporary file is
+    closed and `on_closed` is called. If the upload fails the data is kept so
+    closing the file again retries it.
+    """
+
+    def __init__(
+        self,
+        on_complete: Callable[["FileContentUpload"], Awaitable[None]],
+        on_closed: Callable[["FileContentUpload"], Awaitable[None]],
+    ) -> None:
+        self.size = 0
+        self._on_complete = on_complete
+        self._on_closed = on_closed
+        self._file = tempfile.TemporaryFile()
+        self._handles = 0
+        self._modified = False
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    async def open_func(self) -> None:
+        self._handles += 1
+
+    async def close_func(self, handle):
+        self._handles -= 1
+
+        if self._handles > 0 or self._file.closed:
+            return
+
+        if self._modified:
+            await self._on_complete(self)
+            self._modified = False
+
+        self._file.close()
+        await self._on_closed(self)
+
+    async def read_func(self, handle, off: int, size: int) -> bytes:
+        return os.pread(self._file.fileno(), size, off)
+
+    async def write(self, handle, off: int, buf: bytes):
+        written = os.pwrite(self._file.fileno(), buf, off)
+
+        self.size = max(self.size, off + written)
+        self._modified = True
+
+        return written
+
+    async def seek_func(self, handle, n: int, w: int):
+        raise NotImplementedError()
+
+
+class DirContentUpload(vfs.DirContentListWritable):
+    """Files created in this folder are sent into `entity` as documents once they are written and closed"""
+
+    logger = module_logger.getChild("DirContentUpload")
+
+    def __init__(
+        self,
+        client: TgmountTelegramClientUploadProto,
+        entity,
+        content_list: Sequence[vfs.DirContentItem] = (),
+        *,
+        uploader: Optional[FileUploader] = None,
+    ):
+        super().__init__(content_list)
+        self._client = client
+        self._entity = entity
+        self._uploader = uploader if uploader is not None else FileUploader(client)
+
+    async def create(self, filename: str) -> vfs.FileLike:
+        if any(item.name == filename for item in self.content_list):
+            raise FileExistsError(f"{filename} is already in the folder")
+
+        return await super().create(filename)
+
+    async def create_filelike(self, filename: str) -> vfs.FileLike:
+        async def _on_complete(content: FileContentUpload):
+            await self._upload(filename, content)
+
+        async def _on_closed(content: FileContentUpload):
+            # the uploaded file appears in the folders of the entity
+            self.content_list = [
+                item for item in self.content_list if item.content is not content
+            ]
+
+        return vfs.FileLike(
+            filename, FileContentUpload(_on_complete, _on_closed), writable=True
+        )
+
+    async def _upload(self, filename: str, content: FileContentUpload):
+        self.logger.info(f"Uploading {filename} ({content.size} bytes)")
+
+        try:
+            input_file = await self._uploader.upload(
+                lambda off, size: content.read_func(None, off, size),
+                content.size,
+                filename,
+            )
+            await self._client.send_file(self._entity, input_file, force_document=True)
+        except Exception as e:
+            self.logger.error(f"Error while uploading {filename}: {e}")
+            raise
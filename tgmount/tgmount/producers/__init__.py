@@ -6,3 +6,4 @@ from . import producer_by_reaction
 from . import producer_by_sender
 from . import producer_sysinfo
 from . import producer_plain
+from . import producer_upload
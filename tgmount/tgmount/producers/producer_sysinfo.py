@@ -1,6 +1,7 @@
 from typing import Any, Callable, Mapping
 from tgmount import vfs
 from tgmount.tgclient.guards import MessageDownloadable
+from tgmount.tgclient.rate_limiter import RateLimiter
 from tgmount.tgmount.cached_filefactory_factory import CacheFileFactoryFactory
 from tgmount.tgmount.tgmount_types import TgmountResources
 from tgmount.tgmount.tgmountbase import TgmountBase
@@ -57,6 +58,7 @@ class SysInfoCaches(vfs.FileContentStringProto):
 
 
 from tgmount import fs
+from tgmount.fs.metrics import LATENCY_BUCKETS
 
 
 class SysInfoFileSystem(vfs.FileContentStringProto):
@@ -75,6 +77,60 @@ class SysInfoFileSystem(vfs.FileContentStringProto):
         return result
 
 
+class SysInfoFileSystemMetrics(vfs.FileContentStringProto):
+    size = 666666
+
+    def __init__(self, get_fs: Callable[[], fs.FileSystemOperations]) -> None:
+        super().__init__()
+        self._get_fs = get_fs
+
+    async def get_string(self, handle: Any) -> str:
+        metrics = self._get_fs().metrics
+        result = ""
+
+        result += f"In flight: {metrics.in_flight} (max {metrics.max_in_flight})\n\n"
+        buckets = ", ".join(f"{b}s" for b in LATENCY_BUCKETS)
+
+        result += f"Latency buckets: {buckets}, slower\n\n"
+
+        result += (
+            "operation\trequests\terrors\tin flight\tavg time\tmax time\thistogram\n"
+        )
+
+        for name, stats in [*metrics.stats().items(), ("all", metrics.total())]:
+            result += (
+                f"{name}\t{stats['requests']}\t\t{stats['errors']}\t"
+                f"{stats['in_flight']}\t\t{stats['average_time']:.3f}s\t\t"
+                f"{stats['max_time']:.3f}s\t\t{stats['histogram']}\n"
+            )
+
+        return result
+
+
+class SysInfoRateLimiter(vfs.FileContentStringProto):
+    size = 666666
+
+    def __init__(self, rate_limiter: RateLimiter) -> None:
+        super().__init__()
+        self._rate_limiter = rate_limiter
+
+    async def get_string(self, handle: Any) -> str:
+        result = ""
+
+        result += f"class\t\trate\tqueue\trequests\tflood waits\tavg wait\tmax wait\n"
+
+        for rpc_class, stats in self._rate_limiter.stats().items():
+            rate = f"{stats['rate']:.2f}" if stats["rate"] is not None else "-"
+
+            result += (
+                f"{rpc_class}\t{rate}\t{stats['queue_depth']}\t"
+                f"{stats['requests']}\t\t{stats['flood_waits']}\t\t"
+                f"{stats['average_wait_time']:.3f}s\t\t{stats['max_wait_time']:.3f}s\n"
+            )
+
+        return result
+
+
 class VfsTreeProducerSysInfo(VfsTreeProducerProto):
     logger = module_logger.getChild("VfsTreeProducerSysInfo")
 
@@ -115,5 +171,17 @@ class VfsTreeProducerSysInfo(VfsTreeProducerProto):
         tgm: TgmountBase = get_tgm()
 
         await fs_dir.put_content(
-            vfs.vfile("info", SysInfoFileSystem(lambda: tgm.fs)),
+            [
+                vfs.vfile("info", SysInfoFileSystem(lambda: tgm.fs)),
+                vfs.vfile("metrics", SysInfoFileSystemMetrics(lambda: tgm.fs)),
+            ]
         )
+
+        rate_limiter: RateLimiter | None = getattr(tgm.client, "rate_limiter", None)
+
+        if yes(rate_limiter):
+            client_dir = await self._vfs_tree_dir.create_dir("client")
+
+            await client_dir.put_content(
+                vfs.vfile("rate_limits", SysInfoRateLimiter(rate_limiter)),
+            )
@@ -0,0 +1,91 @@
+from typing import Callable, Mapping
+
+from tgmount import config, vfs
+from tgmount.tgclient.uploader import DirContentUpload, FileUploader
+from tgmount.tgmount.tgmount_types import TgmountResources
+from tgmount.tgmount.tgmountbase import TgmountBase
+from tgmount.tgmount.vfs_tree import VfsTreeDir
+from tgmount.tgmount.vfs_tree_producer_types import (
+    VfsTreeProducerConfig,
+    VfsTreeProducerProto,
+)
+from tgmount.util import yes
+
+from .logger import module_logger
+
+
+class VfsTreeProducerUpload(VfsTreeProducerProto):
+    """
+    Puts a writable folder into the directory. Files written into it are sent
+    as documents into the entity of the message source.
+
+    The uploaded messages appear in the folders produced from the source
+    after telegram sends the update.
+    """
+
+    logger = module_logger.getChild("VfsTreeProducerUpload")
+
+    def __init__(
+        self,
+        resources: TgmountResources,
+        vfs_tree_dir: VfsTreeDir,
+        entity,
+        dir_name: str,
+        workers: int | None = None,
+    ) -> None:
+        self._resources = resources
+        self._vfs_tree_dir = vfs_tree_dir
+        self._entity = entity
+        self._dir_name = dir_name
+        self._workers = workers
+
+    @classmethod
+    async def from_config(
+        cls,
+        resources: TgmountResources,
+        config: VfsTreeProducerConfig,
+        arg: Mapping,
+        vfs_tree_dir: VfsTreeDir,
+    ) -> "VfsTreeProducerProto":
+        return VfsTreeProducerUpload(
+            resources=resources,
+            vfs_tree_dir=vfs_tree_dir,
+            entity=cls.get_entity(resources, config),
+            dir_name=arg.get("dir_name", "upload"),
+            workers=arg.get("workers"),
+        )
+
+    @staticmethod
+    def get_entity(resources: TgmountResources, producer_config: VfsTreeProducerConfig):
+        """Finds the entity of the message source the producer is configured with"""
+        for source_id, source in resources.message_sources.as_mapping().items():
+            fetcher = resources.fetchers_dict.get(source_id)
+
+            if source is producer_config.message_source and fetcher is not None:
+                return fetcher.cfg.entity
+
+        raise config.ConfigError(
+            f"Missing the entity of the message source for {producer_config}"
+        )
+
+    async def produce(self):
+        get_tgm: Callable[[], TgmountBase] | None = self._resources.extra.get("get_tgm")
+
+        if not yes(get_tgm):
+            self.logger.warning("Missing get_tgm in extra.")
+            return
+
+        client = get_tgm().client
+
+        uploader = (
+            FileUploader(client, workers=self._workers)
+            if self._workers is not None
+            else None
+        )
+
+        await self._vfs_tree_dir.put_content(
+            vfs.DirLike(
+                self._dir_name,
+                DirContentUpload(client, self._entity, uploader=uploader),
+            )
+        )
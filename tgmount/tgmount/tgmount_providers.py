@@ -7,6 +7,7 @@ from tgmount.tgmount.producers.producer_by_reaction import VfsTreeGroupByReactio
 from tgmount.tgmount.producers.producer_by_sender import VfsTreeDirBySender
 from tgmount.tgmount.producers.producer_plain import VfsTreeProducerPlainDir
 from tgmount.tgmount.producers.producer_sysinfo import VfsTreeProducerSysInfo
+from tgmount.tgmount.producers.producer_upload import VfsTreeProducerUpload
 from tgmount.tgmount.producers.producer_zip import VfsProducerZip
 from tgmount.tgmount.vfs_tree_producer_types import VfsTreeProducerProto
 from tgmount.tgmount.wrappers.wrapper_exclude_empty_dirs import WrapperEmpty
@@ -28,6 +29,7 @@ from .providers.provider_caches import CacheTypesProviderBase
 from .providers.provider_filters import FilterProviderBase
 from .providers.provider_vfs_wrappers import ProviderVfsWrappersBase
 from .providers.provider_producers import ProducersProviderBase
+from .wrappers.wrapper_photo_thumbs import WrapperPhotoThumbs
 from .wrappers.wrapper_zips_as_dirs import WrapperZipsAsDirs
 
 
@@ -35,6 +37,7 @@ class VfsWrappersProvider(ProviderVfsWrappersBase):
     wrappers = {
         "ExcludeEmptyDirs": WrapperEmpty,
         "ZipsAsDirs": WrapperZipsAsDirs,
+        "PhotoThumbs": WrapperPhotoThumbs,
     }
 
 
@@ -53,6 +56,7 @@ class ProducersProvider(ProducersProviderBase):
         "ByReactions": VfsTreeGroupByReactions,
         "SysInfo": VfsTreeProducerSysInfo,
         "UnpackedZip": VfsProducerZip,
+        "Upload": VfsTreeProducerUpload,
     }
 
 
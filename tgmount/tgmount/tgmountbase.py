@@ -1,3 +1,5 @@
+import asyncio
+import contextlib
 import os
 from typing import Mapping, Optional, Type
 
@@ -5,7 +7,11 @@ from telethon import events
 
 from tgmount import fs, main, tgclient, tglog, vfs, config
 from tgmount.fs.update import FileSystemOperationsUpdate
-from tgmount.tgclient.events_disptacher import EntityId, TelegramEventsDispatcher
+from tgmount.tgclient.events_disptacher import (
+    EntityId,
+    EventType,
+    TelegramEventsDispatcher,
+)
 from tgmount.tgclient.message_reaction_event import MessageReactionEvent
 from tgmount.tgclient.message_types import MessageProto
 from tgmount.tgmount.vfs_tree_producer import VfsTree, VfsTreeProducer
@@ -25,6 +31,9 @@ from .vfs_tree_types import (
     TreeEventUpdatedItems,
 )
 
+DEFAULT_UPDATE_BATCH_SIZE = 1000
+""" Number of gathered telegram events that triggers processing before the update window ends """
+
 
 class TgmountBase:
     """
@@ -35,7 +44,7 @@ class TgmountBase:
 
     FileSystemOperations: Type[
         fs.FileSystemOperationsUpdatable
-    ] = fs.FileSystemOperationsUpdatable
+    ] = fs.FileSystemOperationsWritable
 
     logger = _logger.getChild("TgmountBase")
 
@@ -53,12 +62,18 @@ class TgmountBase:
         self._mount_dir: Optional[str] = mount_dir
 
         self._fs = None
+        self._unmounted = False
 
         self._vfs_tree: VfsTree
         self._producer: VfsTreeProducer
         self._events_dispatcher: TelegramEventsDispatcher
         self._update_lock = MyLock("TgmountBase._update_lock", self.logger, tglog.TRACE)
 
+        self._update_window = 0.0
+        self._update_batch_size = DEFAULT_UPDATE_BATCH_SIZE
+        self._pending_events: list[tuple[EntityId, EventType]] = []
+        self._flush_task: asyncio.Task | None = None
+
     @property
     def vfs_tree(self) -> VfsTree:
         return self._vfs_tree
@@ -131,43 +146,30 @@ class TgmountBase:
         - Unlock here
     """
 
-    @measure_time(logger_func=logger.info)
+    def set_update_window(self, update_window: float, batch_size: Optional[int] = None):
+        """
+        Telegram events are gathered for `update_window` seconds or until there are `batch_size` of them and then pass the pipeline together.
+
+        Zero window processes every event as it comes
+        """
+        self._update_window = update_window
+        self._update_batch_size = none_fallback(batch_size, DEFAULT_UPDATE_BATCH_SIZE)
+
     async def on_new_message(self, entity_id: EntityId, event: events.NewMessage.Event):
         self.logger.info(
             f"on_new_message({entity_id}, {MessageProto.repr_short(event.message)})"
         )
         self.logger.trace(f"on_new_message({event})")
-        listener = TreeListener(self._vfs_tree)
-        async with self._update_lock:
-            async with listener:
-                await self.events_dispatcher.process_new_message_event(entity_id, event)
 
-            if len(listener.events) > 0:
-                self.logger.debug(f"Tree generated {len(listener.events)} events")
-                await self._on_vfs_tree_update(listener.events)
-
-        # self.logger.info(f"on_new_message() done")
+        await self._on_event(entity_id, event)
 
-    @measure_time(logger_func=logger.info)
     async def on_delete_message(
         self, entity_id: EntityId, event: events.MessageDeleted.Event
     ):
         self.logger.info(f"on_delete_message({entity_id}, {event.deleted_ids})")
-        listener = TreeListener(self._vfs_tree)
-
-        async with self._update_lock:
-            async with listener:
-                await self.events_dispatcher.process_delete_message_event(
-                    entity_id, event
-                )
 
-            if len(listener.events) > 0:
-                self.logger.debug(f"Tree generated {len(listener.events)} events")
-                await self._on_vfs_tree_update(listener.events)
+        await self._on_event(entity_id, event)
 
-        # self.logger.info(f"on_delete_message() done")
-
-    @measure_time(logger_func=logger.info)
     async def on_edited_message(
         self,
         entity_id: EntityId,
@@ -184,16 +186,70 @@ class TgmountBase:
 
         self.logger.trace(event)
 
+        await self._on_event(entity_id, event)
+
+    async def _on_event(self, entity_id: EntityId, event: EventType):
+        if self._update_window <= 0:
+            await self._process_events([(entity_id, event)])
+            return
+
+        self._pending_events.append((entity_id, event))
+
+        if len(self._pending_events) >= self._update_batch_size:
+            await self.flush_events()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_events_later())
+            self._flush_task.add_done_callback(self._on_flush_task_done)
+
+    async def _flush_events_later(self):
+        await asyncio.sleep(self._update_window)
+        self._flush_task = None
+        await self.flush_events()
+
+    def _on_flush_task_done(self, task: asyncio.Task):
+        if task.cancelled():
+            return
+
+        if (e := task.exception()) is not None:
+            self.logger.error(f"Error processing gathered events: {e}", exc_info=e)
+
+    async def close(self):
+        """Stops waiting for the update window and processes the gathered events"""
+        if (flush_task := self._flush_task) is not None:
+            self._flush_task = None
+            flush_task.cancel()
+
+            with contextlib.suppress(asyncio.CancelledError):
+                await flush_task
+
+        await self.flush_events()
+
+    async def flush_events(self):
+        """Processes the gathered events"""
+        pending_events, self._pending_events = self._pending_events, []
+
+        if len(pending_events) > 0:
+            await self._process_events(pending_events)
+
+    @measure_time(logger_func=logger.info)
+    async def _process_events(self, pending_events: list[tuple[EntityId, EventType]]):
+        """Passes the events grouped by entity through the dispatcher and applies the resulting tree events to the filesystem at once"""
+        by_entity: dict[EntityId, list[EventType]] = {}
+
+        for entity_id, event in pending_events:
+            by_entity.setdefault(entity_id, []).append(event)
+
         listener = TreeListener(self._vfs_tree)
 
         async with self._update_lock:
             async with listener:
-                try:
-                    await self.events_dispatcher.process_edited_message_event(
-                        entity_id, event
-                    )
-                except Exception as e:
-                    self.logger.error(e)
+                for entity_id, entity_events in by_entity.items():
+                    try:
+                        await self.events_dispatcher.process_events(
+                            entity_id, entity_events
+                        )
+                    except Exception as e:
+                        self.logger.error(e)
 
             if len(listener.events) > 0:
                 self.logger.debug(f"Tree generated {len(listener.events)} events")
@@ -205,8 +261,12 @@ class TgmountBase:
             self.logger.error(f"self._fs is not created yet.")
             return
 
-        async with self._fs._update_lock:
-            await self._fs.update(fs_update)
+        # the kernel can't be notified once the fuse session is closed
+        if self._unmounted:
+            self.logger.debug("Skipping the filesystem update after unmounting.")
+            return
+
+        await self._fs.update(fs_update)
 
     async def produce_vfs_tree(self):
         """Produce VfsTree"""
@@ -217,8 +277,17 @@ class TgmountBase:
     async def resume_dispatcher(self):
         await self.events_dispatcher.resume()
 
-    async def create_fs(self):
-        """Produce VfsTree and create `FileSystemOperations`"""
+    async def create_fs(
+        self,
+        *,
+        entry_timeout: Optional[float] = None,
+        attr_timeout: Optional[float] = None,
+        direct_io_dirs: Optional[list[str]] = None,
+        lazy: bool = False,
+    ):
+        """Produce VfsTree and create `FileSystemOperations`. With `lazy` set the producers run when their folders are read for the first time"""
+
+        self._vfs_tree.lazy = lazy
 
         await self.produce_vfs_tree()
 
@@ -226,7 +295,12 @@ class TgmountBase:
 
         root = vfs.root(root_contet)
 
-        self._fs = self.FileSystemOperations(root)
+        self._fs = self.FileSystemOperations(
+            root,
+            entry_timeout=entry_timeout,
+            attr_timeout=attr_timeout,
+            direct_io_dirs=direct_io_dirs,
+        )
 
     async def _on_vfs_tree_update(self, updates: list[TreeEventType]):
         if len(updates) == 0:
@@ -245,36 +319,38 @@ class TgmountBase:
         # await self._update_fs(fs_update)
 
     async def _dispatch_to_filesystem(self, events: list[TreeEventType[VfsTreeDir]]):
-        for e in events:
-            update = fs.FileSystemOperationsUpdate()
+        """Merges the events into a single update which is applied once"""
+        update = fs.FileSystemOperationsUpdate()
 
+        for e in events:
             if isinstance(e, TreeEventRemovedItems):
                 path = e.sender.path
 
                 for item in e.removed_items:
-                    update.removed_files.append(os.path.join(path, item.name))
+                    update.add_removed_file(os.path.join(path, item.name))
 
             elif isinstance(e, TreeEventNewItems):
                 path = e.sender.path
 
                 for item in e.new_items:
                     if isinstance(item, vfs.FileLike):
-                        update.new_files[os.path.join(path, item.name)] = item
+                        update.add_new_file(os.path.join(path, item.name), item)
                     else:
-                        update.new_dirs[os.path.join(path, item.name)] = item
+                        update.add_new_dir(os.path.join(path, item.name), item)
 
             elif isinstance(e, TreeEventRemovedDirs):
                 for path in e.removed_dirs:
-                    update.removed_dirs.append(path)
+                    update.add_removed_dir(path)
 
             elif isinstance(e, TreeEventUpdatedItems):
                 for path, item in e.updated_items.items():
-                    update.update_items[path] = item
+                    update.add_updated_item(path, item)
 
             elif isinstance(e, TreeEventNewDirs):
                 for path in e.new_dirs:
-                    update.new_dirs[path] = await self._vfs_tree.get_dir_content(path)
+                    update.add_new_dir(path, await self._vfs_tree.get_dir_content(path))
 
+        if not update.is_empty():
             await self._update_fs(update)
 
         # return update
@@ -285,6 +361,14 @@ class TgmountBase:
         mount_dir: Optional[str] = None,
         debug_fuse=False,
         min_tasks=10,
+        max_tasks: Optional[int] = None,
+        entry_timeout: Optional[float] = None,
+        attr_timeout: Optional[float] = None,
+        update_window: Optional[float] = None,
+        update_batch_size: Optional[int] = None,
+        direct_io_dirs: Optional[list[str]] = None,
+        max_read: Optional[int] = None,
+        lazy: bool = False,
     ):
         """Mount process consists of two phases: fetching messages and building vfs root"""
         mount_dir = none_fallback(mount_dir, self._mount_dir)
@@ -294,25 +378,39 @@ class TgmountBase:
 
         # self.logger.info(f"Building...")
 
+        if update_window is not None:
+            self.set_update_window(update_window, update_batch_size)
+
         assert self._events_dispatcher.is_paused
 
         # fetch initial messages
         await self.fetch_messages()
 
         # create
-        await self.create_fs()
+        await self.create_fs(
+            entry_timeout=entry_timeout,
+            attr_timeout=attr_timeout,
+            direct_io_dirs=direct_io_dirs,
+            lazy=lazy,
+        )
 
         # pass updates that has been received during previous stages
         await self._events_dispatcher.resume()
 
         self.logger.info(f"Mounting into {mount_dir}")
 
-        await main.util.mount_ops(
-            self._fs,
-            mount_dir=mount_dir,
-            min_tasks=min_tasks,
-            debug=debug_fuse,
-        )
+        try:
+            await main.util.mount_ops(
+                self._fs,
+                mount_dir=mount_dir,
+                min_tasks=min_tasks,
+                max_tasks=max_tasks,
+                max_read=max_read,
+                debug=debug_fuse,
+            )
+        finally:
+            self._unmounted = True
+            await self.close()
 
 
 class TgmountBaseMounter:
@@ -1,5 +1,7 @@
-from collections.abc import Mapping, Sequence
-from typing import Any, Union
+import asyncio
+import sys
+from collections.abc import Iterator, Mapping, Sequence
+from typing import Any, Awaitable, Callable, Union
 
 from tgmount import vfs
 from tgmount.tgclient.message_source_types import (
@@ -23,6 +25,9 @@ from tgmount.util import none_fallback
 from tgmount.util.col import map_keys
 from .logger import module_logger as _logger
 
+LazyProducer = Callable[[], Awaitable[Any]]
+""" Produces the content of a dir when it is read for the first time """
+
 
 class VfsTreeError(TgmountError):
     pass
@@ -46,6 +51,10 @@ class VfsTreeDirContent(vfs.DirContentProto):
     def __repr__(self) -> str:
         return f"VfsTreeDirContent({self._path})"
 
+    @property
+    def path(self) -> str:
+        return self._path
+
     async def _dir_content(self) -> vfs.DirContentProto:
         return await self._tree._get_dir_content(self._path)
 
@@ -69,15 +78,22 @@ class VfsTreeDirMixin:
         self: "VfsTreeDir",  # type: ignore
         content: Mapping[str, vfs.DirContentItem],
     ):
-        result = []
+        for name, item in content.items():
+            if name not in self._dir_content_items:
+                continue
 
-        for item in self._dir_content_items:
-            if item.name in content:
-                result.append(content[item.name])
-            else:
-                result.append(item)
+            # keeps the position of the replaced item
+            if name == item.name:
+                self._dir_content_items[name] = item
+                continue
 
-        self._dir_content_items = result
+            # a renamed item is stored under the new name at the end
+            del self._dir_content_items[name]
+
+            if item.name in self._dir_content_items:
+                self._logger.warning(f"{item.name} is already in {self}. Replacing.")
+
+            self._dir_content_items[item.name] = item
 
     async def _put_content(
         self: "VfsTreeDir",  # type: ignore
@@ -86,23 +102,34 @@ class VfsTreeDirMixin:
         replace=False,
     ):
         if replace:
-            self._dir_content_items = list(content)
-        else:
-            self._dir_content_items.extend(content)
+            self._dir_content_items = {}
+
+        for item in content:
+            if item.name in self._dir_content_items:
+                self._logger.warning(f"{item.name} is already in {self}. Replacing.")
+
+            self._dir_content_items[item.name] = item
 
     async def _get_dir_content_items(self: "VfsTreeDir"):  # type: ignore
-        return self._dir_content_items[:]
+        return list(self._dir_content_items.values())
 
     async def _remove_from_content(
-        self,
+        self: "VfsTreeDir",  # type: ignore
         item: vfs.DirContentItem,
-    ):
-        try:
-            self._dir_content_items.remove(item)
-        except ValueError:
-            self._logger.error(
-                f"Error removing {item} from {self}. Element not found: content: {self._dir_content_items}"
-            )
+    ) -> bool:
+        """Returns False if `item` is not in the content"""
+        existing = self._dir_content_items.get(item.name)
+
+        # an item replaced by another one with the same name is not removed
+        if existing is not None and (existing is item or existing == item):
+            del self._dir_content_items[item.name]
+            return True
+
+        self._logger.error(
+            f"Error removing {item} from {self}. Element not found: content: {list(self._dir_content_items.values())}"
+        )
+
+        return False
 
 
 class VfsTreeDirProducer:
@@ -126,8 +153,27 @@ class VfsTreeDir(VfsTreeDirMixin):
     ) -> None:
         self._parent_tree = tree
         self._path = path
+        self._name = sys.intern(vfs.split_path(vfs.norm_path(path, addslash=True))[1])
+
+        self._parent: "VfsTreeDir | None" = None
+        """ Set by `VfsTree` when the dir is put into the tree """
+
+        self._subdirs: dict[str, "VfsTreeDir"] = {}
+        """ Subdirs by name in the insertion order. Maintained by `VfsTree` """
+
         self._wrappers: list[VfsTreeWrapperProto] = none_fallback(wrappers, [])
-        self._dir_content_items: list[vfs.DirContentItem] = []
+        self._dir_content_items: dict[str, vfs.DirContentItem] = {}
+        """ Items by name in the insertion order """
+
+        self._version = 0
+        """ Incremented when the listing of the dir may have changed """
+
+        self._dir_content_snapshot: tuple[int, vfs.DirContentProto] | None = None
+        """ Wrapped dir content built for `_version` """
+
+        self._lazy_producer: LazyProducer | None = None
+        self._produce_lock: asyncio.Lock | None = None
+        self._producing_task: asyncio.Task | None = None
 
         self._logger = self.logger.getChild(self.path, suffix_as_tag=True)
 
@@ -135,24 +181,93 @@ class VfsTreeDir(VfsTreeDirMixin):
 
     def add_wrapper(self, w: VfsTreeWrapperProto):
         self._wrappers.append(w)
+        self._version += 1
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def set_lazy_producer(self, producer: LazyProducer):
+        """Defers `producer` until the content of the dir is read for the first time"""
+        self._lazy_producer = producer
+        self._produce_lock = asyncio.Lock()
+
+    @property
+    def is_produced(self) -> bool:
+        return self._lazy_producer is None
+
+    async def produce_lazy(self):
+        """Runs the deferred producer once. Other readers wait for it to finish."""
+        # reads made by the producer itself
+        if self._produce_lock is None or self._producing_task is asyncio.current_task():
+            return
+
+        async with self._produce_lock:
+            if self._lazy_producer is None:
+                return
+
+            self._logger.debug(f"Producing on the first access.")
+
+            producer, self._lazy_producer = self._lazy_producer, None
+            self._producing_task = asyncio.current_task()
+
+            try:
+                await producer()
+
+                # the wrappers of the parent saw the dir before it was produced
+                # and check it again even if the producer put nothing
+                await self.child_updated([TreeEventNewItems(sender=self, new_items=[])])
+            finally:
+                self._producing_task = None
+
+    @property
+    def wrappers(self) -> list[VfsTreeWrapperProto]:
+        return self._wrappers
+
+    @property
+    def content_items_count(self) -> int:
+        return len(self._dir_content_items)
+
+    @property
+    def items_count(self) -> int:
+        """Number of content items and subdirs before the wrappers are applied"""
+        return len(self._dir_content_items) + len(self._subdirs)
 
     async def child_updated(self, events: list[TreeEventType["VfsTreeDir"]]):
         """Method used by subdirs to notify the dir about its modifications. If this dir contains any wrappers updates are wrapped with `wrap_updates` method."""
         # self._logger.debug(f"child_updated( {events})")
 
+        # wrappers may depend on the content of the nested dirs
+        changed = len(self._wrappers) > 0 or any(e.sender is self for e in events)
+
+        if changed:
+            self._version += 1
+
         parent = await self.get_parent()
 
         for w in self._wrappers:
             events = await w.wrap_events(events)
 
+        # a listing built while the wrappers were updating is outdated
+        if changed:
+            self._version += 1
+
         await parent.child_updated(events)
 
     async def get_parent(self):
+        if self._parent is not None:
+            return self._parent
+
         if self.path == "/":
             return self._parent_tree
 
         return await self._parent_tree.get_parent(self._path)
 
+    def _walk_subdirs(self) -> Iterator["VfsTreeDir"]:
+        for sd in self._subdirs.values():
+            yield sd
+            yield from sd._walk_subdirs()
+
     def __repr__(self) -> str:
         return f"VfsTreeDir(path={self._path})"
 
@@ -162,7 +277,7 @@ class VfsTreeDir(VfsTreeDirMixin):
 
     @property
     def name(self):
-        return vfs.split_path(self._path)[1]
+        return self._name
 
     @property
     def path(self):
@@ -186,6 +301,9 @@ class VfsTreeDir(VfsTreeDirMixin):
         return await self._parent_tree.get_dir(self._globalpath(subpath))
 
     async def get_subdirs(self, subpath: str = "/") -> list["VfsTreeDir"]:
+        if subpath == "/":
+            return list(self._subdirs.values())
+
         return await self._parent_tree.get_subdirs(self._globalpath(subpath))
 
     async def get_dir_content_items(
@@ -235,69 +353,14 @@ class VfsTreeDir(VfsTreeDirMixin):
         return await self.tree.get_dir_content(self.path)
 
 
-class SubdirsRegistry:
-    """Stores mapping path -> list[path]"""
-
-    def __init__(self) -> None:
-        self._subdirs_by_path: dict[str, list[str]] = {}
-
-    def add_path(self, path: str):
-        """"""
-
-        if path in self._subdirs_by_path:
-            raise VfsTreeError(f"SubdirsRegistry: {path} is already in registry")
-
-        self._subdirs_by_path[path] = []
-
-        parent, name = vfs.split_path(path)
-
-        if name == "":
-            return
-
-        if parent not in self._subdirs_by_path:
-            raise VfsTreeNotFoundError(
-                f"SubdirsRegistry: error putting {path}. Missing parent {parent} in registry",
-                path=parent,
-            )
-
-        self._subdirs_by_path[parent].append(path)
-
-    def remove_path(self, path: str):
-        parent_path = vfs.parent_path(path)
-
-        self._subdirs_by_path[parent_path].remove(path)
-
-        subdirs = self.get_subdirs(path, recursive=True)
-
-        for sd in subdirs:
-            del self._subdirs_by_path[sd]
-
-        del self._subdirs_by_path[path]
-
-    def get_subdirs(self, path: str, recursive=False) -> list[str]:
-        subs = self._subdirs_by_path.get(path)
-
-        if subs is None:
-            raise VfsTreeNotFoundError(
-                f"SubdirsRegistry: Missing {path} in registry", path=path
-            )
-
-        # subs = subs[:]
-        subssubs = []
-
-        if recursive:
-            for s in subs:
-                subssubs.extend(self.get_subdirs(s, recursive=True))
-
-        return [*subs, *subssubs]
-
-
 class VfsTree(Subscribable, VfsTreeProto):
     """
     The structure that holds the whole generated FS tree.
     Producers use it to read and write the structures they are responsible for.
 
-    Storing dirs in a single mapping we try to avoid recursiveness.
+    Dirs are linked to their parents and subdirs so events and subtree
+    operations follow the links. The mapping by path is only used to resolve
+    the paths passed into the tree.
 
     Provides interface for accessing dirs and their contents by their global paths.
     """
@@ -307,12 +370,13 @@ class VfsTree(Subscribable, VfsTreeProto):
     VfsTreeDir = VfsTreeDir
     VfsTreeDirContent = VfsTreeDirContent
 
-    def __init__(self) -> None:
+    def __init__(self, *, lazy=False) -> None:
         Subscribable.__init__(self)
 
         self._dir_by_path: dict[str, VfsTreeDir] = {}
-        self._path_dy_dir: dict[VfsTreeDir, str] = {}
-        self._subdirs = SubdirsRegistry()
+
+        self.lazy = lazy
+        """ Producers put into the tree run when their dir is read for the first time """
 
     def __repr__(self) -> str:
         return f"VfsTree()"
@@ -339,7 +403,8 @@ class VfsTree(Subscribable, VfsTreeProto):
         """Removes `item` from `path` notifying parent dir with `UpdateRemovedItems`."""
         sd = await self.get_dir(path)
 
-        await sd._remove_from_content(item)
+        if not await sd._remove_from_content(item):
+            return
 
         await sd.child_updated(
             [TreeEventRemovedItems(sender=sd, removed_items=[item])],
@@ -391,19 +456,14 @@ class VfsTree(Subscribable, VfsTreeProto):
         self.logger.debug(f"Removing {path}")
 
         thedir = await self.get_dir(path)
-        subdirs = await self.get_subdirs(path, recursive=True)
-
-        # parent_dir, dir_name = vfs.split_path(path, addslash=True)
-        parent = await self.get_parent(path)
+        parent = await thedir.get_parent()
 
-        for sd in subdirs:
+        for sd in thedir._walk_subdirs():
             del self._dir_by_path[sd.path]
-            del self._path_dy_dir[sd]
 
         del self._dir_by_path[path]
-        del self._path_dy_dir[thedir]
-
-        self._subdirs.remove_path(path)
+        del parent._subdirs[thedir.name]
+        thedir._parent = None
 
         await parent.child_updated(
             # parent,  # type: ignore
@@ -417,29 +477,39 @@ class VfsTree(Subscribable, VfsTreeProto):
     async def put_dir(self, d: VfsTreeDir) -> VfsTreeDir:
         """Put `VfsTreeDir`. May be used instead of `create_dir` method."""
         path = vfs.norm_path(d.path, addslash=True)
-        # parent_dir, dir_name = vfs.split_path(path, addslash=True)
 
-        if path in self._dir_by_path:
+        existing = self._dir_by_path.get(path)
+
+        if existing is not None:
+            # takes the place of the existing dir keeping its subdirs
+            d._parent = existing._parent
+            d._subdirs = existing._subdirs
+
+            for sd in d._subdirs.values():
+                sd._parent = d
+
+            if d._parent is not None:
+                d._parent._subdirs[d.name] = d
+
             self._dir_by_path[path] = d
-            self._path_dy_dir[d] = path
-            return self._dir_by_path[path]
+            return d
 
-        self._dir_by_path[path] = d
-        self._path_dy_dir[d] = path
-        self._subdirs.add_path(path)
+        if path == "/":
+            self._dir_by_path[path] = d
+            return d
 
-        if path != "/":
-            parent = await self.get_parent(path)
+        parent = await self.get_parent(path)
 
-            if parent.path not in self._dir_by_path:
-                await self.create_dir(parent.path)
+        parent._subdirs[d.name] = d
+        d._parent = parent
+        self._dir_by_path[path] = d
 
-            await parent.child_updated(
-                # parent,  # type: ignore
-                [TreeEventNewDirs(sender=parent, new_dirs=[path])],
-            )
+        await parent.child_updated(
+            # parent,  # type: ignore
+            [TreeEventNewDirs(sender=parent, new_dirs=[path])],
+        )
 
-        return self._dir_by_path[path]
+        return d
 
     async def get_parents(self, path_or_dir: str | VfsTreeDir) -> list[VfsTreeDir]:
         """ "Returns a list of parents of `path_or_dir` with first element being `VfsTree`"""
@@ -448,17 +518,15 @@ class VfsTree(Subscribable, VfsTreeProto):
             return []
 
         if isinstance(path_or_dir, str):
-            path = path_or_dir
             thedir = await self.get_dir(path_or_dir)
         else:
-            path = path_or_dir.path
             thedir = path_or_dir
 
-        parent = await self.get_parent(path)
+        parent = await thedir.get_parent()
         result = [parent]
 
         while parent != self:
-            parent = await self.get_parent(parent.path)
+            parent = await parent.get_parent()
             result.append(parent)
 
         return result
@@ -474,6 +542,11 @@ class VfsTree(Subscribable, VfsTreeProto):
         if path == "/":
             raise VfsTreeError(f"Cannot get parent for /")
 
+        thedir = self._dir_by_path.get(path)
+
+        if thedir is not None and thedir._parent is not None:
+            return thedir._parent
+
         parent_dir, dir_name = vfs.split_path(path, addslash=True)
 
         return await self.get_dir(parent_dir)
@@ -492,26 +565,34 @@ class VfsTree(Subscribable, VfsTreeProto):
 
     async def get_subdirs(self, path: str, *, recursive=False) -> list[VfsTreeDir]:
         """Returns a list of `VfsTreeDir` which are subdirs of dir stored at `path`. If `recursive` flag is set all the nested subdirs are included."""
-        res = []
-
-        subdirs = self._subdirs.get_subdirs(path, recursive)
+        thedir = await self.get_dir(path)
 
-        for s in subdirs:
-            res.append(self._dir_by_path[s])
+        if recursive:
+            return list(thedir._walk_subdirs())
 
-        return res
+        return list(thedir._subdirs.values())
 
     async def get_dir_content(self, path: str = "/") -> VfsTreeDirContent:
         """Returns `VfsTreeDirContent`"""
         return self.VfsTreeDirContent(self, path)
 
     async def _get_dir_content(self, path: str) -> vfs.DirContentProto:
-        """Method used by `VfsTreeDirContent` to construct `vfs.DirContentProto`"""
+        """Method used by `VfsTreeDirContent` to construct `vfs.DirContentProto`. The result is reused until the dir changes"""
         d = await self.get_dir(path)
 
+        await d.produce_lazy()
+
+        version = d.version
+
+        if (
+            d._dir_content_snapshot is not None
+            and d._dir_content_snapshot[0] == version
+        ):
+            return d._dir_content_snapshot[1]
+
         vfs_items, subdirs = (
-            await d.get_dir_content_items(),
-            await d.get_subdirs(),
+            await d._get_dir_content_items(),
+            d._subdirs.values(),
         )
 
         content = [
@@ -527,6 +608,9 @@ class VfsTree(Subscribable, VfsTreeProto):
         for w in d._wrappers:
             dc = await w.wrap_dir_content(dc)
 
+        if d.version == version:
+            d._dir_content_snapshot = (version, dc)
+
         return dc
 
 
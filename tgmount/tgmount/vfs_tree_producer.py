@@ -1,3 +1,5 @@
+import functools
+
 from tgmount import vfs, config
 from tgmount.util import none_fallback, yes
 from tgmount.util.timer import Timer
@@ -65,9 +67,34 @@ class VfsTreeProducer:
         else:
             self.logger.debug(f"Producing {global_path}")
 
+        tree = tree_dir if isinstance(tree_dir, VfsTree) else tree_dir.tree
+
+        has_producer = (
+            vfs_config.vfs_producer is not None
+            and vfs_config.vfs_producer_config is not None
+        )
+
+        if tree.lazy and has_producer:
+            # the dir is put with its wrappers and the deferred producer so
+            # the wrappers of the parent see it as not produced yet
+            sub_dir = tree.VfsTreeDir(tree, vfs.norm_path(global_path, addslash=True))
+            self._add_wrappers(sub_dir, vfs_config)
+            sub_dir.set_lazy_producer(
+                functools.partial(self._run_producer, sub_dir, vfs_config)
+            )
+            await tree.put_dir(sub_dir)
+            return
+
         # create the subdir
         sub_dir = await tree_dir.create_dir(path)
 
+        self._add_wrappers(sub_dir, vfs_config)
+
+        # If the directory has any producer
+        if has_producer:
+            await self._run_producer(sub_dir, vfs_config)
+
+    def _add_wrappers(self, sub_dir: VfsTreeDir, vfs_config: VfsDirConfig):
         # If the directory has any wrapper
         if vfs_config.vfs_wrappers is not None:
             # self.logger.debug(
@@ -80,20 +107,19 @@ class VfsTreeProducer:
                 )
                 sub_dir.add_wrapper(wrapper)
 
-        # If the directory has any producer
-        if (
-            vfs_config.vfs_producer is not None
-            and vfs_config.vfs_producer_config is not None
-        ):
-            # self.logger.debug(f"{sub_dir.path} uses {vfs_config.vfs_producer} producer")
+    async def _run_producer(self, sub_dir: VfsTreeDir, vfs_config: VfsDirConfig):
+        assert vfs_config.vfs_producer is not None
+        assert vfs_config.vfs_producer_config is not None
 
-            producer = await vfs_config.vfs_producer.from_config(
-                self._resources,
-                vfs_config.vfs_producer_config,
-                none_fallback(vfs_config.vfs_producer_arg, {}),
-                sub_dir,
-            )
-            await producer.produce()
+        # self.logger.debug(f"{sub_dir.path} uses {vfs_config.vfs_producer} producer")
+
+        producer = await vfs_config.vfs_producer.from_config(
+            self._resources,
+            vfs_config.vfs_producer_config,
+            none_fallback(vfs_config.vfs_producer_arg, {}),
+            sub_dir,
+        )
+        await producer.produce()
 
         # elif yes(vfs_config.vfs_producer) and isinstance(
         #     vfs_config.vfs_producer, VfsTreeProducerWithoutConfigProto
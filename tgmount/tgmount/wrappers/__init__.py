@@ -1,3 +1,4 @@
 from .logger import logger
 from . import wrapper_exclude_empty_dirs
 from . import wrapper_zips_as_dirs
+from . import wrapper_photo_thumbs
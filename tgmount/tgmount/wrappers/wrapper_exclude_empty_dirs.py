@@ -1,6 +1,6 @@
 from tgmount import vfs
 
-from ..vfs_tree import VfsTreeDir
+from ..vfs_tree import VfsTreeDir, VfsTreeDirContent
 from ..vfs_tree_types import (
     TreeEventNewDirs,
     TreeEventRemovedDirs,
@@ -42,16 +42,41 @@ class WrapperEmpty(VfsTreeWrapperProto):
     async def wrap_dir_content(
         self, dir_content: vfs.DirContentProto
     ) -> vfs.DirContentProto:
-        return remove_empty_dirs_content(dir_content)
+        return vfs.dir_content_filter_items(self._filter_empty, dir_content)
+
+    async def _filter_empty(self, item: vfs.DirContentItem) -> bool:
+        if vfs.DirLike.guard(item) and isinstance(item.content, VfsTreeDirContent):
+            subdir = await self._wrapped_dir.tree.get_dir(item.content.path)
+            return not await self._is_empty(subdir)
+
+        # dirs that are not stored in the tree (e.g. zip archives)
+        return await filter_empty(item)
 
     async def _get_subdirs_names(self, child: "VfsTreeDir") -> set[str]:
         return set(sd.name for sd in await child.get_subdirs())
 
+    def _is_wrapped_empty(self) -> bool:
+        """The wrapped dir shows neither items nor non empty subdirs"""
+        return (
+            self._wrapped_dir.content_items_count == 0
+            and len(self._wrapped_nonempty_dir_subdirs) == 0
+        )
+
     async def _is_empty(self, subdir: "VfsTreeDir") -> bool:
-        # sds = await subdir.get_subdirs()
+        """Uses the counts maintained by the tree instead of reading the subdir"""
+        # the content is unknown until the dir is read for the first time
+        if not subdir.is_produced:
+            return False
+
+        if len(subdir.wrappers) == 0:
+            return subdir.items_count == 0
+
+        if len(subdir.wrappers) == 1 and isinstance(subdir.wrappers[0], WrapperEmpty):
+            return subdir.wrappers[0]._is_wrapped_empty()
+
+        # other wrappers may change the listing
         cs = await subdir.get_dir_content()
         return await vfs.dir_is_empty(cs)
-        # return (len(sds) + len(cs)) == 0
 
     async def wrap_events(
         self,
@@ -120,6 +145,16 @@ class WrapperEmpty(VfsTreeWrapperProto):
                             self._logger.debug(f"{d.path} is not empty.")
                         else:
                             self._logger.debug(f"{d.path} is empty.")
+
+                    if len(_e.new_dirs) > 0:
+                        _events.append(_e)
+                elif isinstance(ev, TreeEventRemovedDirs):
+                    self._wrapped_nonempty_dir_subdirs = set(
+                        d
+                        for d in self._wrapped_nonempty_dir_subdirs
+                        if d.path not in ev.removed_dirs
+                    )
+                    _events.append(ev)
                 else:
                     _events.append(ev)
             else:
@@ -0,0 +1,268 @@
+import os
+from dataclasses import dataclass
+from typing import Literal, Mapping
+
+from tgmount import vfs
+from tgmount.tgclient.files_source import FileContentPhoto
+from tgmount.util import none_fallback
+
+from ..vfs_tree import VfsTreeDir
+from ..vfs_tree_types import (
+    TreeEventNewItems,
+    TreeEventRemovedItems,
+    TreeEventType,
+    TreeEventUpdatedItems,
+)
+from ..vfs_tree_wrapper_types import VfsTreeWrapperProto
+from .logger import logger as _logger
+
+
+@dataclass
+class WrapperPhotoThumbsProps:
+    mode: Literal["dir", "siblings"]
+    """ `dir` puts the thumbnails into a subfolder, `siblings` places them next to the photos """
+
+    dir_name: str
+
+    @staticmethod
+    def from_config(config: Mapping):
+        mode = config.get("mode", "dir")
+
+        if mode not in ("dir", "siblings"):
+            raise ValueError(f"Invalid PhotoThumbs mode: {mode}")
+
+        return WrapperPhotoThumbsProps(
+            mode=mode,
+            dir_name=config.get("dir_name", ".thumbs"),
+        )
+
+
+def photo_thumb_name(photo_name: str, thumb_type: str) -> str:
+    stem, ext = os.path.splitext(photo_name)
+    return f"{stem}_{thumb_type}{ext}"
+
+
+def photo_thumb_extra(photo_extra, thumb_type: str):
+    """The thumbnail type is appended to the photo's ids so the thumbnail gets an inode of its own"""
+    if isinstance(photo_extra, tuple):
+        return (*photo_extra, thumb_type)
+
+    return None
+
+
+class WrapperPhotoThumbs(VfsTreeWrapperProto):
+    """
+    Wraps `VfsTreeDir`.
+
+    Exposes smaller sizes of the contained photos as separate files. The
+    thumbnails are only fetched when read.
+
+    """
+
+    logger = _logger.getChild(f"WrapperPhotoThumbs")
+
+    @classmethod
+    def from_config(cls, arg: Mapping | None, sub_dir: VfsTreeDir):
+        return WrapperPhotoThumbs(
+            sub_dir,
+            WrapperPhotoThumbsProps.from_config(none_fallback(arg, {})),
+        )
+
+    def __init__(
+        self,
+        wrapped_dir: "VfsTreeDir",
+        props: WrapperPhotoThumbsProps,
+    ) -> None:
+        self._wrapped_dir = wrapped_dir
+        self._props = props
+
+        self._photo_to_thumbs: dict[str, list[vfs.FileLike]] = {}
+        self._thumbs_dir: vfs.DirLike | None = None
+
+    def _is_photo(self, item: vfs.DirContentItem) -> bool:
+        return isinstance(item, vfs.FileLike) and FileContentPhoto.guard(item.content)
+
+    def _get_thumbs(self, photo: vfs.FileLike) -> list[vfs.FileLike]:
+        if (thumbs := self._photo_to_thumbs.get(photo.name)) is not None:
+            return thumbs
+
+        assert FileContentPhoto.guard(photo.content)
+
+        thumbs = self._photo_to_thumbs[photo.name] = [
+            vfs.FileLike(
+                photo_thumb_name(photo.name, thumb_type),
+                content,
+                creation_time=photo.creation_time,
+                extra=photo_thumb_extra(photo.extra, thumb_type),
+            )
+            for thumb_type, content in photo.content.thumbs.items()
+        ]
+
+        # the directory has to be recreated
+        self._thumbs_dir = None
+
+        return thumbs
+
+    def _remove_thumbs(self, photo_name: str) -> list[vfs.FileLike]:
+        thumbs = self._photo_to_thumbs.pop(photo_name, [])
+
+        if len(thumbs) > 0:
+            self._thumbs_dir = None
+
+        return thumbs
+
+    def _thumbs_events(
+        self,
+        sender: VfsTreeDir,
+        removed_thumbs: list[vfs.FileLike],
+        new_thumbs: list[vfs.FileLike],
+    ) -> list[TreeEventType]:
+        """Thumbnails keeping their names are updated, the rest are removed or added"""
+        new_by_name = {t.name: t for t in new_thumbs}
+        updated = {
+            t.name: new_by_name.pop(t.name)
+            for t in removed_thumbs
+            if t.name in new_by_name
+        }
+        removed = [t for t in removed_thumbs if t.name not in updated]
+
+        events: list[TreeEventType] = []
+
+        if len(removed) > 0:
+            events.append(TreeEventRemovedItems(sender=sender, removed_items=removed))
+
+        if len(updated) > 0:
+            events.append(TreeEventUpdatedItems(sender=sender, updated_items=updated))
+
+        if len(new_by_name) > 0:
+            events.append(
+                TreeEventNewItems(sender=sender, new_items=list(new_by_name.values()))
+            )
+
+        return events
+
+    def _get_thumbs_dir(self) -> vfs.DirLike | None:
+        if self._thumbs_dir is not None:
+            return self._thumbs_dir
+
+        thumbs = [t for ts in self._photo_to_thumbs.values() for t in ts]
+
+        if len(thumbs) == 0:
+            return None
+
+        self._thumbs_dir = vfs.DirLike(self._props.dir_name, vfs.DirContentList(thumbs))
+
+        return self._thumbs_dir
+
+    async def wrap_events(self, events: list[TreeEventType]) -> list[TreeEventType]:
+        """
+
+        Catch changes in the wrapped directory
+
+        If a photo appears - add its thumbnails.
+        If a photo has gone - remove the thumbnails.
+        If a photo was edited - replace the thumbnails.
+
+        In `dir` mode the thumbnails folder is recreated after any change.
+
+        """
+
+        _events = []
+        thumbs_dir = self._get_thumbs_dir()
+
+        for e in events:
+            if e.sender != self._wrapped_dir:
+                _events.append(e)
+                continue
+
+            if isinstance(e, TreeEventNewItems):
+                _e = TreeEventNewItems(sender=e.sender, new_items=[])
+
+                for item in e.new_items:
+                    _e.new_items.append(item)
+
+                    if not self._is_photo(item):
+                        continue
+
+                    thumbs = self._get_thumbs(item)
+
+                    if self._props.mode == "siblings":
+                        _e.new_items.extend(thumbs)
+
+                _events.append(_e)
+
+            elif isinstance(e, TreeEventRemovedItems):
+                _e = TreeEventRemovedItems(sender=e.sender, removed_items=[])
+
+                for item in e.removed_items:
+                    _e.removed_items.append(item)
+
+                    if not self._is_photo(item):
+                        continue
+
+                    thumbs = self._remove_thumbs(item.name)
+
+                    if self._props.mode == "siblings":
+                        _e.removed_items.extend(thumbs)
+
+                _events.append(_e)
+
+            elif isinstance(e, TreeEventUpdatedItems):
+                _events.append(e)
+
+                removed_thumbs = []
+                new_thumbs = []
+
+                # the cached thumbnails belong to the old version of the photo
+                for old_name, item in e.updated_items.items():
+                    removed_thumbs.extend(self._remove_thumbs(old_name))
+
+                    if self._is_photo(item):
+                        new_thumbs.extend(self._get_thumbs(item))
+
+                if self._props.mode == "siblings":
+                    _events.extend(
+                        self._thumbs_events(e.sender, removed_thumbs, new_thumbs)
+                    )
+            else:
+                _events.append(e)
+
+        if self._props.mode == "dir" and self._thumbs_dir is None:
+            if thumbs_dir is not None:
+                _events.append(
+                    TreeEventRemovedItems(
+                        sender=self._wrapped_dir, removed_items=[thumbs_dir]
+                    )
+                )
+
+            if (new_thumbs_dir := self._get_thumbs_dir()) is not None:
+                _events.append(
+                    TreeEventNewItems(
+                        sender=self._wrapped_dir, new_items=[new_thumbs_dir]
+                    )
+                )
+
+        return _events
+
+    async def wrap_dir_content(
+        self, dir_content: vfs.DirContentProto
+    ) -> vfs.DirContentProto:
+
+        items = []
+
+        for item in await vfs.dir_content_read(dir_content):
+            items.append(item)
+
+            if not self._is_photo(item):
+                continue
+
+            thumbs = self._get_thumbs(item)
+
+            if self._props.mode == "siblings":
+                items.extend(thumbs)
+
+        if self._props.mode == "dir":
+            if (thumbs_dir := self._get_thumbs_dir()) is not None:
+                items.append(thumbs_dir)
+
+        return vfs.DirContentList(items)
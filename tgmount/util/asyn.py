@@ -1,6 +1,10 @@
 import asyncio
 import os
 import threading
+from contextlib import asynccontextmanager
+from typing import Generic, TypeVar
+
+K = TypeVar("K")
 
 
 async def wait_all(fs) -> list:
@@ -42,3 +46,33 @@ def print_tasks_sync():
 
 async def print_tasks():
     print_tasks_sync()
+
+
+class KeyedLocks(Generic[K]):
+    """Holds a lock per key. A lock is dropped once nobody holds or waits for it"""
+
+    def __init__(self) -> None:
+        self._locks: dict[K, tuple[asyncio.Lock, int]] = {}
+
+    def locked(self, key: K) -> bool:
+        return key in self._locks and self._locks[key][0].locked()
+
+    @asynccontextmanager
+    async def lock(self, key: K):
+        lock, users = self._locks.get(key, (None, 0))
+
+        if lock is None:
+            lock = asyncio.Lock()
+
+        self._locks[key] = (lock, users + 1)
+
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._locks[key]
+
+            if users == 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, users - 1)
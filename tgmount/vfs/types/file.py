@@ -156,7 +156,7 @@ class FileContentStringWritable(FileContentWritableProto):
     encoding = "utf-8"
 
     def __init__(self, content_string="") -> None:
-        self._content_bytes = content_string.encode(self.encoding)
+        self._content_bytes = bytearray(content_string.encode(self.encoding))
         self.size = len(self._content_bytes)
 
     async def seek_func(self, handle, n: int, w: int):
@@ -169,19 +169,16 @@ class FileContentStringWritable(FileContentWritableProto):
         return
 
     async def read_func(self, handle, off: int, size: int) -> bytes:
-        return self._content_bytes[off : off + size]
+        return bytes(memoryview(self._content_bytes)[off : off + size])
 
     async def write(self, handle: None, off: int, buf: bytes):
-        content_bytes = bytearray(self._content_bytes)
-        content_bytes_len = len(content_bytes)
+        gap = off - len(self._content_bytes)
 
-        for idx, b in enumerate(buf):
-            if off + idx >= content_bytes_len:
-                content_bytes.append(b)
-            else:
-                content_bytes[off + idx] = b
+        # writing past the end leaves a hole filled with zeros
+        if gap > 0:
+            self._content_bytes.extend(bytes(gap))
 
-        self._content_bytes = bytes(content_bytes)
+        self._content_bytes[off : off + len(buf)] = buf
         self.size = len(self._content_bytes)
 
         return len(buf)